@@ -0,0 +1,36 @@
+"""add ingest jobs table"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = "20251012090000_add_ingest_jobs"
+down_revision: Union[str, None] = "20251007160000_add_chat_turns"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "ingest_jobs",
+        sa.Column("id", sa.String(length=64), primary_key=True),
+        sa.Column("status", sa.String(length=16), nullable=False, server_default="queued"),
+        sa.Column("file_name", sa.String(length=255), nullable=False),
+        sa.Column("document_id", sa.String(length=64), nullable=True),
+        sa.Column("spool_path", sa.String(length=512), nullable=False),
+        sa.Column("overrides", sa.JSON(), nullable=True),
+        sa.Column("chunks_total", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("chunks_embedded", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("chunks_stored", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("error", sa.Text(), nullable=True),
+        sa.Column("created_at", sa.DateTime(), nullable=False, server_default=sa.func.now()),
+        sa.Column("updated_at", sa.DateTime(), nullable=False, server_default=sa.func.now()),
+    )
+    op.create_index("ix_ingest_jobs_status", "ingest_jobs", ["status"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_ingest_jobs_status", table_name="ingest_jobs")
+    op.drop_table("ingest_jobs")
@@ -0,0 +1,30 @@
+"""add heading path to document chunks"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = "20251014090000_add_chunk_heading_path"
+down_revision: Union[str, None] = "20251012090000_add_ingest_jobs"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # document_chunks is created by init_db() rather than a migration, so it may not exist yet.
+    inspector = sa.inspect(op.get_bind())
+    if not inspector.has_table("document_chunks"):
+        return
+    if "heading_path" not in {column["name"] for column in inspector.get_columns("document_chunks")}:
+        op.add_column(
+            "document_chunks",
+            sa.Column("heading_path", sa.String(length=512), nullable=False, server_default=""),
+        )
+
+
+def downgrade() -> None:
+    inspector = sa.inspect(op.get_bind())
+    if inspector.has_table("document_chunks"):
+        op.drop_column("document_chunks", "heading_path")
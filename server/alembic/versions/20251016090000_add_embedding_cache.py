@@ -0,0 +1,31 @@
+"""add embedding cache table"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = "20251016090000_add_embedding_cache"
+down_revision: Union[str, None] = "20251014090000_add_chunk_heading_path"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "embedding_cache",
+        sa.Column("model", sa.String(length=64), primary_key=True),
+        sa.Column("dimensions", sa.Integer(), primary_key=True),
+        sa.Column("text_hash", sa.String(length=64), primary_key=True),
+        sa.Column("vector", sa.LargeBinary(), nullable=False),
+        sa.Column("nbytes", sa.Integer(), nullable=False),
+        sa.Column("created_at", sa.DateTime(), nullable=False, server_default=sa.func.now()),
+        sa.Column("last_used_at", sa.DateTime(), nullable=False, server_default=sa.func.now()),
+    )
+    op.create_index("ix_embedding_cache_last_used_at", "embedding_cache", ["last_used_at"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_embedding_cache_last_used_at", table_name="embedding_cache")
+    op.drop_table("embedding_cache")
@@ -0,0 +1,52 @@
+"""add near-duplicate detection tables"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = "20251018090000_add_near_duplicate_index"
+down_revision: Union[str, None] = "20251016090000_add_embedding_cache"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "chunk_signatures",
+        sa.Column("chunk_id", sa.String(length=128), primary_key=True),
+        sa.Column("document_id", sa.String(length=64), nullable=False),
+        sa.Column("signature", sa.LargeBinary(), nullable=False),
+    )
+    op.create_index("ix_chunk_signatures_document_id", "chunk_signatures", ["document_id"])
+    op.create_table(
+        "chunk_lsh_buckets",
+        sa.Column("bucket", sa.String(length=32), primary_key=True),
+        sa.Column("chunk_id", sa.String(length=128), primary_key=True),
+    )
+    op.create_index("ix_chunk_lsh_buckets_chunk_id", "chunk_lsh_buckets", ["chunk_id"])
+    op.create_table(
+        "chunk_duplicates",
+        sa.Column("chunk_id", sa.String(length=128), primary_key=True),
+        sa.Column("document_id", sa.String(length=64), nullable=False),
+        sa.Column("file_name", sa.String(length=255), nullable=False),
+        sa.Column("canonical_chunk_id", sa.String(length=128), nullable=False),
+        sa.Column("canonical_document_id", sa.String(length=64), nullable=False),
+        sa.Column("similarity", sa.Float(), nullable=False),
+        sa.Column("preview", sa.Text(), nullable=False, server_default=""),
+        sa.Column("created_at", sa.DateTime(), nullable=False, server_default=sa.func.now()),
+        sa.Column("updated_at", sa.DateTime(), nullable=False, server_default=sa.func.now()),
+    )
+    op.create_index("ix_chunk_duplicates_document_id", "chunk_duplicates", ["document_id"])
+    op.create_index("ix_chunk_duplicates_canonical_chunk_id", "chunk_duplicates", ["canonical_chunk_id"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_chunk_duplicates_canonical_chunk_id", table_name="chunk_duplicates")
+    op.drop_index("ix_chunk_duplicates_document_id", table_name="chunk_duplicates")
+    op.drop_table("chunk_duplicates")
+    op.drop_index("ix_chunk_lsh_buckets_chunk_id", table_name="chunk_lsh_buckets")
+    op.drop_table("chunk_lsh_buckets")
+    op.drop_index("ix_chunk_signatures_document_id", table_name="chunk_signatures")
+    op.drop_table("chunk_signatures")
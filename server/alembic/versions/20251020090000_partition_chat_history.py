@@ -0,0 +1,119 @@
+"""composite history index and monthly partitions for chat tables"""
+
+from datetime import date, datetime, timezone
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "20251020090000_partition_chat_history"
+down_revision: Union[str, None] = "20251018090000_add_near_duplicate_index"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+MONTHS_AHEAD = 3
+# Table name -> whether created_at is timestamptz, which decides the bound literals.
+TABLES = {"chat_turns": True, "chat_logs": False}
+
+
+def _add_months(month: date, count: int) -> date:
+    index = month.year * 12 + month.month - 1 + count
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def _bound(month: date, aware: bool) -> str:
+    return f"'{month:%Y-%m-%d} 00:00:00{'+00' if aware else ''}'"
+
+
+def _create_chat_logs_if_missing() -> None:
+    # chat_logs predates migrations and was only ever created by create_all.
+    if sa.inspect(op.get_bind()).has_table("chat_logs"):
+        return
+    op.create_table(
+        "chat_logs",
+        sa.Column("id", postgresql.UUID(as_uuid=False), primary_key=True),
+        sa.Column("household_id", sa.String(length=64), nullable=True),
+        sa.Column("persona", sa.String(length=16)),
+        sa.Column("language", sa.String(length=16)),
+        sa.Column("user_message", sa.Text()),
+        sa.Column("assistant_message", sa.Text(), nullable=True),
+        sa.Column("needs_human", sa.Boolean()),
+        sa.Column("safety_reasons", sa.JSON(), nullable=True),
+        sa.Column("context_snippets", sa.JSON(), nullable=True),
+        sa.Column("created_at", sa.DateTime()),
+        sa.Column("updated_at", sa.DateTime()),
+    )
+    op.create_index("ix_chat_logs_household_id", "chat_logs", ["household_id"])
+
+
+def _partition(table: str, aware: bool) -> None:
+    """Swap ``table`` for a copy range-partitioned by month on created_at."""
+
+    legacy = f"{table}_unpartitioned"
+    op.execute(f"ALTER TABLE {table} RENAME TO {legacy}")
+    op.execute(f"ALTER TABLE {legacy} RENAME CONSTRAINT {table}_pkey TO {legacy}_pkey")
+    op.execute(f"UPDATE {legacy} SET created_at = now() WHERE created_at IS NULL")
+    # Every unique constraint on a partitioned table has to include the partition key.
+    op.execute(
+        f"CREATE TABLE {table} (LIKE {legacy} INCLUDING DEFAULTS, PRIMARY KEY (id, created_at)) "
+        "PARTITION BY RANGE (created_at)"
+    )
+    op.execute(f"CREATE TABLE {table}_default PARTITION OF {table} DEFAULT")
+
+    oldest = op.get_bind().execute(sa.text(f"SELECT min(created_at) FROM {legacy}")).scalar()
+    current = datetime.now(timezone.utc).date().replace(day=1)
+    month = date(oldest.year, oldest.month, 1) if oldest is not None else current
+    while month <= _add_months(current, MONTHS_AHEAD):
+        op.execute(
+            f"CREATE TABLE {table}_p{month:%Y%m} PARTITION OF {table} "
+            f"FOR VALUES FROM ({_bound(month, aware)}) TO ({_bound(_add_months(month, 1), aware)})"
+        )
+        month = _add_months(month, 1)
+
+    op.execute(f"INSERT INTO {table} SELECT * FROM {legacy}")
+    op.execute(f"DROP TABLE {legacy}")
+
+
+def _unpartition(table: str) -> None:
+    partitioned = f"{table}_partitioned"
+    op.execute(f"ALTER TABLE {table} RENAME TO {partitioned}")
+    op.execute(f"ALTER TABLE {partitioned} RENAME CONSTRAINT {table}_pkey TO {partitioned}_pkey")
+    op.execute(f"CREATE TABLE {table} (LIKE {partitioned} INCLUDING DEFAULTS, PRIMARY KEY (id))")
+    op.execute(f"INSERT INTO {table} SELECT * FROM {partitioned}")
+    op.execute(f"DROP TABLE {partitioned} CASCADE")
+
+
+def upgrade() -> None:
+    _create_chat_logs_if_missing()
+    op.drop_index("ix_chat_turns_thread_id", table_name="chat_turns")
+    op.drop_index("ix_chat_turns_created_at", table_name="chat_turns")
+    op.drop_index("ix_chat_logs_household_id", table_name="chat_logs")
+
+    if op.get_bind().dialect.name == "postgresql":
+        for table, aware in TABLES.items():
+            _partition(table, aware)
+
+    # Indexes on a partitioned parent are created on every partition, present and future.
+    # Deliberately not covering role/content; see the comment on the index in app.db.models.
+    op.create_index(
+        "ix_chat_turns_thread_id_created_at", "chat_turns", ["thread_id", sa.text("created_at DESC")]
+    )
+    op.create_index("ix_chat_logs_household_id", "chat_logs", ["household_id"])
+    op.create_index("ix_chat_logs_created_at", "chat_logs", ["created_at"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_chat_logs_created_at", table_name="chat_logs")
+    op.drop_index("ix_chat_logs_household_id", table_name="chat_logs")
+    op.drop_index("ix_chat_turns_thread_id_created_at", table_name="chat_turns")
+
+    if op.get_bind().dialect.name == "postgresql":
+        for table in TABLES:
+            _unpartition(table)
+
+    op.create_index("ix_chat_logs_household_id", "chat_logs", ["household_id"])
+    op.create_index("ix_chat_turns_created_at", "chat_turns", ["created_at"])
+    op.create_index("ix_chat_turns_thread_id", "chat_turns", ["thread_id"])
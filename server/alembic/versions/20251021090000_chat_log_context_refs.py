@@ -0,0 +1,121 @@
+"""store chunk references instead of snippet text in chat logs"""
+
+import hashlib
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = "20251021090000_chat_log_context_refs"
+down_revision: Union[str, None] = "20251020090000_partition_chat_history"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+SNIPPET_CHARS = 280
+BATCH_SIZE = 1000
+
+chat_logs = sa.table(
+    "chat_logs",
+    sa.column("id", sa.Uuid(as_uuid=False)),
+    sa.column("context_snippets", sa.JSON()),
+    sa.column("context_refs", sa.JSON()),
+)
+document_chunks = sa.table("document_chunks", sa.column("chunk_id", sa.String()), sa.column("content", sa.Text()))
+
+
+def _key(text: str) -> bytes:
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=16).digest()
+
+
+def _snippet_index(bind) -> dict[bytes, str]:
+    """Map each stored chunk's logged snippet form to its chunk id.
+
+    Only pgvector deployments keep chunk text in this database. With Chroma the
+    map is empty, and every snippet is kept inline as text.
+    """
+
+    if not sa.inspect(bind).has_table("document_chunks"):
+        return {}
+    index: dict[bytes, str] = {}
+    stmt = sa.select(document_chunks.c.chunk_id, document_chunks.c.content).order_by(document_chunks.c.chunk_id)
+    result = bind.execute(stmt, execution_options={"stream_results": True, "yield_per": BATCH_SIZE})
+    for chunk_id, content in result:
+        index.setdefault(_key(content.strip()[:SNIPPET_CHARS]), chunk_id)
+    return index
+
+
+def _rewrite(bind, source: str, convert) -> None:
+    """Page through chat_logs by id, filling the other context column from ``source``.
+
+    ``convert`` maps a page of non-empty ``source`` values to the new values.
+    """
+
+    target = "context_refs" if source == "context_snippets" else "context_snippets"
+    last_id = None
+    while True:
+        stmt = sa.select(chat_logs.c.id, chat_logs.c[source]).order_by(chat_logs.c.id).limit(BATCH_SIZE)
+        if last_id is not None:
+            stmt = stmt.where(chat_logs.c.id > last_id)
+        rows = bind.execute(stmt).all()
+        if not rows:
+            return
+        rows_with_context = [(log_id, value) for log_id, value in rows if value]
+        if rows_with_context:
+            converted = convert([value for _, value in rows_with_context])
+            updates = [{"log_id": log_id, "value": value} for (log_id, _), value in zip(rows_with_context, converted)]
+            stmt = (
+                sa.update(chat_logs)
+                .where(chat_logs.c.id == sa.bindparam("log_id"))
+                .values({target: sa.bindparam("value", type_=sa.JSON())})
+            )
+            bind.execute(stmt, updates)
+        last_id = rows[-1][0]
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    op.add_column("chat_logs", sa.Column("context_refs", sa.JSON(), nullable=True))
+    index = _snippet_index(bind)
+
+    def to_refs(text: str) -> dict[str, object]:
+        chunk_id = index.get(_key(text))
+        if chunk_id:
+            return {"chunk_ids": [chunk_id], "score": None}
+        # Merged passages and since-deleted chunks have no exact match; keep their text inline.
+        return {"chunk_ids": [], "score": None, "text": text}
+
+    def convert(page: list[list[str]]) -> list[list[dict[str, object]]]:
+        # Legacy rows carry no scores.
+        return [[to_refs(text) for text in snippets] for snippets in page]
+
+    _rewrite(bind, "context_snippets", convert)
+    op.drop_column("chat_logs", "context_snippets")
+
+
+def downgrade() -> None:
+    bind = op.get_bind()
+    op.add_column("chat_logs", sa.Column("context_snippets", sa.JSON(), nullable=True))
+    has_chunks = sa.inspect(bind).has_table("document_chunks")
+
+    def convert(page: list[list[dict[str, object]]]) -> list[list[str]]:
+        wanted = {ref["chunk_ids"][0] for refs in page for ref in refs if ref.get("chunk_ids")}
+        contents: dict[str, str] = {}
+        if has_chunks and wanted:
+            query = sa.select(document_chunks.c.chunk_id, document_chunks.c.content).where(
+                document_chunks.c.chunk_id.in_(sorted(wanted))
+            )
+            contents = dict(bind.execute(query).all())
+        snippets_page = []
+        for refs in page:
+            snippets = []
+            for ref in refs:
+                content = contents.get(ref["chunk_ids"][0]) if ref.get("chunk_ids") else None
+                text = content.strip()[:SNIPPET_CHARS] if content else ref.get("text")
+                if text:
+                    snippets.append(text)
+            snippets_page.append(snippets)
+        return snippets_page
+
+    _rewrite(bind, "context_refs", convert)
+    op.drop_column("chat_logs", "context_refs")
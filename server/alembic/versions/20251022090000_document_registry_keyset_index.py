@@ -0,0 +1,23 @@
+"""index document_registry on the admin listing's keyset"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "20251022090000_document_registry_keyset_index"
+down_revision: Union[str, None] = "20251021090000_chat_log_context_refs"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index(
+        "ix_document_registry_updated_at_document_id",
+        "document_registry",
+        ["updated_at", "document_id"],
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_document_registry_updated_at_document_id", table_name="document_registry")
@@ -0,0 +1,22 @@
+"""keep the full text of duplicate chunks so they can be promoted to canonical"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = "20251024090000_chunk_duplicate_content"
+down_revision: Union[str, None] = "20251023090000_rate_limit_buckets"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column("chunk_duplicates", sa.Column("content", sa.Text(), nullable=True))
+    op.add_column("chunk_duplicates", sa.Column("heading_path", sa.String(length=512), nullable=False, server_default=""))
+
+
+def downgrade() -> None:
+    op.drop_column("chunk_duplicates", "heading_path")
+    op.drop_column("chunk_duplicates", "content")
@@ -1,18 +1,23 @@
 """Chat endpoint with retrieval augmented generation."""
 from __future__ import annotations
 
+import math
+from functools import lru_cache
 from typing import Annotated
 
-from fastapi import APIRouter, Depends, Request
+from fastapi import APIRouter, Depends, HTTPException, Request, status
 from pydantic import BaseModel, Field
 
+from app.core.metrics import CHAT_STAGE_SECONDS
 from app.core.openai_client import OpenAIClient
 from app.core.prompts import build_system_prompt, format_context
+from app.core.ratelimit import ChatRateLimiter, RateLimited, get_rate_limiter
 from app.core.safety import SafetyChecker
 from app.core.settings import Settings, get_settings
-from app.db import crud
-from app.db.session import SessionLocal, session_scope
-from app.rag.retriever import Retriever, build_retriever
+from app.db import crud_async
+from app.db.session import SessionLocal, async_session_scope
+from app.rag.chunking import TokenCounter, token_counter
+from app.rag.retriever import Retriever, budget_passages, build_retriever
 
 router = APIRouter()
 HISTORY_MAX_MESSAGES = 16
@@ -49,6 +54,21 @@ async def get_retriever(
     return build_retriever(settings=settings, session_factory=SessionLocal, embedder=embed_query)
 
 
+async def get_chat_rate_limiter(settings: Settings = Depends(get_settings)) -> ChatRateLimiter:
+    return get_rate_limiter(settings)
+
+
+@lru_cache
+def _prompt_tokens(model: str) -> TokenCounter:
+    return token_counter(model)
+
+
+def client_address(request: Request) -> str:
+    """The per-IP rate limit key: the peer uvicorn resolved from nginx's X-Forwarded-For."""
+
+    return request.client.host if request.client else "unknown"
+
+
 def _trim_words(text: str, limit: int) -> str:
     words = text.split()
     if len(words) <= limit:
@@ -63,9 +83,23 @@ async def chat_endpoint(
     settings: Settings = Depends(get_settings),
     retriever: Retriever = Depends(get_retriever),
     openai_client: OpenAIClient = Depends(get_openai_client),
+    rate_limiter: ChatRateLimiter = Depends(get_chat_rate_limiter),
 ) -> ChatResponse:
+    # Limits come first so a refused request costs no retrieval or upstream work.
+    client_ip = client_address(request)
+    try:
+        quota_subject = await rate_limiter.admit(client_ip, payload.household_id)
+    except RateLimited as exc:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail=f"Too many requests: {exc.scope} limit reached",
+            headers={"Retry-After": str(max(1, math.ceil(exc.retry_after)))},
+        ) from exc
+
+    # Stages are timed into family_ai_chat_stage_seconds; the retriever times embed and vector_search.
     safety: SafetyChecker = getattr(request.app.state, "safety_checker")
-    safety_result = safety.check_user_input(payload.message)
+    with CHAT_STAGE_SECONDS.time("safety"):
+        safety_result = safety.check_user_input(payload.message)
     if not safety_result.safe:
         return ChatResponse(
             reply="أقترح التحدث مباشرة مع مختص موثوق لمتابعة هذا الموضوع الحساس.",
@@ -75,11 +109,18 @@ async def chat_endpoint(
             persona=payload.persona,
         )
 
-    with session_scope() as session:
-        history = crud.fetch_history(session, payload.thread_id, max_messages=HISTORY_MAX_MESSAGES)
+    with CHAT_STAGE_SECONDS.time("history"):
+        async with async_session_scope() as session:
+            history = await crud_async.fetch_history(session, payload.thread_id, max_messages=HISTORY_MAX_MESSAGES)
 
     retrieval = await retriever.retrieve(payload.message, top_k=settings.max_context_docs)
-    context_prompt = format_context(retrieval.context_bullets)
+    # The model gets the full merged passages; the clipped bullets are only for display.
+    passages = []
+    if retrieval.chunks:
+        passages = budget_passages(
+            retrieval.chunks, max_tokens=settings.context_max_tokens, count_tokens=_prompt_tokens(settings.chat_model)
+        )
+    context_prompt = format_context(passages)
     system_prompt = build_system_prompt(persona=payload.persona, language=payload.language, settings=settings)
 
     messages: list[dict[str, str]] = [{"role": "system", "content": system_prompt}]
@@ -88,27 +129,34 @@ async def chat_endpoint(
     messages.extend(history)
     messages.append({"role": "user", "content": payload.message})
 
-    reply_text = await openai_client.chat(messages)
-    reply_text = _trim_words(reply_text, settings.max_response_words)
+    with CHAT_STAGE_SECONDS.time("completion"):
+        completion = await openai_client.complete(messages)
+    await rate_limiter.charge_tokens(quota_subject, completion.total_tokens)
+    reply_text = _trim_words(completion.text, settings.max_response_words)
 
-    output_safety = safety.check_assistant_output(reply_text)
+    with CHAT_STAGE_SECONDS.time("output_safety"):
+        output_safety = safety.check_assistant_output(reply_text)
     needs_human = bool(output_safety.needs_human or safety_result.needs_human)
     reasons = list({*safety_result.reasons, *output_safety.reasons})
 
-    with session_scope() as session:
-        crud.log_turn(session, payload.thread_id, "user", payload.message)
-        crud.log_turn(session, payload.thread_id, "assistant", reply_text)
-        crud.record_chat_log(
-            session,
-            household_id=payload.household_id,
-            persona=payload.persona,
-            language=payload.language,
-            user_message=payload.message,
-            assistant_message=reply_text,
-            needs_human=needs_human,
-            safety_reasons=reasons,
-            context_snippets=retrieval.context_bullets,
-        )
+    with CHAT_STAGE_SECONDS.time("persist"):
+        async with async_session_scope() as session:
+            await crud_async.log_turn(session, payload.thread_id, "user", payload.message)
+            await crud_async.log_turn(session, payload.thread_id, "assistant", reply_text)
+            await crud_async.record_chat_log(
+                session,
+                household_id=payload.household_id,
+                persona=payload.persona,
+                language=payload.language,
+                user_message=payload.message,
+                assistant_message=reply_text,
+                needs_human=needs_human,
+                safety_reasons=reasons,
+                context_refs=[
+                    {"chunk_ids": chunk_ids, "score": round(score, 4)}
+                    for chunk_ids, score in zip(retrieval.source_chunk_ids, retrieval.scores)
+                ],
+            )
 
     return ChatResponse(
         reply=reply_text,
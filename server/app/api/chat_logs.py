@@ -0,0 +1,174 @@
+"""Admin views of logged chats, with context snippets rehydrated from the vector store,
+and a streaming NDJSON export."""
+from __future__ import annotations
+
+import asyncio
+from datetime import datetime, timezone
+from typing import AsyncIterator, Optional
+from uuid import UUID
+
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from app.core.security import AuthenticatedUser, get_current_admin_user
+from app.core.settings import Settings, get_settings
+from app.db import crud_async, models
+from app.db.partitions import ndjson_line
+from app.db.session import SessionLocal, async_session_scope, get_async_engine
+from app.rag.ingest import build_vector_store
+from app.rag.retriever import rebuild_passage, snippet
+
+router = APIRouter()
+
+EXPORT_BATCH_SIZE = 500
+
+
+class ChatLogEntry(BaseModel):
+    id: str
+    household_id: Optional[str] = None
+    persona: str
+    language: str
+    user_message: str
+    assistant_message: Optional[str] = None
+    needs_human: bool
+    safety_reasons: list[str]
+    context_count: int
+    created_at: datetime
+
+
+class ChatLogContext(BaseModel):
+    chunk_ids: list[str]
+    score: Optional[float] = None
+    document_id: Optional[str] = None
+    file_name: Optional[str] = None
+    heading_path: Optional[str] = None
+    snippet: Optional[str] = None
+    available: bool
+
+
+class ChatLogDetail(ChatLogEntry):
+    context: list[ChatLogContext]
+
+
+def _entry_fields(log: models.ChatLog) -> dict[str, object]:
+    return {
+        "id": log.id,
+        "household_id": log.household_id,
+        "persona": log.persona,
+        "language": log.language,
+        "user_message": log.user_message,
+        "assistant_message": log.assistant_message,
+        "needs_human": log.needs_human,
+        "safety_reasons": log.safety_reasons or [],
+        "context_count": len(log.context_refs or []),
+        "created_at": log.created_at,
+    }
+
+
+def rehydrate_context(refs: list[dict], store) -> list[ChatLogContext]:
+    """Rebuild each logged passage from its stored chunks in one vector-store lookup.
+
+    A passage whose chunks were deleted or replaced since the chat is reported as
+    unavailable, keeping any snippet text carried over from older log rows.
+    """
+
+    wanted = [chunk_id for ref in refs for chunk_id in ref["chunk_ids"]]
+    chunks = {chunk.chunk_id: chunk for chunk in store.get_chunks(wanted)}
+    context: list[ChatLogContext] = []
+    for ref in refs:
+        found = [chunks[chunk_id] for chunk_id in ref["chunk_ids"] if chunk_id in chunks]
+        passage = rebuild_passage(found) if len(found) == len(ref["chunk_ids"]) else None
+        context.append(
+            ChatLogContext(
+                chunk_ids=ref["chunk_ids"],
+                score=ref.get("score"),
+                document_id=passage.metadata.document_id if passage else None,
+                file_name=passage.metadata.file_name if passage else None,
+                heading_path=passage.metadata.heading_path if passage else None,
+                snippet=snippet(passage) if passage else ref.get("text"),
+                available=passage is not None,
+            )
+        )
+    return context
+
+
+@router.get("/admin/chat-logs", response_model=list[ChatLogEntry])
+async def list_chat_logs(
+    limit: int = Query(default=50, ge=1, le=500),
+    household_id: Optional[str] = None,
+    admin: AuthenticatedUser = Depends(get_current_admin_user),
+):
+    async with async_session_scope() as session:
+        logs = await crud_async.list_chat_logs(session, limit=limit, household_id=household_id)
+    return [ChatLogEntry(**_entry_fields(log)) for log in logs]
+
+
+def _utc_naive(value: datetime) -> datetime:
+    # chat_logs.created_at is a naive UTC timestamp.
+    return value.astimezone(timezone.utc).replace(tzinfo=None) if value.tzinfo else value
+
+
+async def stream_chat_log_lines(
+    engine: AsyncEngine,
+    start: datetime,
+    end: datetime,
+    *,
+    household_id: Optional[str] = None,
+    batch_size: int = EXPORT_BATCH_SIZE,
+) -> AsyncIterator[bytes]:
+    """Yield chat logs created in ``[start, end)`` as NDJSON, one batch of lines at a time.
+
+    Rows come through a server-side cursor on Postgres (a row-by-row cursor on
+    SQLite), so at most ``batch_size`` rows are held in memory however long the range.
+    """
+
+    logs = models.ChatLog.__table__
+    stmt = (
+        select(logs)
+        .where(logs.c.created_at >= _utc_naive(start), logs.c.created_at < _utc_naive(end))
+        .order_by(logs.c.created_at, logs.c.id)
+    )
+    if household_id:
+        stmt = stmt.where(logs.c.household_id == household_id)
+    async with engine.connect() as connection:
+        result = await connection.stream(stmt, execution_options={"yield_per": batch_size})
+        async for rows in result.mappings().partitions():
+            yield "".join(ndjson_line(row) for row in rows).encode("utf-8")
+
+
+@router.get("/admin/chat-logs/export")
+async def export_chat_logs(
+    start: datetime,
+    end: datetime,
+    household_id: Optional[str] = None,
+    admin: AuthenticatedUser = Depends(get_current_admin_user),
+):
+    if _utc_naive(end) <= _utc_naive(start):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="end must be after start")
+    file_name = f"chat-logs-{start:%Y%m%d}-{end:%Y%m%d}.ndjson"
+    return StreamingResponse(
+        stream_chat_log_lines(get_async_engine(), start, end, household_id=household_id),
+        media_type="application/x-ndjson",
+        headers={"Content-Disposition": f'attachment; filename="{file_name}"'},
+    )
+
+
+@router.get("/admin/chat-logs/{log_id}", response_model=ChatLogDetail)
+async def get_chat_log(
+    log_id: UUID,
+    admin: AuthenticatedUser = Depends(get_current_admin_user),
+    settings: Settings = Depends(get_settings),
+):
+    async with async_session_scope() as session:
+        log = await crud_async.get_chat_log(session, str(log_id))
+    if log is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Chat log not found")
+    refs = log.context_refs or []
+    context: list[ChatLogContext] = []
+    if refs:
+        store = build_vector_store(settings=settings, session_factory=SessionLocal)
+        context = await asyncio.to_thread(rehydrate_context, refs, store)
+    return ChatLogDetail(**_entry_fields(log), context=context)
@@ -1,15 +1,17 @@
 """Family profile CRUD endpoints."""
 from __future__ import annotations
 
+from dataclasses import asdict
 from typing import Optional
 
 from fastapi import APIRouter, Depends, HTTPException, status
 from pydantic import BaseModel, Field
 
-from app.core.security import create_access_token
+from app.core.security import create_access_token, hash_password
 from app.core.settings import Settings, get_settings
-from app.db import crud
-from app.db.session import session_scope
+from app.db import crud_async
+from app.db.profiles import get_household_profile
+from app.db.session import async_session_scope
 
 router = APIRouter()
 
@@ -42,22 +44,23 @@ class ProfileUpdatePayload(BaseModel):
 
 @router.post("/profile", response_model=ProfileResponse, status_code=status.HTTP_201_CREATED)
 async def create_profile(payload: ProfileCreatePayload, settings: Settings = Depends(get_settings)) -> ProfileResponse:
-    with session_scope() as session:
-        household = crud.upsert_household(
+    password_hash = await hash_password(payload.parent_password)
+    async with async_session_scope() as session:
+        household = await crud_async.upsert_household(
             session,
             name=payload.household_name,
             country=payload.country,
             language_preference=payload.language_preference,
         )
-        parent = crud.create_parent_user(
+        parent = await crud_async.create_parent_user(
             session,
             household=household,
             email=payload.parent_email,
-            password=payload.parent_password,
+            password_hash=password_hash,
             is_admin=True,
         )
         for child in payload.children:
-            crud.upsert_child(
+            await crud_async.upsert_child(
                 session,
                 household_id=household.id,
                 name=child.name,
@@ -74,40 +77,31 @@ async def create_profile(payload: ProfileCreatePayload, settings: Settings = Dep
 
 @router.get("/profile/{household_id}")
 async def get_profile(household_id: str):
-    with session_scope() as session:
-        household = crud.get_household(session, household_id)
-        if not household:
-            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Household not found")
-        return {
-            "household": {
-                "id": household.id,
-                "name": household.name,
-                "country": household.country,
-                "language_preference": household.language_preference,
-            },
-            "children": [
-                {
-                    "id": child.id,
-                    "name": child.name,
-                    "age": child.age,
-                    "favorite_topics": child.favorite_topics,
-                }
-                for child in household.children
-            ],
-        }
+    profile = await get_household_profile(household_id)
+    if profile is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Household not found")
+    return {
+        "household": {
+            "id": profile.id,
+            "name": profile.name,
+            "country": profile.country,
+            "language_preference": profile.language_preference,
+        },
+        "children": [asdict(child) for child in profile.children],
+    }
 
 
 @router.put("/profile/{household_id}")
 async def update_profile(household_id: str, payload: ProfileUpdatePayload):
-    with session_scope() as session:
-        household = crud.get_household(session, household_id)
+    async with async_session_scope() as session:
+        household = await crud_async.get_household(session, household_id)
         if not household:
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Household not found")
-        if payload.household_name:
-            household.name = payload.household_name
-        if payload.language_preference:
-            household.language_preference = payload.language_preference
-        if payload.country:
-            household.country = payload.country
-        session.flush()
+        await crud_async.update_household(
+            session,
+            household,
+            name=payload.household_name,
+            country=payload.country,
+            language_preference=payload.language_preference,
+        )
         return {"status": "updated"}
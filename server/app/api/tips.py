@@ -1,22 +1,28 @@
 """Endpoints serving daily parenting tips."""
 from __future__ import annotations
 
-import random
+from datetime import datetime, timezone
 
-from fastapi import APIRouter, Depends, Query
+from fastapi import APIRouter, Query, Request, Response, status
 
-from app.core.settings import Settings, get_settings
+from app.rag.tips import MAX_TIPS_PER_RESPONSE, TipRotation
 
 router = APIRouter()
 
 
 @router.get("/tips")
 async def get_tips(
+    request: Request,
     age_range: str = Query(default="all", description="Age band, e.g. 0-2"),
-    limit: int = Query(default=3, ge=1, le=5),
-    settings: Settings = Depends(get_settings),
-):
-    bucket = settings.default_daily_tips.get(age_range) or settings.default_daily_tips.get("all", [])
-    tips = bucket[:]
-    random.shuffle(tips)
-    return {"age_range": age_range, "tips": tips[:limit]}
+    language: str = Query(default="ar", description="Corpus language, e.g. ar or en"),
+    limit: int = Query(default=3, ge=1, le=MAX_TIPS_PER_RESPONSE),
+) -> Response:
+    # Served from the precomputed daily rotation: no database or model call on this path.
+    rotation: TipRotation = request.app.state.tips
+    index = rotation.index
+    payload = index.lookup(age_range, language, limit)
+    max_age = max(60, int((index.expires_at - datetime.now(timezone.utc)).total_seconds()))
+    headers = {"ETag": payload.etag, "Cache-Control": f"public, max-age={max_age}, stale-while-revalidate=300"}
+    if payload.etag in request.headers.get("if-none-match", ""):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return Response(content=payload.body, media_type="application/json", headers=headers)
@@ -1,17 +1,32 @@
 """Admin-only upload and corpus management endpoints."""
 from __future__ import annotations
 
+import asyncio
+import base64
+import json
 from datetime import datetime
-
-from fastapi import APIRouter, Depends, File, Form, HTTPException, UploadFile, status
+from typing import Optional
+
+from fastapi import (
+    APIRouter,
+    Depends,
+    File,
+    Form,
+    HTTPException,
+    Query,
+    Request,
+    UploadFile,
+    status,
+)
 from pydantic import BaseModel
 
 from app.core.openai_client import OpenAIClient
 from app.core.security import AuthenticatedUser, get_current_admin_user
 from app.core.settings import Settings, get_settings
-from app.db import crud, models
-from app.db.session import SessionLocal
-from app.rag.ingest import build_vector_store, ingest_upload
+from app.db import crud_async
+from app.db.session import SessionLocal, async_session_scope
+from app.rag.ingest import build_vector_store, promote_duplicates, spool_upload
+from app.rag.jobs import IngestJobNotRetryable, IngestJobQueue, IngestQueueFull
 
 router = APIRouter()
 
@@ -29,23 +44,50 @@ class DocumentEntry(BaseModel):
     updated_at: datetime
 
 
+class DocumentPage(BaseModel):
+    items: list[DocumentEntry]
+    next_cursor: Optional[str] = None
+
+
+class IngestJobEntry(BaseModel):
+    job_id: str
+    status: str
+    file_name: str
+    document_id: Optional[str] = None
+    chunks_total: int
+    chunks_embedded: int
+    chunks_stored: int
+    error: Optional[str] = None
+    created_at: datetime
+    updated_at: datetime
+
 
-async def get_openai_client(settings: Settings = Depends(get_settings)) -> OpenAIClient:
-    return OpenAIClient(settings)
+class DuplicateEntry(BaseModel):
+    chunk_id: str
+    document_id: str
+    file_name: str
+    canonical_chunk_id: str
+    canonical_document_id: str
+    canonical_file_name: Optional[str] = None
+    similarity: float
+    preview: str
+    updated_at: datetime
 
 
-@router.post("/admin/upload")
+@router.post("/admin/upload", status_code=status.HTTP_202_ACCEPTED)
 async def upload_document(
+    request: Request,
     file: UploadFile = File(...),
     topic: str = Form(default="general"),
     age_range: str = Form(default="all"),
     tone: str = Form(default="supportive"),
     country: str = Form(default="jo"),
     language: str = Form(default="ar"),
+    document_id: str | None = Form(default=None),
     admin: AuthenticatedUser = Depends(get_current_admin_user),
     settings: Settings = Depends(get_settings),
-    client: OpenAIClient = Depends(get_openai_client),
 ):
+    jobs: IngestJobQueue = request.app.state.ingest_jobs
     overrides = {
         "topic": topic,
         "age_range": age_range,
@@ -53,38 +95,123 @@ async def upload_document(
         "country": country,
         "language": language,
     }
-    result = await ingest_upload(
-        file=file,
-        overrides=overrides,
-        session_factory=SessionLocal,
-        settings=settings,
-        openai_client=client,
+    spool_path = await spool_upload(file=file, settings=settings)
+    try:
+        job_id = await jobs.submit(
+            file_name=file.filename or "uploaded.md",
+            spool_path=spool_path,
+            overrides=overrides,
+            document_id=document_id or None,
+        )
+    except IngestQueueFull as exc:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=str(exc)) from exc
+    return {"job_id": job_id, "status": "queued"}
+
+
+@router.get("/admin/jobs/{job_id}", response_model=IngestJobEntry)
+async def get_ingest_job(job_id: str, admin: AuthenticatedUser = Depends(get_current_admin_user)):
+    async with async_session_scope() as session:
+        job = await crud_async.get_ingest_job(session, job_id)
+    if job is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Job not found")
+    return IngestJobEntry(
+        job_id=job.id,
+        status=job.status,
+        file_name=job.file_name,
+        document_id=job.document_id,
+        chunks_total=job.chunks_total,
+        chunks_embedded=job.chunks_embedded,
+        chunks_stored=job.chunks_stored,
+        error=job.error,
+        created_at=job.created_at,
+        updated_at=job.updated_at,
     )
-    return {"document_id": result.document_id, "stored_chunks": result.stored_chunks}
 
 
-@router.get("/admin/documents", response_model=list[DocumentEntry])
-async def list_documents(admin: AuthenticatedUser = Depends(get_current_admin_user)):
-    session = SessionLocal()
+@router.post("/admin/jobs/{job_id}/retry", status_code=status.HTTP_202_ACCEPTED)
+async def retry_ingest_job(request: Request, job_id: str, admin: AuthenticatedUser = Depends(get_current_admin_user)):
+    jobs: IngestJobQueue = request.app.state.ingest_jobs
+    try:
+        await jobs.retry(job_id)
+    except IngestJobNotRetryable as exc:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(exc)) from exc
+    except IngestQueueFull as exc:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=str(exc)) from exc
+    return {"job_id": job_id, "status": "queued"}
+
+
+def encode_cursor(updated_at: datetime, document_id: str) -> str:
+    """Opaque page token for the last document of a listing page."""
+
+    payload = json.dumps([updated_at.isoformat(), document_id]).encode("utf-8")
+    return base64.urlsafe_b64encode(payload).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, str]:
     try:
-        records = crud.list_documents(session)
-        return [
-            DocumentEntry(
-                document_id=doc.document_id,
-                file_name=doc.file_name,
-                topic=doc.topic,
-                age_range=doc.age_range,
-                tone=doc.tone,
-                country=doc.country,
-                language=doc.language,
-                chunk_count=doc.chunk_count,
-                s3_uploaded=doc.s3_uploaded,
-                updated_at=doc.updated_at,
-            )
-            for doc in records
-        ]
-    finally:
-        session.close()
+        padded = cursor + "=" * (-len(cursor) % 4)
+        updated_at, document_id = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        return datetime.fromisoformat(updated_at), str(document_id)
+    except (ValueError, TypeError) as exc:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor") from exc
+
+
+@router.get("/admin/documents", response_model=DocumentPage)
+async def list_documents(
+    limit: int = Query(default=50, ge=1, le=500),
+    cursor: Optional[str] = None,
+    topic: Optional[str] = None,
+    age_range: Optional[str] = None,
+    language: Optional[str] = None,
+    admin: AuthenticatedUser = Depends(get_current_admin_user),
+):
+    after = decode_cursor(cursor) if cursor else None
+    async with async_session_scope() as session:
+        # One extra row tells us whether another page follows without a count query.
+        records = await crud_async.list_documents(
+            session, limit=limit + 1, after=after, topic=topic, age_range=age_range, language=language
+        )
+    page = records[:limit]
+    next_cursor = encode_cursor(page[-1].updated_at, page[-1].document_id) if len(records) > limit else None
+    items = [
+        DocumentEntry(
+            document_id=doc.document_id,
+            file_name=doc.file_name,
+            topic=doc.topic,
+            age_range=doc.age_range,
+            tone=doc.tone,
+            country=doc.country,
+            language=doc.language,
+            chunk_count=doc.chunk_count,
+            s3_uploaded=doc.s3_uploaded,
+            updated_at=doc.updated_at,
+        )
+        for doc in page
+    ]
+    return DocumentPage(items=items, next_cursor=next_cursor)
+
+
+@router.get("/admin/duplicates", response_model=list[DuplicateEntry])
+async def list_duplicates(
+    limit: int = Query(default=200, ge=1, le=1000),
+    admin: AuthenticatedUser = Depends(get_current_admin_user),
+):
+    async with async_session_scope() as session:
+        rows = await crud_async.list_chunk_duplicates(session, limit=limit)
+    return [
+        DuplicateEntry(
+            chunk_id=duplicate.chunk_id,
+            document_id=duplicate.document_id,
+            file_name=duplicate.file_name,
+            canonical_chunk_id=duplicate.canonical_chunk_id,
+            canonical_document_id=duplicate.canonical_document_id,
+            canonical_file_name=canonical_file_name,
+            similarity=duplicate.similarity,
+            preview=duplicate.preview,
+            updated_at=duplicate.updated_at,
+        )
+        for duplicate, canonical_file_name in rows
+    ]
 
 
 @router.delete("/admin/documents/{document_id}", status_code=status.HTTP_204_NO_CONTENT)
@@ -93,24 +220,26 @@ async def delete_document(
     admin: AuthenticatedUser = Depends(get_current_admin_user),
     settings: Settings = Depends(get_settings),
 ):
-    session = SessionLocal()
-    try:
-        registry = session.get(models.DocumentRegistry, document_id)
-        chunk_ids = crud.get_chunk_ids_by_document(session, document_id)
-    finally:
-        session.close()
+    async with async_session_scope() as session:
+        registry = await crud_async.get_document_registry(session, document_id)
+    store = build_vector_store(settings=settings, session_factory=SessionLocal)
+    chunk_ids = await asyncio.to_thread(store.list_chunk_ids, document_id)
 
     if not registry and not chunk_ids:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Document not found")
 
-    session = SessionLocal()
-    try:
-        crud.delete_document_metadata(session, document_id)
-        crud.delete_document_registry(session, document_id)
-        session.commit()
-    finally:
-        session.close()
+    async def embed(texts: list[str]) -> list[list[float]]:
+        return await OpenAIClient(settings).embed_texts(texts)
+
+    # Other documents' duplicates of these chunks need a stored copy before the canonicals go.
+    await promote_duplicates(
+        canonical_ids=chunk_ids, document_id=document_id, store=store, session_factory=SessionLocal, embed=embed
+    )
+    async with async_session_scope() as session:
+        await crud_async.delete_document_metadata(session, document_id)
+        await crud_async.delete_chunk_signatures(session, chunk_ids)
+        await crud_async.prune_chunk_duplicates(session, document_id)
+        await crud_async.delete_document_registry(session, document_id)
 
     if not settings.is_pgvector and chunk_ids:
-        store = build_vector_store(settings=settings, session_factory=SessionLocal)
-        store.delete(chunk_ids)
+        await asyncio.to_thread(store.delete, chunk_ids)
@@ -0,0 +1,208 @@
+"""Open-loop load test of ``/api/chat`` with per-stage latency percentiles.
+
+Sends Arabic parenting questions, in Modern Standard Arabic and Jordanian
+dialect, with both personas, at ``--rate`` requests per second. Arrival gaps
+are exponential, as from many independent parents. Requests are spread over
+``--threads`` conversations so the history grows the way it does in
+production. Latency is timed from when each request was due, so a server that
+falls behind shows it. The report has throughput, status counts and end-to-end
+p50/p95/p99. It also has p50/p95/p99 for each chat stage, estimated from the
+``/metrics`` histograms the server recorded during the measured window. Run
+it against the bundled fake OpenAI server so numbers are comparable between
+changes:
+
+    python -m app.bench.fake_openai --port 8100 &
+    OPENAI_BASE_URL=http://127.0.0.1:8100/v1 OPENAI_API_KEY=sk-fake uvicorn app.main:app --port 8000 &
+    python -m app.bench.chat_load --url http://127.0.0.1:8000 --rate 20 --duration 60 --json
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import random
+import re
+import statistics
+import time
+from collections import Counter, defaultdict
+
+import httpx
+
+QUESTIONS = (
+    "كيف أساعد طفلي على النوم في موعد ثابت كل ليلة؟",
+    "ابني عمره أربع سنوات ويغضب بسرعة عندما نرفض طلبه، ماذا أفعل؟",
+    "كم ساعة يمكن أن يقضيها طفل في السادسة أمام الشاشات يومياً؟",
+    "بنتي بتخاف تنام لحالها، شو بعمل عشان أساعدها؟",
+    "ابني ما بحب ياكل خضرة أبداً، كيف أشجعه؟",
+    "كيف أتحدث مع طفلي عن قدوم أخ جديد إلى العائلة؟",
+    "طفلي يرفض الذهاب إلى الروضة ويبكي كل صباح، كيف أتعامل مع ذلك؟",
+    "شو أحسن طريقة أعلّم فيها ابني يرتب ألعابه؟",
+    "كيف أعزز ثقة ابنتي بنفسها في المدرسة؟",
+    "ابني بضرب أخوه الصغير لما يزعل، كيف أوقف هالتصرف؟",
+    "ما الأنشطة المناسبة لتنمية لغة طفل عمره سنتان؟",
+    "كيف أشرح لطفلي معنى المشاركة دون أن أجبره؟",
+)
+STAGE_METRIC = "family_ai_chat_stage_seconds"
+_SAMPLE_RE = re.compile(r'^(?P<name>[a-zA-Z_:][\w:]*)(?:\{(?P<labels>[^}]*)\})?\s+(?P<value>\S+)$')
+_LABEL_RE = re.compile(r'(\w+)="((?:[^"\\]|\\.)*)"')
+
+
+def _percentile(values: list[float], fraction: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))] if ordered else 0.0
+
+
+def parse_histogram(text: str, name: str, label: str) -> dict[str, dict[float, float]]:
+    """Cumulative bucket counts of histogram ``name`` per value of ``label``."""
+
+    series: dict[str, dict[float, float]] = defaultdict(dict)
+    for line in text.splitlines():
+        match = _SAMPLE_RE.match(line)
+        if not match or match.group("name") != f"{name}_bucket":
+            continue
+        labels = dict(_LABEL_RE.findall(match.group("labels") or ""))
+        series[labels.get(label, "")][float(labels["le"])] = float(match.group("value"))
+    return dict(series)
+
+
+def histogram_quantile(fraction: float, buckets: dict[float, float]) -> float:
+    """Interpolate a quantile from cumulative buckets, as Prometheus ``histogram_quantile`` does."""
+
+    bounds = sorted(buckets)
+    total = buckets[bounds[-1]] if bounds else 0.0
+    if total <= 0:
+        return 0.0
+    rank = fraction * total
+    lower_bound, lower_count = 0.0, 0.0
+    for bound in bounds:
+        count = buckets[bound]
+        if count >= rank:
+            if bound == float("inf"):
+                return lower_bound
+            if count == lower_count:
+                return bound
+            return lower_bound + (bound - lower_bound) * (rank - lower_count) / (count - lower_count)
+        lower_bound, lower_count = bound, count
+    return lower_bound
+
+
+def stage_percentiles(before: str, after: str) -> dict[str, dict[str, float | int]]:
+    """p50/p95/p99 in ms per chat stage, from the observations made between two scrapes."""
+
+    start = parse_histogram(before, STAGE_METRIC, "stage")
+    end = parse_histogram(after, STAGE_METRIC, "stage")
+    report = {}
+    for stage, buckets in end.items():
+        delta = {bound: count - start.get(stage, {}).get(bound, 0.0) for bound, count in buckets.items()}
+        observations = int(delta.get(float("inf"), 0))
+        if observations:
+            report[stage] = {
+                "count": observations,
+                **{f"p{q}_ms": round(histogram_quantile(q / 100, delta) * 1000, 1) for q in (50, 95, 99)},
+            }
+    return report
+
+
+async def _drive(
+    client: httpx.AsyncClient, *, rate: float, duration: float, threads: int, rng: random.Random
+) -> tuple[list[float], Counter, float]:
+    thread_ids = [f"load-{rng.getrandbits(32):08x}" for _ in range(threads)]
+    latencies: list[float] = []
+    statuses: Counter = Counter()
+
+    async def one(due: float, body: dict[str, str]) -> None:
+        try:
+            response = await client.post("/api/chat", json=body)
+            statuses[str(response.status_code)] += 1
+            if response.status_code == 200:
+                latencies.append(time.perf_counter() - due)
+        except httpx.HTTPError as exc:
+            statuses[type(exc).__name__] += 1
+
+    tasks = []
+    started = time.perf_counter()
+    due = started
+    while due < started + duration:
+        await asyncio.sleep(max(0.0, due - time.perf_counter()))
+        body = {
+            "message": rng.choice(QUESTIONS),
+            "persona": rng.choice(["neutral", "yazan"]),
+            "language": rng.choice(["msa", "jordanian"]),
+            "thread_id": rng.choice(thread_ids),
+        }
+        tasks.append(asyncio.create_task(one(due, body)))
+        due += rng.expovariate(rate)
+    await asyncio.gather(*tasks)
+    return latencies, statuses, time.perf_counter() - started
+
+
+async def run(
+    url: str, *, rate: float, duration: float, warmup: float, threads: int, connections: int, timeout: float, seed: int
+) -> dict[str, object]:
+    rng = random.Random(seed)
+    limits = httpx.Limits(max_connections=connections, max_keepalive_connections=connections)
+    async with httpx.AsyncClient(base_url=url, limits=limits, timeout=timeout) as client:
+        if warmup:
+            await _drive(client, rate=rate, duration=warmup, threads=threads, rng=rng)
+        before = (await client.get("/metrics")).text
+        latencies, statuses, elapsed = await _drive(client, rate=rate, duration=duration, threads=threads, rng=rng)
+        after = (await client.get("/metrics")).text
+
+    sent = sum(statuses.values())
+    return {
+        "url": url,
+        "offered_rate": rate,
+        "duration_s": round(elapsed, 2),
+        "requests": sent,
+        "statuses": dict(statuses),
+        "throughput_per_s": round(len(latencies) / elapsed, 2),
+        "error_ratio": round(1 - len(latencies) / sent, 4) if sent else 0.0,
+        "latency_p50_ms": round(statistics.median(latencies) * 1000, 1) if latencies else 0.0,
+        "latency_p95_ms": round(_percentile(latencies, 0.95) * 1000, 1),
+        "latency_p99_ms": round(_percentile(latencies, 0.99) * 1000, 1),
+        "stages": stage_percentiles(before, after),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://127.0.0.1:8000", help="API root serving /api/chat and /metrics")
+    parser.add_argument("--rate", type=float, default=10.0, help="Offered load in requests per second")
+    parser.add_argument("--duration", type=float, default=30.0, help="Seconds of measured traffic")
+    parser.add_argument("--warmup", type=float, default=5.0, help="Seconds of unmeasured traffic first")
+    parser.add_argument("--threads", type=int, default=200, help="Distinct chat threads to spread requests over")
+    parser.add_argument("--connections", type=int, default=256, help="Maximum open HTTP connections")
+    parser.add_argument("--timeout", type=float, default=60.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON")
+    args = parser.parse_args()
+
+    report = asyncio.run(
+        run(
+            args.url,
+            rate=args.rate,
+            duration=args.duration,
+            warmup=args.warmup,
+            threads=args.threads,
+            connections=args.connections,
+            timeout=args.timeout,
+            seed=args.seed,
+        )
+    )
+    if args.json:
+        print(json.dumps(report, indent=2, ensure_ascii=False))
+        return
+    print(
+        f"{report['requests']} requests at {report['offered_rate']}/s over {report['duration_s']}s"
+        f" | {report['throughput_per_s']} ok/s | statuses {report['statuses']}"
+    )
+    print(
+        f"end-to-end p50 {report['latency_p50_ms']:.1f}ms p95 {report['latency_p95_ms']:.1f}ms"
+        f" p99 {report['latency_p99_ms']:.1f}ms"
+    )
+    for stage, row in report["stages"].items():
+        print(f"  {stage:>14} | p50 {row['p50_ms']:8.1f}ms p95 {row['p95_ms']:8.1f}ms p99 {row['p99_ms']:8.1f}ms ({row['count']})")
+
+
+if __name__ == "__main__":
+    main()
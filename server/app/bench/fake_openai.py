@@ -0,0 +1,229 @@
+"""Local stand-in for the OpenAI chat-completions and embeddings endpoints.
+
+Lets ``/api/chat`` be load-tested without spending money or measuring the
+network. Point the API at it with ``OPENAI_BASE_URL=http://localhost:8100/v1``
+(any ``OPENAI_API_KEY`` is accepted). Behaviour:
+
+* Each request first waits a delay drawn from a seeded distribution:
+  ``fixed``, ``uniform`` (median +/- spread), ``normal`` (spread is the
+  standard deviation) or ``lognormal`` (spread is sigma). Chat and
+  embeddings have separate settings; for chat it is the time to the first word.
+* Embeddings are deterministic. Each text seeds its own unit vector, so the
+  same text always embeds the same way and repeated runs retrieve the same
+  chunks. ``dimensions`` is honoured, and the size otherwise follows the model
+  (3072 for ``*-large``, 1536 otherwise).
+* Chat replies are canned Arabic text of ``--reply-words`` words. With
+  ``"stream": true`` they arrive as server-sent ``chat.completion.chunk``
+  events, one word every ``--stream-token-ms``.
+* ``--error-rate`` fails that share of requests with HTTP 500, to exercise
+  retries and error handling.
+
+    python -m app.bench.fake_openai --port 8100 --chat-latency-ms 800 --chat-distribution lognormal
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import hashlib
+import json
+import random
+import time
+import uuid
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Literal
+
+import numpy as np
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+Distribution = Literal["fixed", "uniform", "normal", "lognormal"]
+
+REPLY_WORDS = (
+    "من الطبيعي أن يمر الطفل بهذه المرحلة، وجرّبوا روتيناً ثابتاً قبل النوم مع قصة قصيرة "
+    "وحديث هادئ عن يومه، وامدحوا كل خطوة صغيرة ينجزها بنفسه، واحرصوا على الصبر والاتساق "
+    "بين الوالدين، وإذا استمرت الصعوبة لأسابيع فاستشيروا طبيب الأطفال أو مختصاً موثوقاً."
+).split()
+
+
+@dataclass(frozen=True)
+class LatencyModel:
+    """Per-request delay: ``median_ms`` shaped by ``distribution`` and ``spread``."""
+
+    median_ms: float = 0.0
+    distribution: Distribution = "fixed"
+    spread: float = 0.0
+
+    def sample(self, rng: random.Random) -> float:
+        """One delay in seconds, never negative."""
+
+        if self.distribution == "uniform":
+            delay = rng.uniform(self.median_ms - self.spread, self.median_ms + self.spread)
+        elif self.distribution == "normal":
+            delay = rng.gauss(self.median_ms, self.spread)
+        elif self.distribution == "lognormal":
+            delay = rng.lognormvariate(0.0, self.spread) * self.median_ms
+        else:
+            delay = self.median_ms
+        return max(0.0, delay) / 1000
+
+
+@dataclass(frozen=True)
+class FakeOpenAIConfig:
+    chat_latency: LatencyModel = LatencyModel()
+    embedding_latency: LatencyModel = LatencyModel()
+    reply_words: int = 60
+    stream_token_ms: float = 0.0
+    error_rate: float = 0.0
+    seed: int = 0
+
+
+def embedding_size(model: str, dimensions: int | None) -> int:
+    if dimensions:
+        return dimensions
+    return 3072 if model.endswith("-large") else 1536
+
+
+def fake_embedding(text: str, size: int) -> list[float]:
+    """A unit vector that depends only on ``text`` and ``size``."""
+
+    seed = int.from_bytes(hashlib.blake2b(text.encode("utf-8"), digest_size=8).digest(), "little")
+    vector = np.random.default_rng(seed).standard_normal(size).astype(np.float32)
+    vector /= max(float(np.linalg.norm(vector)), 1e-12)
+    return vector.tolist()
+
+
+def _word_count(messages: list[dict[str, Any]]) -> int:
+    return sum(len(str(message.get("content") or "").split()) for message in messages)
+
+
+def create_app(config: FakeOpenAIConfig | None = None) -> FastAPI:
+    config = config or FakeOpenAIConfig()
+    rng = random.Random(config.seed)
+    app = FastAPI(title="Fake OpenAI")
+    app.state.requests = {"chat": 0, "embeddings": 0, "errors": 0}
+
+    def _injected_error() -> JSONResponse | None:
+        if config.error_rate and rng.random() < config.error_rate:
+            app.state.requests["errors"] += 1
+            error = {"message": "Injected failure", "type": "server_error", "code": None, "param": None}
+            return JSONResponse(status_code=500, content={"error": error})
+        return None
+
+    @app.post("/v1/embeddings")
+    async def embeddings(request: Request) -> JSONResponse:
+        body = await request.json()
+        app.state.requests["embeddings"] += 1
+        await asyncio.sleep(config.embedding_latency.sample(rng))
+        if (error := _injected_error()) is not None:
+            return error
+        texts = body["input"] if isinstance(body["input"], list) else [body["input"]]
+        size = embedding_size(body.get("model", ""), body.get("dimensions"))
+        data = [
+            {"object": "embedding", "index": index, "embedding": fake_embedding(str(text), size)}
+            for index, text in enumerate(texts)
+        ]
+        tokens = sum(len(str(text).split()) for text in texts)
+        return JSONResponse(
+            {
+                "object": "list",
+                "data": data,
+                "model": body.get("model", ""),
+                "usage": {"prompt_tokens": tokens, "total_tokens": tokens},
+            }
+        )
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        body = await request.json()
+        app.state.requests["chat"] += 1
+        await asyncio.sleep(config.chat_latency.sample(rng))
+        if (error := _injected_error()) is not None:
+            return error
+        words = [REPLY_WORDS[index % len(REPLY_WORDS)] for index in range(config.reply_words)]
+        completion_id = f"chatcmpl-{uuid.uuid4().hex[:24]}"
+        created = int(time.time())
+        model = body.get("model", "")
+        prompt_tokens = _word_count(body.get("messages", []))
+        usage = {"prompt_tokens": prompt_tokens, "completion_tokens": len(words), "total_tokens": prompt_tokens + len(words)}
+
+        if body.get("stream"):
+
+            async def events() -> AsyncIterator[bytes]:
+                def chunk(delta: dict[str, str], finish_reason: str | None) -> bytes:
+                    payload = {
+                        "id": completion_id,
+                        "object": "chat.completion.chunk",
+                        "created": created,
+                        "model": model,
+                        "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+                    }
+                    return f"data: {json.dumps(payload, ensure_ascii=False)}\n\n".encode("utf-8")
+
+                yield chunk({"role": "assistant", "content": ""}, None)
+                for index, word in enumerate(words):
+                    if config.stream_token_ms:
+                        await asyncio.sleep(config.stream_token_ms / 1000)
+                    yield chunk({"content": word if index == 0 else f" {word}"}, None)
+                yield chunk({}, "stop")
+                yield b"data: [DONE]\n\n"
+
+            return StreamingResponse(events(), media_type="text/event-stream")
+
+        # Without streaming the whole reply is held back, as the real API does.
+        await asyncio.sleep(config.stream_token_ms * len(words) / 1000)
+        return JSONResponse(
+            {
+                "id": completion_id,
+                "object": "chat.completion",
+                "created": created,
+                "model": model,
+                "choices": [
+                    {
+                        "index": 0,
+                        "message": {"role": "assistant", "content": " ".join(words)},
+                        "finish_reason": "stop",
+                    }
+                ],
+                "usage": usage,
+            }
+        )
+
+    @app.get("/v1/stats")
+    async def stats() -> dict[str, int]:
+        return dict(app.state.requests)
+
+    return app
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    distributions = ["fixed", "uniform", "normal", "lognormal"]
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8100)
+    parser.add_argument("--chat-latency-ms", type=float, default=800.0, help="Median time to the first token")
+    parser.add_argument("--chat-distribution", choices=distributions, default="lognormal")
+    parser.add_argument("--chat-spread", type=float, default=0.4, help="ms for uniform/normal, sigma for lognormal")
+    parser.add_argument("--embedding-latency-ms", type=float, default=120.0)
+    parser.add_argument("--embedding-distribution", choices=distributions, default="lognormal")
+    parser.add_argument("--embedding-spread", type=float, default=0.3)
+    parser.add_argument("--reply-words", type=int, default=60)
+    parser.add_argument("--stream-token-ms", type=float, default=0.0, help="Delay between words of a reply")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Share of requests answered with HTTP 500")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    import uvicorn
+
+    config = FakeOpenAIConfig(
+        chat_latency=LatencyModel(args.chat_latency_ms, args.chat_distribution, args.chat_spread),
+        embedding_latency=LatencyModel(args.embedding_latency_ms, args.embedding_distribution, args.embedding_spread),
+        reply_words=args.reply_words,
+        stream_token_ms=args.stream_token_ms,
+        error_rate=args.error_rate,
+        seed=args.seed,
+    )
+    uvicorn.run(create_app(config), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
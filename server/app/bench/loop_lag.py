@@ -0,0 +1,136 @@
+"""Event-loop lag under a mixed chat-history workload, sync vs async sessions.
+
+Runs concurrent "requests" that each read a thread's history and, for a share of
+them, append a user/assistant turn, exactly as the chat endpoint does. A ticker
+task sleeps in short intervals and records how late it wakes up: with blocking
+``session_scope`` calls inside coroutines the lag grows with every query, while
+the ``async_session_scope`` path should keep it near the timer resolution.
+Uses ``DATABASE_URL`` (Postgres or a file-backed SQLite).
+
+    python -m app.bench.loop_lag --requests 2000 --concurrency 32
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import random
+import statistics
+import time
+import uuid
+
+from app.db import crud, crud_async
+from app.db.session import async_engine, async_session_scope, init_db, session_scope
+
+TICK_SECONDS = 0.005
+
+
+async def _sync_request(thread_id: str, write: bool) -> None:
+    with session_scope() as session:
+        crud.fetch_history(session, thread_id)
+    if write:
+        with session_scope() as session:
+            crud.log_turn(session, thread_id, "user", "كيف أساعد طفلي على النوم؟")
+            crud.log_turn(session, thread_id, "assistant", "جرّبوا روتيناً ثابتاً قبل النوم.")
+
+
+async def _async_request(thread_id: str, write: bool) -> None:
+    async with async_session_scope() as session:
+        await crud_async.fetch_history(session, thread_id)
+    if write:
+        async with async_session_scope() as session:
+            await crud_async.log_turn(session, thread_id, "user", "كيف أساعد طفلي على النوم؟")
+            await crud_async.log_turn(session, thread_id, "assistant", "جرّبوا روتيناً ثابتاً قبل النوم.")
+
+
+async def _ticker(lags: list[float], stop: asyncio.Event) -> None:
+    loop = asyncio.get_running_loop()
+    while not stop.is_set():
+        expected = loop.time() + TICK_SECONDS
+        await asyncio.sleep(TICK_SECONDS)
+        lags.append(max(0.0, loop.time() - expected))
+
+
+def _percentile(values: list[float], fraction: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))] if ordered else 0.0
+
+
+async def run_mode(mode: str, *, requests: int, concurrency: int, write_ratio: float, threads: int) -> dict[str, float | int | str]:
+    handler = _async_request if mode == "async" else _sync_request
+    rng = random.Random(0)
+    thread_ids = [f"bench-{uuid.uuid4().hex[:8]}" for _ in range(threads)]
+    jobs = [(rng.choice(thread_ids), rng.random() < write_ratio) for _ in range(requests)]
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies: list[float] = []
+
+    async def one(thread_id: str, write: bool) -> None:
+        async with semaphore:
+            started = time.perf_counter()
+            await handler(thread_id, write)
+            latencies.append(time.perf_counter() - started)
+
+    lags: list[float] = []
+    stop = asyncio.Event()
+    ticker = asyncio.create_task(_ticker(lags, stop))
+    started = time.perf_counter()
+    await asyncio.gather(*(one(thread_id, write) for thread_id, write in jobs))
+    elapsed = time.perf_counter() - started
+    stop.set()
+    await ticker
+
+    return {
+        "mode": mode,
+        "requests": requests,
+        "concurrency": concurrency,
+        "requests_per_s": round(requests / elapsed, 1),
+        "latency_p50_ms": round(statistics.median(latencies) * 1000, 2),
+        "latency_p99_ms": round(_percentile(latencies, 0.99) * 1000, 2),
+        "loop_lag_p50_ms": round(_percentile(lags, 0.5) * 1000, 2),
+        "loop_lag_p99_ms": round(_percentile(lags, 0.99) * 1000, 2),
+        "loop_lag_max_ms": round(max(lags, default=0.0) * 1000, 2),
+        "ticks": len(lags),
+    }
+
+
+async def run(modes: list[str], **options: float | int) -> list[dict[str, float | int | str]]:
+    try:
+        return [await run_mode(mode, **options) for mode in modes]
+    finally:
+        await async_engine.dispose()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--modes", nargs="+", choices=["sync", "async"], default=["sync", "async"])
+    parser.add_argument("--requests", type=int, default=2_000)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--write-ratio", type=float, default=0.3, help="Share of requests that also log a turn")
+    parser.add_argument("--threads", type=int, default=50, help="Distinct chat threads to spread requests over")
+    parser.add_argument("--json", action="store_true", help="Print results as JSON")
+    args = parser.parse_args()
+
+    init_db()
+    results = asyncio.run(
+        run(
+            args.modes,
+            requests=args.requests,
+            concurrency=args.concurrency,
+            write_ratio=args.write_ratio,
+            threads=args.threads,
+        )
+    )
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    for row in results:
+        print(
+            f"{row['mode']:>5} | {row['requests_per_s']:>7.1f} req/s"
+            f" | latency p50 {row['latency_p50_ms']:.1f}ms p99 {row['latency_p99_ms']:.1f}ms"
+            f" | loop lag p50 {row['loop_lag_p50_ms']:.1f}ms p99 {row['loop_lag_p99_ms']:.1f}ms"
+            f" max {row['loop_lag_max_ms']:.1f}ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+"""Throughput benchmark for pgvector chunk upserts and deletes.
+
+Compares the per-row ``session.merge`` path the store used to take with the
+set-based ``INSERT ... ON CONFLICT`` / ``DELETE ... WHERE`` path, for documents
+of different sizes. Requires ``DATABASE_URL`` to point at Postgres with pgvector.
+
+    python -m app.bench.pgvector_bulk --sizes 10 1000 10000
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import random
+import time
+from typing import Callable
+
+from app.core.settings import get_settings
+from app.db import models
+from app.db.session import SessionLocal, init_db
+from app.rag.schemas import DocumentChunk, DocumentMetadata
+from app.rag.vectorstore_pgvector import PgVectorStore
+
+EMBEDDING_DIM = 3072
+
+
+def synthetic_chunks(document_id: str, count: int) -> list[DocumentChunk]:
+    meta = DocumentMetadata(document_id=document_id, file_name=f"{document_id}.md")
+    rng = random.Random(document_id)
+    return [
+        DocumentChunk(
+            chunk_id=f"{document_id}:{index}",
+            content="نص تجريبي للقياس " * 40,
+            embedding=[rng.random() for _ in range(EMBEDDING_DIM)],
+            metadata=meta,
+        )
+        for index in range(count)
+    ]
+
+
+def legacy_upsert(chunks: list[DocumentChunk]) -> None:
+    with SessionLocal() as session:
+        for chunk in chunks:
+            session.merge(
+                models.DocumentMeta(
+                    chunk_id=chunk.chunk_id,
+                    document_id=chunk.metadata.document_id,
+                    file_name=chunk.metadata.file_name,
+                    content=chunk.content,
+                    embedding=chunk.embedding,
+                )
+            )
+        session.commit()
+
+
+def legacy_delete(document_id: str) -> None:
+    with SessionLocal() as session:
+        rows = session.query(models.DocumentMeta).filter(models.DocumentMeta.document_id == document_id).all()
+        for row in rows:
+            session.delete(row)
+        session.commit()
+
+
+def _timed(fn: Callable[..., object], *args: object) -> float:
+    started = time.perf_counter()
+    fn(*args)
+    return time.perf_counter() - started
+
+
+def run(sizes: list[int]) -> list[dict[str, float | int]]:
+    store = PgVectorStore(session_factory=SessionLocal, settings=get_settings())
+    results: list[dict[str, float | int]] = []
+    for size in sizes:
+        document_id = f"bench-{size}"
+        chunks = synthetic_chunks(document_id, size)
+        store.delete_document(document_id)
+
+        legacy_insert = _timed(legacy_upsert, chunks)
+        legacy_update = _timed(legacy_upsert, chunks)
+        legacy_remove = _timed(legacy_delete, document_id)
+
+        bulk_insert = _timed(store.upsert, chunks)
+        bulk_update = _timed(store.upsert, chunks)
+        bulk_remove = _timed(store.delete_document, document_id)
+
+        results.append(
+            {
+                "chunks": size,
+                "legacy_insert_rows_per_s": size / legacy_insert,
+                "legacy_update_rows_per_s": size / legacy_update,
+                "legacy_delete_s": legacy_remove,
+                "bulk_insert_rows_per_s": size / bulk_insert,
+                "bulk_update_rows_per_s": size / bulk_update,
+                "bulk_delete_s": bulk_remove,
+            }
+        )
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 1_000, 10_000])
+    parser.add_argument("--json", action="store_true", help="Print results as JSON")
+    args = parser.parse_args()
+
+    if not get_settings().is_pgvector:
+        raise SystemExit("This benchmark requires VECTOR_BACKEND=pgvector")
+    init_db()
+    results = run(args.sizes)
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    for row in results:
+        print(
+            f"{row['chunks']:>6} chunks | insert {row['legacy_insert_rows_per_s']:>9.0f} -> {row['bulk_insert_rows_per_s']:>9.0f} rows/s"
+            f" | update {row['legacy_update_rows_per_s']:>9.0f} -> {row['bulk_update_rows_per_s']:>9.0f} rows/s"
+            f" | delete {row['legacy_delete_s']:.3f}s -> {row['bulk_delete_s']:.3f}s"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,324 @@
+"""Retrieval benchmark across vector-store backends and corpus sizes.
+
+For each ``--sizes`` entry, generates a synthetic corpus and bulk-loads it
+into every ``--backends`` store through its ``upsert`` in ``--batch-size``
+batches. It then runs ``--queries`` searches of ``--top-k``. The corpus is
+either ``random`` (isotropic vectors, the hardest case for an index) or
+``clustered`` (vectors around ``--clusters`` topics, closer to real
+embeddings), with Arabic filler text. Each run records:
+
+* ingest throughput in chunks per second;
+* query latency p50/p95/p99;
+* recall@k against exact cosine top-k, computed batch by batch with numpy,
+  so the corpus is never held in memory whole;
+* the growth of this process's resident memory while loading, plus the
+  store's disk footprint (the Chroma directory, or the pgvector table and
+  its indexes).
+
+Embeddings are generated batch by batch from ``--seed``, so every backend
+sees identical data. Chroma runs in a temporary directory. pgvector writes
+to ``DATABASE_URL`` under one benchmark document id, deleted afterwards. Use
+a scratch database: its column is ``Vector(3072)``, so ``--dim`` must be
+3072 there. To add a backend, register an opener in ``BACKENDS``.
+
+    python -m app.bench.retrieval --backends chroma --sizes 10000 100000 --dim 3072 --output report.json
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import platform
+import resource
+import shutil
+import statistics
+import tempfile
+import time
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Callable, Iterator, Literal
+
+import numpy as np
+
+from app.core.settings import Settings, get_settings
+from app.rag.schemas import DocumentChunk, DocumentMetadata
+
+Corpus = Literal["random", "clustered"]
+BENCH_DOCUMENT_ID = "retrieval-bench"
+FILLER_WORDS = (
+    "الطفل النوم الروتين اللعب المدرسة المشاعر الغضب الصبر القراءة الحوار الأسرة الشاشات "
+    "الطعام الصحي الأصدقاء الثقة الحدود التشجيع المسؤولية الهدوء الخوف اللغة الاستماع"
+).split()
+
+
+@dataclass
+class Backend:
+    store: object
+    disk_bytes: Callable[[], int]
+    cleanup: Callable[[], None]
+
+
+def _directory_bytes(path: Path) -> int:
+    return sum(file.stat().st_size for file in path.rglob("*") if file.is_file())
+
+
+def open_chroma(settings: Settings) -> Backend:
+    from app.rag.vectorstore_chroma import ChromaVectorStore
+
+    workdir = Path(tempfile.mkdtemp(prefix="retrieval-bench-chroma-"))
+    store = ChromaVectorStore(settings.model_copy(update={"chroma_persist_dir": str(workdir)}))
+    return Backend(store=store, disk_bytes=lambda: _directory_bytes(workdir), cleanup=lambda: shutil.rmtree(workdir, True))
+
+
+def open_pgvector(settings: Settings) -> Backend:
+    from sqlalchemy import text
+
+    from app.db import models
+    from app.db.session import SessionLocal, init_db
+    from app.rag.vectorstore_pgvector import PgVectorStore
+
+    init_db()
+    store = PgVectorStore(session_factory=SessionLocal, settings=settings)
+    store.delete_document(BENCH_DOCUMENT_ID)
+    table = models.DocumentMeta.__tablename__
+
+    def disk_bytes() -> int:
+        with SessionLocal() as session:
+            return int(session.execute(text(f"SELECT pg_total_relation_size('{table}')")).scalar_one())
+
+    return Backend(store=store, disk_bytes=disk_bytes, cleanup=lambda: store.delete_document(BENCH_DOCUMENT_ID))
+
+
+BACKENDS: dict[str, Callable[[Settings], Backend]] = {"chroma": open_chroma, "pgvector": open_pgvector}
+
+
+class SyntheticCorpus:
+    """A reproducible corpus, generated in batches so any size fits in memory."""
+
+    def __init__(self, kind: Corpus, *, size: int, dim: int, clusters: int, seed: int, batch_size: int) -> None:
+        self.kind = kind
+        self.size = size
+        self.dim = dim
+        self.seed = seed
+        self.batch_size = batch_size
+        rng = np.random.default_rng([seed, 0])
+        self._centroids = rng.standard_normal((clusters, dim)).astype(np.float32)
+
+    @staticmethod
+    def _normalise(vectors: np.ndarray) -> np.ndarray:
+        return vectors / np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+
+    def batch(self, number: int) -> np.ndarray:
+        """Vectors ``number * batch_size`` onwards; each batch has its own seed, so any one can be regenerated."""
+
+        start = number * self.batch_size
+        rows = min(self.size, start + self.batch_size) - start
+        rng = np.random.default_rng([self.seed, 2, number])
+        vectors = rng.standard_normal((rows, self.dim)).astype(np.float32)
+        if self.kind == "clustered":
+            vectors = self._centroids[rng.integers(0, len(self._centroids), rows)] + 0.35 * vectors
+        return self._normalise(vectors)
+
+    def batches(self) -> Iterator[tuple[int, np.ndarray]]:
+        for number in range((self.size + self.batch_size - 1) // self.batch_size):
+            yield number * self.batch_size, self.batch(number)
+
+    def queries(self, count: int) -> np.ndarray:
+        """Clustered: perturbed corpus vectors, like questions about stored passages. Random: fresh vectors."""
+
+        rng = np.random.default_rng([self.seed, 1])
+        if self.kind == "random":
+            return self._normalise(rng.standard_normal((count, self.dim)).astype(np.float32))
+        picks = sorted(int(index) for index in rng.integers(0, self.size, count))
+        base, cached = [], (-1, None)
+        for index in picks:
+            number = index // self.batch_size
+            if cached[0] != number:
+                cached = (number, self.batch(number))
+            base.append(cached[1][index % self.batch_size])
+        base = np.stack(base)
+        return self._normalise(base + 0.1 * rng.standard_normal(base.shape).astype(np.float32))
+
+    def chunks(self, start: int, vectors: np.ndarray) -> list[DocumentChunk]:
+        metadata = DocumentMetadata(document_id=BENCH_DOCUMENT_ID, file_name="synthetic.md", heading_path="قياس")
+        words = len(FILLER_WORDS)
+        return [
+            DocumentChunk(
+                chunk_id=f"{BENCH_DOCUMENT_ID}:{start + offset}",
+                content=" ".join(FILLER_WORDS[(start + offset + step * 7) % words] for step in range(60)),
+                embedding=vector.tolist(),
+                metadata=metadata,
+            )
+            for offset, vector in enumerate(vectors)
+        ]
+
+
+def exact_top_k(corpus: SyntheticCorpus, queries: np.ndarray, top_k: int) -> list[set[str]]:
+    """Brute-force cosine top-k ids per query, merged batch by batch."""
+
+    best_scores = np.full((len(queries), top_k), -np.inf, dtype=np.float32)
+    best_ids = np.zeros((len(queries), top_k), dtype=np.int64)
+    for start, vectors in corpus.batches():
+        scores = np.concatenate([best_scores, queries @ vectors.T], axis=1)
+        batch_ids = np.broadcast_to(np.arange(start, start + len(vectors)), (len(queries), len(vectors)))
+        ids = np.concatenate([best_ids, batch_ids], axis=1)
+        keep = np.argpartition(-scores, top_k - 1, axis=1)[:, :top_k]
+        best_scores = np.take_along_axis(scores, keep, axis=1)
+        best_ids = np.take_along_axis(ids, keep, axis=1)
+    return [{f"{BENCH_DOCUMENT_ID}:{index}" for index in row} for row in best_ids]
+
+
+def _rss_bytes() -> int:
+    try:
+        pages = int(Path("/proc/self/statm").read_text().split()[1])
+        return pages * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):  # not Linux: fall back to the peak, in KiB on Linux/BSD and bytes on macOS
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if platform.system() == "Darwin" else peak * 1024
+
+
+def _percentile(values: list[float], fraction: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))] if ordered else 0.0
+
+
+def run_backend(
+    name: str,
+    corpus: SyntheticCorpus,
+    *,
+    settings: Settings,
+    queries: np.ndarray,
+    expected: list[set[str]],
+    top_k: int,
+) -> dict[str, object]:
+    backend = BACKENDS[name](settings)
+    try:
+        disk_before = backend.disk_bytes()
+        rss_before = _rss_bytes()
+        started = time.perf_counter()
+        for start, vectors in corpus.batches():
+            backend.store.upsert(corpus.chunks(start, vectors))
+        ingest_seconds = time.perf_counter() - started
+        rss_after = _rss_bytes()
+
+        latencies: list[float] = []
+        recalls: list[float] = []
+        for query in queries[: min(10, len(queries))]:
+            backend.store.similarity_search(query.tolist(), top_k=top_k)  # warm caches
+        for query, truth in zip(queries, expected):
+            started = time.perf_counter()
+            found = backend.store.similarity_search(query.tolist(), top_k=top_k)
+            latencies.append(time.perf_counter() - started)
+            recalls.append(len(truth & {chunk.chunk_id for chunk in found}) / top_k)
+
+        return {
+            "backend": name,
+            "corpus": corpus.kind,
+            "size": corpus.size,
+            "dim": corpus.dim,
+            "top_k": top_k,
+            "ingest_seconds": round(ingest_seconds, 2),
+            "ingest_chunks_per_s": round(corpus.size / ingest_seconds, 1),
+            "query_p50_ms": round(statistics.median(latencies) * 1000, 2),
+            "query_p95_ms": round(_percentile(latencies, 0.95) * 1000, 2),
+            "query_p99_ms": round(_percentile(latencies, 0.99) * 1000, 2),
+            "recall_at_k": round(statistics.mean(recalls), 4),
+            "rss_growth_mb": round((rss_after - rss_before) / 2**20, 1),
+            "disk_mb": round((backend.disk_bytes() - disk_before) / 2**20, 1),
+        }
+    finally:
+        backend.cleanup()
+
+
+def run(
+    backends: list[str],
+    *,
+    sizes: list[int],
+    corpus: Corpus,
+    dim: int,
+    clusters: int,
+    queries: int,
+    top_k: int,
+    batch_size: int,
+    seed: int,
+    settings: Settings,
+) -> dict[str, object]:
+    results = []
+    for size in sizes:
+        synthetic = SyntheticCorpus(corpus, size=size, dim=dim, clusters=clusters, seed=seed, batch_size=batch_size)
+        query_vectors = synthetic.queries(queries)
+        expected = exact_top_k(synthetic, query_vectors, top_k)
+        for name in backends:
+            results.append(
+                run_backend(
+                    name,
+                    synthetic,
+                    settings=settings,
+                    queries=query_vectors,
+                    expected=expected,
+                    top_k=top_k,
+                )
+            )
+    return {
+        "generated_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "host": {"platform": platform.platform(), "cpus": os.cpu_count(), "python": platform.python_version()},
+        "parameters": {
+            "corpus": corpus,
+            "dim": dim,
+            "clusters": clusters,
+            "queries": queries,
+            "top_k": top_k,
+            "batch_size": batch_size,
+            "seed": seed,
+        },
+        "results": results,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backends", nargs="+", choices=sorted(BACKENDS), default=["chroma"])
+    parser.add_argument("--sizes", nargs="+", type=int, default=[10_000])
+    parser.add_argument("--corpus", choices=["random", "clustered"], default="clustered")
+    parser.add_argument("--dim", type=int, default=3072, help="Embedding size; pgvector needs its column size (3072)")
+    parser.add_argument("--clusters", type=int, default=50, help="Topics in a clustered corpus")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--top-k", type=int, default=20, help="Matches retrieval_fetch_k by default")
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", type=Path, help="Also write the JSON report to this file")
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON")
+    args = parser.parse_args()
+    if "pgvector" in args.backends and args.dim != 3072:
+        parser.error("pgvector stores Vector(3072); use --dim 3072")
+
+    report = run(
+        args.backends,
+        sizes=args.sizes,
+        corpus=args.corpus,
+        dim=args.dim,
+        clusters=args.clusters,
+        queries=args.queries,
+        top_k=args.top_k,
+        batch_size=args.batch_size,
+        seed=args.seed,
+        settings=get_settings(),
+    )
+    if args.output:
+        args.output.write_text(json.dumps(report, indent=2))
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+    for row in report["results"]:
+        print(
+            f"{row['backend']:>9} {row['corpus']:>9} {row['size']:>9,} x {row['dim']}"
+            f" | ingest {row['ingest_chunks_per_s']:>9,.0f}/s"
+            f" | query p50 {row['query_p50_ms']:.1f}ms p95 {row['query_p95_ms']:.1f}ms p99 {row['query_p99_ms']:.1f}ms"
+            f" | recall@{row['top_k']} {row['recall_at_k']:.3f}"
+            f" | rss +{row['rss_growth_mb']:.0f}MB disk {row['disk_mb']:.0f}MB"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+"""Chat latency while a burst of signups hashes passwords.
+
+A steady stream of simulated chat requests runs alongside a burst of signups.
+Each chat request verifies an admin JWT, does a little CPU work, and waits on
+fake model I/O. Latency is timed from when a request was due, so requests that
+could not even start while the loop was blocked count in full. Each signup
+hashes one password with bcrypt. Modes:
+
+* ``inline``: ``get_password_hash`` is called on the event loop, as
+  ``create_profile`` originally did; every chat request stalls behind it.
+* ``to_thread``: ``asyncio.to_thread``, so hashes run on the default
+  executor, which has no bound beyond its thread count.
+* ``pool``: ``hash_password``, which queues hashes on the bounded bcrypt pool
+  (``PASSWORD_HASH_WORKERS``).
+
+    python -m app.bench.signup_burst --signups 40 --rounds 12
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import statistics
+import time
+
+from app.core.security import (
+    create_access_token,
+    decode_token,
+    get_password_hash,
+    hash_password,
+    shutdown_password_pool,
+    token_claims_cache,
+)
+from app.core.settings import get_settings
+
+CHAT_IO_SECONDS = 0.02
+CHAT_INTERVAL_SECONDS = 0.005
+
+
+def _percentile(values: list[float], fraction: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))] if ordered else 0.0
+
+
+async def _signup(mode: str, rounds: int) -> None:
+    if mode == "inline":
+        get_password_hash("correct horse battery staple", rounds)
+    elif mode == "to_thread":
+        await asyncio.to_thread(get_password_hash, "correct horse battery staple", rounds)
+    else:
+        await hash_password("correct horse battery staple", rounds)
+
+
+async def _chat(token: str) -> None:
+    decode_token(token, get_settings())
+    sum(ord(char) for char in "كيف أساعد طفلي على النوم؟" * 20)
+    await asyncio.sleep(CHAT_IO_SECONDS)
+
+
+async def run_mode(mode: str, *, signups: int, rounds: int, warmup: float) -> dict[str, float | int | str]:
+    settings = get_settings()
+    token = create_access_token(subject="bench", settings=settings, additional_claims={"is_admin": True})
+    latencies: list[tuple[float, float]] = []
+    stop_at: list[float] = []
+
+    async def one_chat(arrival: float) -> None:
+        await _chat(token)
+        latencies.append((arrival, time.perf_counter() - arrival))
+
+    async def chat_traffic() -> None:
+        # Open-loop arrivals: requests due while the loop was blocked are started late
+        # but timed from when they were due, so a stalled loop shows up as latency.
+        tasks = []
+        arrival = time.perf_counter()
+        while not stop_at or arrival < stop_at[0]:
+            while arrival <= time.perf_counter() and not (stop_at and arrival >= stop_at[0]):
+                tasks.append(asyncio.create_task(one_chat(arrival)))
+                arrival += CHAT_INTERVAL_SECONDS
+            await asyncio.sleep(max(0.0, arrival - time.perf_counter()))
+        await asyncio.gather(*tasks)
+
+    traffic = asyncio.create_task(chat_traffic())
+    await asyncio.sleep(warmup)
+    started = time.perf_counter()
+    await asyncio.gather(*(_signup(mode, rounds) for _ in range(signups)))
+    finished = time.perf_counter()
+    elapsed = finished - started
+    stop_at.append(finished)
+    await traffic
+    during = [latency for arrival, latency in latencies if started <= arrival < finished]
+
+    return {
+        "mode": mode,
+        "signups": signups,
+        "rounds": rounds,
+        "signups_per_s": round(signups / elapsed, 2),
+        "burst_s": round(elapsed, 2),
+        "chat_requests": len(during),
+        "chat_p50_ms": round(statistics.median(during) * 1000, 1) if during else 0.0,
+        "chat_p99_ms": round(_percentile(during, 0.99) * 1000, 1),
+        "chat_max_ms": round(max(during, default=0.0) * 1000, 1),
+    }
+
+
+async def run(modes: list[str], **options: float | int) -> list[dict[str, float | int | str]]:
+    try:
+        return [await run_mode(mode, **options) for mode in modes]
+    finally:
+        shutdown_password_pool()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--modes", nargs="+", choices=["inline", "to_thread", "pool"], default=["inline", "to_thread", "pool"])
+    parser.add_argument("--signups", type=int, default=40)
+    parser.add_argument("--rounds", type=int, default=get_settings().bcrypt_rounds, help="bcrypt cost factor")
+    parser.add_argument("--warmup", type=float, default=0.5, help="Seconds of chat traffic before the burst")
+    parser.add_argument("--json", action="store_true", help="Print results as JSON")
+    args = parser.parse_args()
+
+    results = asyncio.run(run(args.modes, signups=args.signups, rounds=args.rounds, warmup=args.warmup))
+    snapshot = {"token_cache_hits": token_claims_cache.hits, "token_cache_misses": token_claims_cache.misses}
+    if args.json:
+        print(json.dumps({"results": results, **snapshot}, indent=2))
+        return
+    for row in results:
+        print(
+            f"{row['mode']:>9} | {row['signups_per_s']:>6.2f} signups/s over {row['burst_s']:.1f}s"
+            f" | chat p50 {row['chat_p50_ms']:.1f}ms p99 {row['chat_p99_ms']:.1f}ms max {row['chat_max_ms']:.1f}ms"
+            f" ({row['chat_requests']} requests)"
+        )
+    print(f"token cache: {snapshot['token_cache_hits']} hits, {snapshot['token_cache_misses']} misses")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""Pluggable storage for original corpus uploads (S3 or local filesystem)."""
+from __future__ import annotations
+
+import mimetypes
+import os
+import shutil
+from pathlib import Path
+from threading import Lock
+from typing import Protocol
+
+from app.core.settings import Settings
+
+_MB = 1024 * 1024
+
+
+class BlobStore(Protocol):
+    def put_file(self, path: Path, key: str) -> None:
+        """Copy the file at ``path`` to ``key``. Blocking; call from a worker thread."""
+
+
+def _content_type(key: str) -> str:
+    content_type, encoding = mimetypes.guess_type(key)
+    if encoding == "gzip":
+        return "application/gzip"
+    return content_type or "text/markdown"
+
+
+class S3BlobStore:
+    """S3 store sharing one boto3 client; large files go up as concurrent multipart parts."""
+
+    def __init__(self, settings: Settings) -> None:
+        import boto3
+        from boto3.s3.transfer import TransferConfig
+
+        self._bucket = settings.s3_bucket_corpus
+        self._client = boto3.client(
+            "s3",
+            region_name=settings.aws_region,
+            aws_access_key_id=settings.aws_access_key_id or None,
+            aws_secret_access_key=settings.aws_secret_access_key or None,
+        )
+        self._transfer_config = TransferConfig(
+            multipart_threshold=settings.blob_multipart_threshold_mb * _MB,
+            multipart_chunksize=settings.blob_multipart_chunk_mb * _MB,
+            max_concurrency=4,
+        )
+
+    def put_file(self, path: Path, key: str) -> None:
+        self._client.upload_file(
+            str(path),
+            self._bucket,
+            key,
+            ExtraArgs={"ContentType": _content_type(key)},
+            Config=self._transfer_config,
+        )
+
+
+class LocalBlobStore:
+    """Filesystem stand-in for S3, for development and single-VM deployments."""
+
+    def __init__(self, root: str) -> None:
+        self._root = Path(root)
+
+    def put_file(self, path: Path, key: str) -> None:
+        target = (self._root / key).resolve()
+        if self._root.resolve() not in target.parents:
+            raise ValueError(f"Blob key escapes the store root: {key}")
+        target.parent.mkdir(parents=True, exist_ok=True)
+        tmp_target = target.with_name(f".{target.name}.tmp")
+        shutil.copyfile(path, tmp_target)
+        os.replace(tmp_target, target)
+
+
+_store: BlobStore | None = None
+_store_lock = Lock()
+
+
+def get_blob_store(settings: Settings) -> BlobStore | None:
+    """Return the process-wide blob store, or None when archiving originals is disabled."""
+
+    global _store
+    backend = settings.blob_backend
+    if backend == "none" or (backend == "s3" and not settings.s3_bucket_corpus):
+        return None
+    with _store_lock:
+        if _store is None:
+            _store = S3BlobStore(settings) if backend == "s3" else LocalBlobStore(settings.blob_local_dir)
+        return _store
@@ -0,0 +1,107 @@
+"""Persistent embedding cache shared by ingestion, seeding and query embedding."""
+from __future__ import annotations
+
+import hashlib
+import re
+import unicodedata
+from datetime import datetime, timedelta
+from threading import Lock
+from typing import Sequence
+
+import numpy as np
+
+from app.core.metrics import register_cache
+from app.core.settings import Settings
+from app.db import crud
+
+_WHITESPACE_RE = re.compile(r"\s+")
+# Recency only has to be roughly right for eviction; skip the write for recently touched rows.
+_TOUCH_INTERVAL = timedelta(hours=1)
+_MB = 1024 * 1024
+
+
+def normalize_text(text: str) -> str:
+    return _WHITESPACE_RE.sub(" ", unicodedata.normalize("NFC", text)).strip()
+
+
+def text_hash(text: str) -> str:
+    return hashlib.sha256(normalize_text(text).encode("utf-8")).hexdigest()
+
+
+class EmbeddingStore:
+    """Embeddings keyed by ``(model, dimensions, sha256(normalized text))``.
+
+    Vectors are stored as float32 bytes in the application database, so re-seeding,
+    switching vector backends or reprocessing a document only pays for text the
+    deployment has never embedded before. Methods block; call them from a thread.
+    """
+
+    def __init__(self, *, session_factory, settings: Settings) -> None:
+        self._session_factory = session_factory
+        self._model = settings.embedding_model
+        self._dimensions = settings.embedding_dimensions or 0
+        self._max_bytes = settings.embedding_cache_max_mb * _MB
+        self._written_since_eviction = 0
+        self.hits = 0
+        self.misses = 0
+
+    def get_many(self, texts: Sequence[str]) -> list[list[float] | None]:
+        hashes = [text_hash(text) for text in texts]
+        unique = list(dict.fromkeys(hashes))
+        session = self._session_factory()
+        try:
+            found = crud.get_cached_embeddings(
+                session, model=self._model, dimensions=self._dimensions, text_hashes=unique
+            )
+            if found:
+                now = datetime.utcnow()
+                crud.touch_cached_embeddings(
+                    session,
+                    model=self._model,
+                    dimensions=self._dimensions,
+                    text_hashes=list(found),
+                    used_at=now,
+                    stale_before=now - _TOUCH_INTERVAL,
+                )
+                session.commit()
+        finally:
+            session.close()
+        decoded = {key: np.frombuffer(vector, dtype=np.float32).tolist() for key, vector in found.items()}
+        self.hits += len(decoded)
+        self.misses += len(unique) - len(decoded)
+        return [decoded.get(key) for key in hashes]
+
+    def put_many(self, texts: Sequence[str], vectors: Sequence[Sequence[float]]) -> None:
+        encoded = {
+            text_hash(text): np.asarray(vector, dtype=np.float32).tobytes() for text, vector in zip(texts, vectors)
+        }
+        session = self._session_factory()
+        try:
+            crud.put_cached_embeddings(session, model=self._model, dimensions=self._dimensions, vectors=encoded)
+            self._written_since_eviction += sum(len(vector) for vector in encoded.values())
+            # Summing the table on every write would cost more than it saves; check every ~1% of budget.
+            if self._written_since_eviction >= self._max_bytes // 100:
+                crud.evict_cached_embeddings(session, max_bytes=self._max_bytes)
+                self._written_since_eviction = 0
+            session.commit()
+        finally:
+            session.close()
+
+
+_store: EmbeddingStore | None = None
+_store_lock = Lock()
+
+
+def get_embedding_store(settings: Settings) -> EmbeddingStore | None:
+    """Return the process-wide embedding store, or None when caching is disabled."""
+
+    global _store
+    if not settings.embedding_cache_enabled:
+        return None
+    with _store_lock:
+        if _store is None:
+            from app.db.session import SessionLocal
+
+            _store = EmbeddingStore(session_factory=SessionLocal, settings=settings)
+            register_cache("embedding", _store)
+        return _store
@@ -0,0 +1,286 @@
+"""Client-side protection for upstream model calls.
+
+Each OpenAI operation (``chat``, ``embed``) gets one process-wide
+``Governor``, made of two parts.
+
+* ``AIMDLimiter`` caps the calls in flight. After each call that finishes
+  within the latency target, the cap grows by ``1 / limit``, which is about
+  one slot per full window of calls. A 429, timeout or 5xx halves it, and a
+  slow success trims it by 10%. Decreases are spaced by ``cooldown`` so one
+  burst of failures counts once. Callers over the cap wait in FIFO order up to
+  ``queue_timeout`` seconds, and no worker thread is taken while they wait.
+* ``CircuitBreaker`` opens after ``failure_threshold`` consecutive upstream
+  failures and then rejects calls immediately for ``open_seconds``. Next,
+  one trial call is let through (half-open): success closes the breaker,
+  and failure opens it again. Calls that end otherwise, such as a 400 or a
+  cancelled request, leave the breaker as it was.
+
+Both raise ``UpstreamUnavailable``, which carries a retry hint. The client
+turns it into a 503.
+"""
+from __future__ import annotations
+
+import asyncio
+import contextvars
+import functools
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Literal, TypeVar
+
+from app.core.metrics import REGISTRY
+from app.core.settings import Settings
+
+T = TypeVar("T")
+Outcome = Literal["ok", "overload", "neutral"]
+BreakerState = Literal["closed", "open", "half_open"]
+_BREAKER_STATES: tuple[BreakerState, ...] = ("closed", "open", "half_open")
+
+
+class UpstreamUnavailable(Exception):
+    def __init__(self, reason: str, retry_after: float) -> None:
+        super().__init__(reason)
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class AIMDLimiter:
+    def __init__(
+        self,
+        *,
+        initial: int,
+        min_limit: int = 1,
+        max_limit: int,
+        latency_target: float,
+        cooldown: float = 1.0,
+        queue_timeout: float,
+    ) -> None:
+        self.limit = float(max(min_limit, min(initial, max_limit)))
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.latency_target = latency_target
+        self.cooldown = cooldown
+        self.queue_timeout = queue_timeout
+        self.in_flight = 0
+        self._last_decrease = 0.0
+        self._waiters: deque[tuple[asyncio.AbstractEventLoop, asyncio.Future]] = deque()
+        # A threading lock, not an asyncio one: scripts and the app may drive calls from different loops.
+        self._lock = threading.Lock()
+
+    @property
+    def queued(self) -> int:
+        return len(self._waiters)
+
+    async def acquire(self) -> None:
+        with self._lock:
+            if not self._waiters and self.in_flight < int(self.limit):
+                self.in_flight += 1
+                return
+            loop = asyncio.get_running_loop()
+            waiter = (loop, loop.create_future())
+            self._waiters.append(waiter)
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter[1]), self.queue_timeout)
+        except BaseException as exc:
+            with self._lock:
+                granted = waiter not in self._waiters
+                if not granted:
+                    self._waiters.remove(waiter)
+            if granted:  # the slot arrived as we gave up; hand it on
+                self._release_slot()
+            if isinstance(exc, asyncio.TimeoutError):
+                raise UpstreamUnavailable("Too many upstream calls queued", retry_after=self.queue_timeout) from None
+            raise
+
+    def release(self, latency: float, outcome: Outcome) -> None:
+        now = time.monotonic()
+        with self._lock:
+            if outcome == "overload" or (outcome == "ok" and latency > self.latency_target):
+                if now - self._last_decrease >= self.cooldown:
+                    factor = 0.5 if outcome == "overload" else 0.9
+                    self.limit = max(float(self.min_limit), self.limit * factor)
+                    self._last_decrease = now
+            elif outcome == "ok":
+                self.limit = min(float(self.max_limit), self.limit + 1.0 / self.limit)
+        self._release_slot()
+
+    def _release_slot(self) -> None:
+        with self._lock:
+            self.in_flight -= 1
+            while self._waiters and self.in_flight < int(self.limit):
+                loop, future = self._waiters.popleft()
+                self.in_flight += 1
+                loop.call_soon_threadsafe(_resolve, future)
+
+
+def _resolve(future: asyncio.Future) -> None:
+    if not future.done():
+        future.set_result(None)
+
+
+class CircuitBreaker:
+    def __init__(self, *, failure_threshold: int, open_seconds: float) -> None:
+        self.failure_threshold = failure_threshold
+        self.open_seconds = open_seconds
+        self.failures = 0
+        self.opened = 0
+        self._state: BreakerState = "closed"
+        self._opened_at = 0.0
+        self._trial_running = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> BreakerState:
+        with self._lock:
+            if self._state == "open" and time.monotonic() - self._opened_at >= self.open_seconds:
+                return "half_open"
+            return self._state
+
+    def before_call(self) -> None:
+        """Raise ``UpstreamUnavailable`` unless a call may go upstream now."""
+
+        with self._lock:
+            if self._state == "closed":
+                return
+            remaining = self._opened_at + self.open_seconds - time.monotonic()
+            if remaining > 0 or self._trial_running:
+                raise UpstreamUnavailable("Upstream circuit is open", retry_after=max(remaining, 1.0))
+            self._state = "half_open"
+            self._trial_running = True
+
+    def cancel_trial(self) -> None:
+        """Give back a half-open trial that never reached upstream."""
+
+        with self._lock:
+            self._trial_running = False
+
+    def record(self, failed: bool) -> None:
+        with self._lock:
+            self._trial_running = False
+            if not failed:
+                self._state, self.failures = "closed", 0
+                return
+            self.failures += 1
+            if self._state == "half_open" or self.failures >= self.failure_threshold:
+                if self._state != "open":
+                    self.opened += 1
+                self._state, self._opened_at = "open", time.monotonic()
+
+
+class Governor:
+    def __init__(self, limiter: AIMDLimiter, breaker: CircuitBreaker, classify: Callable[[BaseException], Outcome]) -> None:
+        self.limiter = limiter
+        self.breaker = breaker
+        self._classify = classify
+
+    async def run(self, func: Callable[..., T], *args: Any) -> T:
+        """Run blocking ``func`` in a worker thread once the breaker and the limiter allow it."""
+
+        self.breaker.before_call()
+        try:
+            await self.limiter.acquire()
+        except BaseException:
+            self.breaker.cancel_trial()
+            raise
+        started = time.perf_counter()
+        loop = asyncio.get_running_loop()
+        work = loop.run_in_executor(None, functools.partial(contextvars.copy_context().run, func, *args))
+        try:
+            result = await asyncio.shield(work)
+        except asyncio.CancelledError:
+            # The thread is still calling upstream; its slot is only free once it returns.
+            work.add_done_callback(lambda done: self._finish(started, self._outcome(done)))
+            raise
+        except BaseException as exc:
+            self._finish(started, self._classify(exc))
+            raise
+        self._finish(started, "ok")
+        return result
+
+    def _outcome(self, work: asyncio.Future) -> Outcome:
+        if work.cancelled():
+            return "neutral"
+        exc = work.exception()
+        return "ok" if exc is None else self._classify(exc)
+
+    def _finish(self, started: float, outcome: Outcome) -> None:
+        self.limiter.release(time.perf_counter() - started, outcome)
+        if outcome == "neutral":  # upstream neither answered nor failed; the breaker learns nothing
+            self.breaker.cancel_trial()
+        else:
+            self.breaker.record(failed=outcome == "overload")
+
+    def snapshot(self) -> dict[str, float | int | str]:
+        return {
+            "state": self.breaker.state,
+            "consecutive_failures": self.breaker.failures,
+            "times_opened": self.breaker.opened,
+            "concurrency_limit": round(self.limiter.limit, 2),
+            "in_flight": self.limiter.in_flight,
+            "queued": self.limiter.queued,
+        }
+
+
+_governors: dict[str, Governor] = {}
+_governors_lock = threading.Lock()
+
+
+def get_governor(operation: str, settings: Settings, classify: Callable[[BaseException], Outcome]) -> Governor:
+    """The process-wide governor for ``operation``; the first caller's settings configure it."""
+
+    with _governors_lock:
+        governor = _governors.get(operation)
+        if governor is None:
+            target = settings.openai_chat_latency_target if operation == "chat" else settings.openai_embed_latency_target
+            governor = _governors[operation] = Governor(
+                AIMDLimiter(
+                    initial=settings.openai_concurrency_initial,
+                    max_limit=settings.openai_concurrency_max,
+                    latency_target=target,
+                    queue_timeout=settings.openai_queue_timeout,
+                ),
+                CircuitBreaker(
+                    failure_threshold=settings.openai_breaker_failures, open_seconds=settings.openai_breaker_open_seconds
+                ),
+                classify,
+            )
+        return governor
+
+
+def governor_snapshots() -> dict[str, dict[str, float | int | str]]:
+    with _governors_lock:
+        governors = dict(_governors)
+    return {operation: governor.snapshot() for operation, governor in governors.items()}
+
+
+@REGISTRY.collector
+def _governor_metrics() -> Any:
+    snapshots = governor_snapshots()
+    yield (
+        "family_ai_openai_breaker_state",
+        "gauge",
+        "1 for the breaker's current state per operation",
+        [
+            ("family_ai_openai_breaker_state", {"operation": operation, "state": state}, int(snapshot["state"] == state))
+            for operation, snapshot in snapshots.items()
+            for state in _BREAKER_STATES
+        ],
+    )
+    for field, kind, documentation in (
+        ("times_opened", "counter", "Times the breaker opened"),
+        ("concurrency_limit", "gauge", "Current adaptive concurrency limit"),
+        ("in_flight", "gauge", "Upstream calls in flight"),
+        ("queued", "gauge", "Calls waiting for a concurrency slot"),
+    ):
+        name = f"family_ai_openai_{field}"
+        sample = f"{name}_total" if kind == "counter" else name
+        yield name, kind, documentation, [
+            (sample, {"operation": operation}, snapshot[field]) for operation, snapshot in snapshots.items()
+        ]
+
+
+def reset_governors() -> None:
+    """Forget every governor, e.g. between tests with different settings."""
+
+    with _governors_lock:
+        _governors.clear()
@@ -0,0 +1,190 @@
+"""In-process metrics exported in the Prometheus text format.
+
+The few metric types the API needs, kept dependency-free: a labelled
+``Counter`` and a fixed-bucket ``Histogram``. Recording is a dict lookup, a
+bisect and two additions under a lock. Values that already live elsewhere
+(pool and cache counters) are read by collectors only when ``/metrics`` is
+scraped, so they cost nothing on the request path.
+
+    with CHAT_STAGE_SECONDS.time("completion"):
+        reply = await client.chat(messages)
+"""
+from __future__ import annotations
+
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Iterable, Iterator, Sequence
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+# Seconds; covers a cached embedding lookup up to a slow completion.
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+Sample = tuple[str, dict[str, str], float]
+Collector = Callable[[], Iterable[tuple[str, str, str, list[Sample]]]]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labels: dict[str, str]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(str(value))}"' for key, value in labels.items()) + "}"
+
+
+def _format_value(value: float) -> str:
+    value = float(value)
+    if value == float("inf"):
+        return "+Inf"
+    return str(int(value)) if value.is_integer() else repr(value)
+
+
+class Counter:
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: dict[tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labels: str, amount: float = 1.0) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def value(self, *labels: str) -> float:
+        with self._lock:
+            return self._values.get(labels, 0.0)
+
+    def collect(self) -> tuple[str, str, str, list[Sample]]:
+        with self._lock:
+            values = list(self._values.items())
+        samples = [(f"{self.name}_total", dict(zip(self.labelnames, labels)), value) for labels, value in values]
+        return self.name, "counter", self.documentation, samples
+
+    def clear(self) -> None:
+        with self._lock:
+            self._values.clear()
+
+
+class Histogram:
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = LATENCY_BUCKETS,
+    ) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # Per label set: a count per bucket (the last one is +Inf), then the sum.
+        self._series: dict[tuple[str, ...], tuple[list[int], list[float]]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *labels: str) -> None:
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = ([0] * (len(self.buckets) + 1), [0.0])
+            series[0][index] += 1
+            series[1][0] += value
+
+    @contextmanager
+    def time(self, *labels: str) -> Iterator[None]:
+        """Observe the wall-clock time of the block, including when it raises."""
+
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, *labels)
+
+    def count(self, *labels: str) -> int:
+        with self._lock:
+            series = self._series.get(labels)
+            return sum(series[0]) if series else 0
+
+    def collect(self) -> tuple[str, str, str, list[Sample]]:
+        with self._lock:
+            series = [(labels, list(counts), total[0]) for labels, (counts, total) in self._series.items()]
+        samples: list[Sample] = []
+        for labels, counts, total in series:
+            base = dict(zip(self.labelnames, labels))
+            cumulative = 0
+            for bound, count in zip((*self.buckets, float("inf")), counts):
+                cumulative += count
+                samples.append((f"{self.name}_bucket", {**base, "le": _format_value(bound)}, cumulative))
+            samples.append((f"{self.name}_sum", base, total))
+            samples.append((f"{self.name}_count", base, cumulative))
+        return self.name, "histogram", self.documentation, samples
+
+    def clear(self) -> None:
+        with self._lock:
+            self._series.clear()
+
+
+class Registry:
+    def __init__(self) -> None:
+        self._metrics: list[Counter | Histogram] = []
+        self._collectors: list[Collector] = []
+
+    def register(self, metric: Counter | Histogram) -> Counter | Histogram:
+        self._metrics.append(metric)
+        return metric
+
+    def collector(self, collect: Collector) -> Collector:
+        """Register a function yielding ``(name, type, help, samples)`` families at scrape time."""
+
+        self._collectors.append(collect)
+        return collect
+
+    def render(self) -> str:
+        families = [metric.collect() for metric in self._metrics]
+        for collect in self._collectors:
+            families.extend(collect())
+        lines = []
+        for name, kind, documentation, samples in families:
+            lines.append(f"# HELP {name} {documentation}")
+            lines.append(f"# TYPE {name} {kind}")
+            lines.extend(f"{sample}{_format_labels(labels)} {_format_value(value)}" for sample, labels, value in samples)
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+CHAT_STAGE_SECONDS = REGISTRY.register(
+    Histogram("family_ai_chat_stage_seconds", "Time spent in each stage of a chat request", ["stage"])
+)
+VECTOR_QUERY_SECONDS = REGISTRY.register(
+    Histogram("family_ai_vector_query_seconds", "Vector store similarity search latency", ["backend"])
+)
+OPENAI_RETRIES = REGISTRY.register(
+    Counter("family_ai_openai_retries", "OpenAI calls retried after a failed attempt", ["operation"])
+)
+OPENAI_ERRORS = REGISTRY.register(
+    Counter("family_ai_openai_errors", "OpenAI calls that failed for good, by cause", ["operation", "kind"])
+)
+RATE_LIMITED = REGISTRY.register(
+    Counter("family_ai_rate_limited", "Chat requests refused with 429, by the limit that refused them", ["scope"])
+)
+
+_caches: dict[str, object] = {}
+
+
+def register_cache(name: str, cache: object) -> None:
+    """Export ``cache.hits`` and ``cache.misses`` as ``family_ai_cache_{hits,misses}_total{cache=name}``."""
+
+    _caches[name] = cache
+
+
+@REGISTRY.collector
+def _cache_metrics() -> Iterator[tuple[str, str, str, list[Sample]]]:
+    caches = list(_caches.items())
+    for field in ("hits", "misses"):
+        samples = [(f"family_ai_cache_{field}_total", {"cache": name}, getattr(cache, field)) for name, cache in caches]
+        yield f"family_ai_cache_{field}", "counter", f"Cache lookups that were {field}", samples
@@ -1,58 +1,185 @@
-"""Thin async wrapper around the OpenAI Python SDK."""
+"""Thin async wrapper around the OpenAI Python SDK.
+
+Calls go through the shared per-operation ``Governor`` (adaptive concurrency
+limit + circuit breaker, see ``app.core.governor``). Only transient upstream
+failures (429, 5xx, timeouts, connection errors) are retried, with short
+jittered backoff and never while the breaker is open. Each attempt queues for
+its own slot, so retries cannot pile onto an overloaded upstream. The SDK's
+own retries are disabled so this is the only retry loop.
+"""
 from __future__ import annotations
 
 import asyncio
-from typing import Iterable, Sequence
+import math
+from dataclasses import dataclass
+from typing import Any, Callable, Iterable, Sequence, TypeVar
 
 from fastapi import HTTPException, status
-from openai import APIError, AuthenticationError, BadRequestError, NotFoundError, OpenAIError, OpenAI
-from tenacity import RetryError, retry, stop_after_attempt, wait_exponential
+from loguru import logger
+from openai import (
+    APIConnectionError,
+    APIError,
+    APIStatusError,
+    AuthenticationError,
+    BadRequestError,
+    NotFoundError,
+    OpenAI,
+    RateLimitError,
+)
+from sqlalchemy.exc import SQLAlchemyError
+from tenacity import (
+    AsyncRetrying,
+    RetryCallState,
+    retry_if_exception,
+    stop_after_attempt,
+    stop_any,
+    wait_exponential_jitter,
+)
 
+from app.core.embedding_store import EmbeddingStore, get_embedding_store
+from app.core.governor import Governor, Outcome, UpstreamUnavailable, get_governor
+from app.core.metrics import OPENAI_ERRORS, OPENAI_RETRIES
 from app.core.settings import Settings
 
+T = TypeVar("T")
+
+
+@dataclass(frozen=True)
+class Completion:
+    text: str
+    total_tokens: int
+
+
+def estimate_tokens(messages: Iterable[dict[str, str]]) -> int:
+    """Rough token count for responses without ``usage``: about four characters per token."""
+
+    return math.ceil(sum(len(message.get("content") or "") for message in messages) / 4)
+
+
+def classify_failure(exc: BaseException) -> Outcome:
+    """``overload`` for failures that mean upstream is struggling; ``neutral`` for everything else."""
+
+    if isinstance(exc, (RateLimitError, APIConnectionError)):
+        return "overload"
+    if isinstance(exc, APIStatusError) and exc.status_code >= 500:
+        return "overload"
+    return "neutral"
+
+
+def _count_retry(operation: str):
+    def before_sleep(state: RetryCallState) -> None:
+        OPENAI_RETRIES.inc(operation)
+
+    return before_sleep
+
+
+def _unavailable(operation: str, label: str, exc: UpstreamUnavailable) -> HTTPException:
+    OPENAI_ERRORS.inc(operation, "unavailable")
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail=f"{label} temporarily unavailable: {exc.reason}",
+        headers={"Retry-After": str(math.ceil(exc.retry_after))},
+    )
+
 
 class OpenAIClient:
     """Provide shared access to chat and embedding endpoints."""
 
-    def __init__(self, settings: Settings) -> None:
+    def __init__(self, settings: Settings, embedding_store: EmbeddingStore | None = None) -> None:
         if not settings.openai_api_key:
             raise HTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                 detail="OpenAI API key is not configured",
             )
         self._settings = settings
-        self._client = OpenAI(api_key=settings.openai_api_key)
+        self._client = OpenAI(
+            api_key=settings.openai_api_key,
+            base_url=settings.openai_base_url,
+            timeout=settings.openai_timeout,
+            max_retries=0,
+        )
+        self._embedding_store = embedding_store or get_embedding_store(settings)
+
+    async def _governed(self, operation: str, func: Callable[..., T], *args: Any) -> T:
+        governor: Governor = get_governor(operation, self._settings, classify_failure)
+        retrying = AsyncRetrying(
+            wait=wait_exponential_jitter(initial=0.5, max=self._settings.openai_retry_max_wait),
+            stop=stop_any(
+                stop_after_attempt(self._settings.openai_max_attempts),
+                lambda state: governor.breaker.state != "closed",
+            ),
+            retry=retry_if_exception(lambda exc: classify_failure(exc) == "overload"),
+            before_sleep=_count_retry(operation),
+            reraise=True,
+        )
+        async for attempt in retrying:
+            with attempt:
+                return await governor.run(func, *args)
+        raise AssertionError("unreachable")  # pragma: no cover - reraise=True always returns or raises
 
-    @retry(wait=wait_exponential(multiplier=1, min=1, max=20), stop=stop_after_attempt(4))
     def _embed_sync(self, texts: Sequence[str]) -> list[list[float]]:
-        response = self._client.embeddings.create(model=self._settings.embedding_model, input=list(texts))
+        extra = {"dimensions": self._settings.embedding_dimensions} if self._settings.embedding_dimensions else {}
+        response = self._client.embeddings.create(model=self._settings.embedding_model, input=list(texts), **extra)
         return [item.embedding for item in response.data]
 
     async def embed_texts(self, texts: Sequence[str]) -> list[list[float]]:
+        """Embed ``texts``, only sending the API what the embedding store hasn't seen."""
+
+        store = self._embedding_store
+        if store is None:
+            return await self._embed_remote(texts)
         try:
-            return await asyncio.to_thread(self._embed_sync, texts)
+            vectors = await asyncio.to_thread(store.get_many, texts)
+        except SQLAlchemyError:
+            logger.warning("Embedding store lookup failed; embedding without it", exc_info=True)
+            return await self._embed_remote(texts)
+
+        missing = list(dict.fromkeys(text for text, vector in zip(texts, vectors) if vector is None))
+        if not missing:
+            return vectors
+        fresh = dict(zip(missing, await self._embed_remote(missing)))
+        try:
+            await asyncio.to_thread(store.put_many, list(fresh), list(fresh.values()))
+        except SQLAlchemyError:
+            logger.warning("Could not save {} embeddings to the store", len(fresh), exc_info=True)
+        return [vector if vector is not None else fresh[text] for text, vector in zip(texts, vectors)]
+
+    async def _embed_remote(self, texts: Sequence[str]) -> list[list[float]]:
+        try:
+            return await self._governed("embed", self._embed_sync, texts)
+        except UpstreamUnavailable as exc:
+            raise _unavailable("embed", "Embedding", exc) from exc
         except (BadRequestError, AuthenticationError, NotFoundError) as exc:
+            OPENAI_ERRORS.inc("embed", "rejected")
             raise HTTPException(status_code=400, detail=f"Embedding error: {exc}") from exc
         except APIError as exc:
+            OPENAI_ERRORS.inc("embed", "api_error")
             raise HTTPException(status_code=502, detail="Embedding request failed: API error") from exc
-        except RetryError as exc:  # pragma: no cover - network failure path
-            raise HTTPException(status_code=502, detail="Embedding request failed") from exc
 
-    @retry(wait=wait_exponential(multiplier=1, min=1, max=20), stop=stop_after_attempt(4))
-    def _chat_sync(self, messages: Iterable[dict[str, str]]) -> str:
+    def _chat_sync(self, messages: list[dict[str, str]]) -> Completion:
         response = self._client.chat.completions.create(
             model=self._settings.chat_model,
-            messages=list(messages),
+            messages=messages,
             temperature=0.6,
         )
-        return response.choices[0].message.content or ""
+        text = response.choices[0].message.content or ""
+        if response.usage is not None:
+            return Completion(text=text, total_tokens=response.usage.total_tokens)
+        return Completion(text=text, total_tokens=estimate_tokens([*messages, {"content": text}]))
 
     async def chat(self, messages: Iterable[dict[str, str]]) -> str:
+        return (await self.complete(messages)).text
+
+    async def complete(self, messages: Iterable[dict[str, str]]) -> Completion:
+        """Like ``chat``, but also reports the tokens the call used."""
+
         try:
-            return await asyncio.to_thread(self._chat_sync, messages)
+            return await self._governed("chat", self._chat_sync, list(messages))
+        except UpstreamUnavailable as exc:
+            raise _unavailable("chat", "Chat completion", exc) from exc
         except (BadRequestError, AuthenticationError, NotFoundError) as exc:
+            OPENAI_ERRORS.inc("chat", "rejected")
             raise HTTPException(status_code=400, detail=f"Chat completion error: {exc}") from exc
         except APIError as exc:
+            OPENAI_ERRORS.inc("chat", "api_error")
             raise HTTPException(status_code=502, detail="Chat completion failed: API error") from exc
-        except RetryError as exc:  # pragma: no cover - network failure path
-            raise HTTPException(status_code=502, detail="Chat completion failed") from exc
@@ -0,0 +1,179 @@
+"""Fair sharing of chat capacity between households and clients.
+
+Every chat request passes three token buckets before any retrieval or
+upstream work is done:
+
+* ``ip``: one token per request, per client address.
+* ``household``: one token per request, per household. ``household_id`` comes
+  from the request body, so it is only trusted once the household is known to
+  exist. Unknown ids are limited by address alone and cannot be used to open
+  fresh buckets.
+* ``tokens``: the daily OpenAI token quota of the household (or of the
+  address when there is none). It refills at ``quota / 86400`` per second and
+  is charged after the completion from its ``usage``, so one long answer may
+  push it below zero. Requests are then refused until it refills back above zero.
+
+Buckets live in process memory by default. ``RATE_LIMIT_BACKEND=database``
+keeps them in the ``rate_limit_buckets`` table instead, so every worker
+shares the same limits. When that table cannot be reached, requests are let
+through (with a warning) instead of failing.
+
+A refused request raises ``RateLimited``, which the chat endpoint turns into a
+429 with ``Retry-After``.
+"""
+from __future__ import annotations
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional, Protocol
+
+from loguru import logger
+from sqlalchemy.exc import SQLAlchemyError
+
+from app.core.metrics import RATE_LIMITED
+from app.core.settings import Settings
+from app.db import crud_async
+from app.db.profiles import get_household_profile
+from app.db.session import async_session_scope
+
+SECONDS_PER_DAY = 86_400.0
+
+
+class RateLimited(Exception):
+    def __init__(self, scope: str, retry_after: float) -> None:
+        super().__init__(f"{scope} rate limit exceeded")
+        self.scope = scope
+        self.retry_after = retry_after
+
+
+class Buckets(Protocol):
+    async def take(self, key: str, *, cost: float, rate: float, capacity: float) -> float:
+        """Remove ``cost`` tokens and return 0, or return the seconds until they are available."""
+
+    async def charge(self, key: str, *, amount: float, rate: float, capacity: float) -> None:
+        """Remove ``amount`` tokens unconditionally; the level may go negative."""
+
+
+def _wait(level: float, cost: float, rate: float) -> float:
+    return max(cost - level, 0.0) / rate
+
+
+class MemoryBuckets:
+    """Process-local buckets, dropping the least recently used beyond ``max_keys``."""
+
+    def __init__(self, *, max_keys: int) -> None:
+        self.max_keys = max_keys
+        self._buckets: OrderedDict[str, tuple[float, float]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _refilled(self, key: str, rate: float, capacity: float, now: float) -> float:
+        entry = self._buckets.get(key)
+        if entry is None:
+            return capacity
+        tokens, updated_at = entry
+        return min(capacity, tokens + (now - updated_at) * rate)
+
+    def _store(self, key: str, tokens: float, now: float) -> None:
+        self._buckets[key] = (tokens, now)
+        self._buckets.move_to_end(key)
+        while len(self._buckets) > self.max_keys:
+            self._buckets.popitem(last=False)
+
+    async def take(self, key: str, *, cost: float, rate: float, capacity: float) -> float:
+        now = time.monotonic()
+        with self._lock:
+            level = self._refilled(key, rate, capacity, now)
+            if level < cost:
+                self._store(key, level, now)
+                return _wait(level, cost, rate)
+            self._store(key, level - cost, now)
+            return 0.0
+
+    async def charge(self, key: str, *, amount: float, rate: float, capacity: float) -> None:
+        now = time.monotonic()
+        with self._lock:
+            self._store(key, self._refilled(key, rate, capacity, now) - amount, now)
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+
+class DatabaseBuckets:
+    """Buckets shared by all workers through one atomic upsert per check."""
+
+    async def take(self, key: str, *, cost: float, rate: float, capacity: float) -> float:
+        async with async_session_scope() as session:
+            level, allowed = await crud_async.update_rate_limit_bucket(
+                session, key=key, cost=cost, rate=rate, capacity=capacity, now=time.time()
+            )
+        return 0.0 if allowed else _wait(level, cost, rate)
+
+    async def charge(self, key: str, *, amount: float, rate: float, capacity: float) -> None:
+        async with async_session_scope() as session:
+            await crud_async.update_rate_limit_bucket(
+                session, key=key, cost=amount, rate=rate, capacity=capacity, now=time.time(), conditional=False
+            )
+
+
+class ChatRateLimiter:
+    def __init__(self, settings: Settings, buckets: Buckets) -> None:
+        self.enabled = settings.rate_limit_enabled
+        self.buckets = buckets
+        self._limits = {
+            "ip": (settings.rate_limit_ip_per_minute / 60.0, float(settings.rate_limit_ip_burst)),
+            "household": (settings.rate_limit_household_per_minute / 60.0, float(settings.rate_limit_household_burst)),
+            "tokens": (settings.token_quota_per_day / SECONDS_PER_DAY, float(settings.token_quota_per_day)),
+        }
+
+    async def _take(self, scope: str, subject: str, cost: float) -> None:
+        rate, capacity = self._limits[scope]
+        try:
+            wait = await self.buckets.take(f"{scope}:{subject}", cost=cost, rate=rate, capacity=capacity)
+        except SQLAlchemyError:
+            logger.warning("Rate limit store unavailable; admitting {} {}", scope, subject, exc_info=True)
+            return
+        if wait > 0:
+            RATE_LIMITED.inc(scope)
+            raise RateLimited(scope, retry_after=wait)
+
+    async def admit(self, client_ip: str, household_id: Optional[str]) -> str:
+        """Check every limit for one chat request; returns the subject its tokens are charged to."""
+
+        subject = f"ip:{client_ip}"
+        if not self.enabled:
+            return subject
+        await self._take("ip", client_ip, 1.0)
+        if household_id and await get_household_profile(household_id) is not None:
+            await self._take("household", household_id, 1.0)
+            subject = f"household:{household_id}"
+        await self._take("tokens", subject, 0.0)
+        return subject
+
+    async def charge_tokens(self, subject: str, tokens: int) -> None:
+        if not self.enabled or tokens <= 0:
+            return
+        rate, capacity = self._limits["tokens"]
+        try:
+            await self.buckets.charge(f"tokens:{subject}", amount=float(tokens), rate=rate, capacity=capacity)
+        except SQLAlchemyError:
+            logger.warning("Could not charge {} tokens to {}", tokens, subject, exc_info=True)
+
+
+_limiter: Optional[ChatRateLimiter] = None
+_limiter_lock = threading.Lock()
+
+
+def get_rate_limiter(settings: Settings) -> ChatRateLimiter:
+    """The process-wide limiter; the first caller's settings configure it."""
+
+    global _limiter
+    with _limiter_lock:
+        if _limiter is None:
+            buckets: Buckets = (
+                DatabaseBuckets()
+                if settings.rate_limit_backend == "database"
+                else MemoryBuckets(max_keys=settings.rate_limit_max_keys)
+            )
+            _limiter = ChatRateLimiter(settings, buckets)
+        return _limiter
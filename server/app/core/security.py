@@ -1,6 +1,21 @@
-"""Authentication and authorization helpers."""
+"""Authentication and authorization helpers.
+
+bcrypt is deliberately slow (about 250 ms per hash at cost 12), so async code
+hashes and checks passwords through ``hash_password``/``check_password``. These
+run on a small dedicated thread pool: bcrypt releases the GIL while it works,
+so the event loop keeps serving requests, and a signup burst can occupy at most
+``password_hash_workers`` cores. Verified JWT claims are kept in a short-lived
+cache, so repeat admin calls with the same token skip signature verification.
+Entries never outlive the token's ``exp``.
+"""
 from __future__ import annotations
 
+import asyncio
+import copy
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta, timezone
 from typing import Any, Optional
 
@@ -10,6 +25,7 @@ from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
 from pydantic import BaseModel
 
+from app.core.metrics import register_cache
 from app.core.settings import Settings, get_settings
 
 bearer_scheme = HTTPBearer(auto_error=False)
@@ -24,8 +40,11 @@ class AuthenticatedUser(BaseModel):
     is_admin: bool = False
 
 
-def get_password_hash(password: str) -> str:
-    return bcrypt.hashpw(password.encode("utf-8"), bcrypt.gensalt()).decode("utf-8")
+def get_password_hash(password: str, rounds: Optional[int] = None) -> str:
+    """Blocking bcrypt hash; ``rounds`` defaults to the ``BCRYPT_ROUNDS`` setting."""
+
+    salt = bcrypt.gensalt(rounds=rounds or get_settings().bcrypt_rounds)
+    return bcrypt.hashpw(password.encode("utf-8"), salt).decode("utf-8")
 
 
 def verify_password(password: str, password_hash: str) -> bool:
@@ -35,6 +54,89 @@ def verify_password(password: str, password_hash: str) -> bool:
         return False
 
 
+_hash_pool: Optional[ThreadPoolExecutor] = None
+_hash_pool_lock = threading.Lock()
+
+
+def _password_pool() -> ThreadPoolExecutor:
+    global _hash_pool
+    with _hash_pool_lock:
+        if _hash_pool is None:
+            _hash_pool = ThreadPoolExecutor(
+                max_workers=get_settings().password_hash_workers, thread_name_prefix="bcrypt"
+            )
+        return _hash_pool
+
+
+def shutdown_password_pool() -> None:
+    global _hash_pool
+    with _hash_pool_lock:
+        pool, _hash_pool = _hash_pool, None
+    if pool is not None:
+        pool.shutdown(wait=True)
+
+
+async def hash_password(password: str, rounds: Optional[int] = None) -> str:
+    """``get_password_hash`` on the bounded bcrypt pool; excess signups queue there."""
+
+    return await asyncio.get_running_loop().run_in_executor(_password_pool(), get_password_hash, password, rounds)
+
+
+async def check_password(password: str, password_hash: str) -> bool:
+    return await asyncio.get_running_loop().run_in_executor(_password_pool(), verify_password, password, password_hash)
+
+
+class TokenClaimsCache:
+    """Thread-safe LRU of verified JWT claims.
+
+    An entry lives for ``ttl_seconds`` or until the token's ``exp``, whichever
+    comes first. Keys include the secret and algorithm, so rotating
+    ``JWT_SECRET`` invalidates every cached token. Claims are copied in and out,
+    so a caller changing its dict cannot alter what later requests see.
+    """
+
+    def __init__(self, *, max_entries: int, ttl_seconds: float) -> None:
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[tuple[str, str, str], tuple[float, dict[str, Any]]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: tuple[str, str, str]) -> Optional[dict[str, Any]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] <= time.time():
+                self._entries.pop(key, None)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+        return copy.deepcopy(entry[1])
+
+    def put(self, key: tuple[str, str, str], claims: dict[str, Any]) -> None:
+        expires_at = time.time() + self.ttl_seconds
+        if isinstance(claims.get("exp"), (int, float)):
+            expires_at = min(expires_at, float(claims["exp"]))
+        claims = copy.deepcopy(claims)
+        with self._lock:
+            self._entries[key] = (expires_at, claims)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+_claims_settings = get_settings()
+token_claims_cache = TokenClaimsCache(
+    max_entries=_claims_settings.token_cache_max_entries, ttl_seconds=_claims_settings.token_cache_ttl_seconds
+)
+register_cache("token_claims", token_claims_cache)
+
+
 def create_access_token(
     *,
     subject: str,
@@ -55,10 +157,16 @@ def create_access_token(
 
 
 def decode_token(token: str, settings: Settings) -> dict[str, Any]:
+    key = (settings.jwt_secret, settings.jwt_algorithm, token)
+    claims = token_claims_cache.get(key)
+    if claims is not None:
+        return claims
     try:
-        return jwt.decode(token, settings.jwt_secret, algorithms=[settings.jwt_algorithm])
+        claims = jwt.decode(token, settings.jwt_secret, algorithms=[settings.jwt_algorithm])
     except jwt.PyJWTError as exc:  # pragma: no cover - ensures graceful failure
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token") from exc
+    token_claims_cache.put(key, claims)
+    return claims
 
 
 async def get_current_user(
@@ -14,6 +14,7 @@ ENV_FILE = PROJECT_ROOT.parent / ".env"
 load_dotenv(ENV_FILE)
 
 VectorBackend = Literal["pgvector", "chroma"]
+BlobBackend = Literal["s3", "local", "none"]
 
 
 class Settings(BaseSettings):
@@ -26,8 +27,38 @@ class Settings(BaseSettings):
     debug: bool = False
 
     openai_api_key: str = Field(default="", description="OpenAI API key for chat + embeddings")
+    openai_base_url: str | None = Field(
+        default=None, alias="OPENAI_BASE_URL", description="Alternative API root, e.g. the bundled fake server for load tests"
+    )
+    openai_timeout: float = Field(default=60.0, gt=0, description="Seconds before one OpenAI request is abandoned")
+    openai_max_attempts: int = Field(default=3, ge=1, description="Attempts per call on 429, 5xx or timeouts")
+    openai_retry_max_wait: float = Field(default=4.0, gt=0, description="Longest backoff between attempts")
+    openai_concurrency_initial: int = Field(default=8, ge=1, description="Starting in-flight limit per operation")
+    openai_concurrency_max: int = Field(default=64, ge=1, description="Ceiling the adaptive in-flight limit grows to")
+    openai_chat_latency_target: float = Field(default=20.0, gt=0, description="Slower completions shrink the chat limit")
+    openai_embed_latency_target: float = Field(default=5.0, gt=0, description="Slower embeddings shrink the embed limit")
+    openai_queue_timeout: float = Field(default=10.0, gt=0, description="Longest wait for a free slot before a 503")
+    openai_breaker_failures: int = Field(default=5, ge=1, description="Consecutive upstream failures that open the breaker")
+    openai_breaker_open_seconds: float = Field(default=30.0, gt=0, description="How long an open breaker fails fast")
+    rate_limit_enabled: bool = Field(default=True, alias="RATE_LIMIT_ENABLED")
+    rate_limit_backend: Literal["memory", "database"] = Field(
+        default="memory", alias="RATE_LIMIT_BACKEND", description="database shares buckets across workers via the app DB"
+    )
+    rate_limit_ip_per_minute: float = Field(default=30.0, gt=0, description="Sustained chat requests per client IP")
+    rate_limit_ip_burst: int = Field(default=15, ge=1, description="Chat requests one IP may send back to back")
+    rate_limit_household_per_minute: float = Field(default=20.0, gt=0, description="Sustained chat requests per household")
+    rate_limit_household_burst: int = Field(default=10, ge=1)
+    token_quota_per_day: int = Field(
+        default=200_000, ge=1, alias="TOKEN_QUOTA_PER_DAY", description="OpenAI tokens per household (or IP) per rolling day"
+    )
+    rate_limit_max_keys: int = Field(default=100_000, ge=1, description="Buckets kept in memory before the idlest are dropped")
     chat_model: str = Field(default="gpt-4o-mini", description="Primary chat completion model")
     embedding_model: str = Field(default="text-embedding-3-large", description="Embedding model name")
+    embedding_dimensions: int | None = Field(
+        default=None, ge=1, description="Requested embedding size; None keeps the model's native size"
+    )
+    embedding_cache_enabled: bool = Field(default=True, alias="EMBEDDING_CACHE_ENABLED")
+    embedding_cache_max_mb: int = Field(default=512, ge=1, description="Evict least recently used vectors above this size")
 
     vector_backend: VectorBackend = Field(default="pgvector", alias="VECTOR_BACKEND")
     database_url: str = Field(
@@ -36,9 +67,26 @@ class Settings(BaseSettings):
     )
     chroma_persist_dir: str = Field(default="/data/chroma", alias="CHROMA_PERSIST_DIR")
 
+    db_pool_size: int = Field(default=10, ge=1, alias="DB_POOL_SIZE", description="Persistent connections per process")
+    db_max_overflow: int = Field(default=10, ge=0, alias="DB_MAX_OVERFLOW", description="Extra connections under burst")
+    db_pool_timeout: float = Field(default=10.0, gt=0, description="Seconds to wait for a free connection")
+    db_pool_recycle: int = Field(default=1800, description="Reconnect connections older than this many seconds; -1 disables")
+    db_pool_pre_ping: bool = Field(default=True, description="Check connections on checkout to survive DB restarts")
+    sqlite_busy_timeout_ms: int = Field(default=5000, ge=0, description="How long SQLite writers wait on a lock")
+    sqlite_mmap_size_mb: int = Field(default=256, ge=0)
+    profile_cache_ttl_seconds: float = Field(default=300.0, gt=0, description="How long a cached household profile is served")
+    profile_cache_negative_ttl_seconds: float = Field(
+        default=30.0, gt=0, description="How long an unknown household id is remembered as missing"
+    )
+    profile_cache_max_entries: int = Field(default=10_000, ge=1)
+
     jwt_secret: str = Field(default="change-me", alias="JWT_SECRET")
     jwt_algorithm: str = Field(default="HS256")
     jwt_exp_minutes: int = Field(default=60 * 24)
+    token_cache_ttl_seconds: float = Field(default=60.0, gt=0, description="How long verified token claims are reused")
+    token_cache_max_entries: int = Field(default=4096, ge=1)
+    bcrypt_rounds: int = Field(default=12, ge=4, le=31, alias="BCRYPT_ROUNDS", description="bcrypt cost factor (log2 rounds)")
+    password_hash_workers: int = Field(default=2, ge=1, description="Threads that may run bcrypt at once")
 
     cors_origins: str | list[str] = Field(default="*", alias="CORS_ORIGINS")
     allowed_hosts: str | list[str] = Field(default="*", alias="ALLOWED_HOSTS")
@@ -48,9 +96,41 @@ class Settings(BaseSettings):
     aws_access_key_id: str = Field(default="", alias="AWS_ACCESS_KEY_ID")
     aws_secret_access_key: str = Field(default="", alias="AWS_SECRET_ACCESS_KEY")
 
+    blob_backend: BlobBackend = Field(default="s3", alias="BLOB_BACKEND", description="Where original uploads are archived")
+    blob_local_dir: str = Field(default="/data/blobs", alias="BLOB_LOCAL_DIR")
+    blob_multipart_threshold_mb: int = Field(default=8, ge=5)
+    blob_multipart_chunk_mb: int = Field(default=8, ge=5)
+    blob_upload_attempts: int = Field(default=5, ge=1)
+
     sqlalchemy_echo: bool = Field(default=False)
 
-    max_context_docs: int = Field(default=6)
+    chat_retention_months: int = Field(
+        default=12, ge=1, alias="CHAT_RETENTION_MONTHS", description="Full months of chat history kept in the database"
+    )
+    chat_archive_prefix: str = Field(default="archives/chat", description="Blob key prefix for archived chat history")
+    chat_partitions_ahead: int = Field(default=3, ge=1, description="Monthly chat partitions created in advance (Postgres)")
+
+    ingest_workers: int = Field(default=2, ge=1, description="Concurrent background ingestion jobs")
+    ingest_queue_size: int = Field(default=100, ge=1)
+    ingest_spool_dir: str = Field(default="/data/ingest", alias="INGEST_SPOOL_DIR")
+    ingest_stale_job_minutes: float = Field(
+        default=15.0, gt=0, description="A running job without progress for this long is queued again for any worker"
+    )
+    ingest_failed_spool_days: float = Field(
+        default=7.0, gt=0, description="How long the upload of a failed job is kept so the job can be retried"
+    )
+    chunk_max_tokens: int = Field(default=400, ge=32, description="Upper bound on embedding tokens per chunk")
+    chunk_overlap_tokens: int = Field(default=48, ge=0, description="Overlap used only when a split falls mid-sentence")
+    embedding_batch_size: int = Field(default=64, ge=1, description="Chunks per embeddings request during ingestion")
+    dedup_enabled: bool = Field(default=True, alias="DEDUP_ENABLED", description="Collapse near-duplicate chunks at ingest")
+    dedup_threshold: float = Field(default=0.8, ge=0.5, le=1.0, description="Estimated Jaccard similarity for a duplicate")
+
+    max_context_docs: int = Field(default=6, description="Passages placed in the prompt after MMR selection")
+    context_max_tokens: int = Field(
+        default=2400, ge=1, description="Token budget for the full passage texts sent to the model"
+    )
+    retrieval_fetch_k: int = Field(default=20, ge=1, description="Candidates fetched from the vector store before MMR")
+    mmr_lambda: float = Field(default=0.7, ge=0.0, le=1.0, description="1.0 ranks purely by relevance, lower favours diversity")
     max_response_words: int = Field(default=300)
 
     default_daily_tips: dict[str, list[str]] = Field(
@@ -1,13 +1,15 @@
 """CRUD helpers for application data."""
 from __future__ import annotations
 
+from datetime import datetime
 from typing import Dict, List, Optional
 
-from sqlalchemy import select
-from sqlalchemy.orm import Session
+from sqlalchemy import case, delete, func, select, tuple_, update
+from sqlalchemy.orm import Session, selectinload
 
 from app.core.security import get_password_hash
 from app.db import models
+from app.db.profiles import mark_household_stale
 
 
 def get_chunk_ids_by_document(session: Session, document_id: str) -> list[str]:
@@ -16,12 +18,248 @@ def get_chunk_ids_by_document(session: Session, document_id: str) -> list[str]:
 
 
 def delete_document_metadata(session: Session, document_id: str) -> int:
-    stmt = select(models.DocumentMeta).where(models.DocumentMeta.document_id == document_id)
-    rows = session.scalars(stmt).all()
-    deleted = len(rows)
-    for row in rows:
-        session.delete(row)
-    return deleted
+    stmt = delete(models.DocumentMeta).where(models.DocumentMeta.document_id == document_id)
+    return session.execute(stmt).rowcount
+
+
+_IN_BATCH = 500
+
+
+def get_cached_embeddings(session: Session, *, model: str, dimensions: int, text_hashes: list[str]) -> dict[str, bytes]:
+    entry = models.EmbeddingCacheEntry
+    found: dict[str, bytes] = {}
+    for start in range(0, len(text_hashes), _IN_BATCH):
+        stmt = select(entry.text_hash, entry.vector).where(
+            entry.model == model,
+            entry.dimensions == dimensions,
+            entry.text_hash.in_(text_hashes[start : start + _IN_BATCH]),
+        )
+        found.update(session.execute(stmt).tuples().all())
+    return found
+
+
+def touch_cached_embeddings(
+    session: Session, *, model: str, dimensions: int, text_hashes: list[str], used_at: datetime, stale_before: datetime
+) -> None:
+    """Bump ``last_used_at`` for entries not already touched since ``stale_before``."""
+
+    entry = models.EmbeddingCacheEntry
+    for start in range(0, len(text_hashes), _IN_BATCH):
+        stmt = (
+            update(entry)
+            .where(
+                entry.model == model,
+                entry.dimensions == dimensions,
+                entry.text_hash.in_(text_hashes[start : start + _IN_BATCH]),
+                entry.last_used_at < stale_before,
+            )
+            .values(last_used_at=used_at)
+        )
+        session.execute(stmt)
+
+
+def put_cached_embeddings(session: Session, *, model: str, dimensions: int, vectors: dict[str, bytes]) -> None:
+    if not vectors:
+        return
+    if session.get_bind().dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+
+    now = datetime.utcnow()
+    rows = [
+        {
+            "model": model,
+            "dimensions": dimensions,
+            "text_hash": text_hash,
+            "vector": vector,
+            "nbytes": len(vector),
+            "created_at": now,
+            "last_used_at": now,
+        }
+        for text_hash, vector in vectors.items()
+    ]
+    # Another worker may have embedded the same text concurrently; either copy will do.
+    session.execute(insert(models.EmbeddingCacheEntry).on_conflict_do_nothing(), rows)
+
+
+def update_rate_limit_bucket(
+    session: Session, *, key: str, cost: float, rate: float, capacity: float, now: float, conditional: bool = True
+) -> tuple[float, bool]:
+    """Refill bucket ``key`` to ``now`` and remove ``cost`` tokens in one upsert.
+
+    With ``conditional`` the tokens are only removed when the refilled level
+    covers ``cost``; otherwise they always are and the level may go negative.
+    Returns the new level and whether the tokens were removed.
+    """
+
+    if session.get_bind().dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+
+    bucket = models.RateLimitBucket.__table__.c
+    refilled = bucket.tokens + (now - bucket.updated_at) * rate
+    level = case((refilled > capacity, capacity), else_=refilled)
+    allowed = level >= cost if conditional else True
+    stmt = (
+        insert(models.RateLimitBucket)
+        .values(key=key, tokens=capacity - cost, updated_at=now, allowed=not conditional or capacity >= cost)
+        .on_conflict_do_update(
+            index_elements=[bucket.key],
+            set_={
+                "tokens": case((allowed, level - cost), else_=level) if conditional else level - cost,
+                "updated_at": now,
+                "allowed": allowed,
+            },
+        )
+        .returning(bucket.tokens, bucket.allowed)
+    )
+    tokens, took = session.execute(stmt).one()
+    return tokens, bool(took)
+
+
+def evict_cached_embeddings(session: Session, *, max_bytes: int, target_ratio: float = 0.9) -> int:
+    """Drop least recently used vectors once the cache exceeds ``max_bytes``.
+
+    Evicts down to ``target_ratio`` of the budget so the next few writes don't
+    trigger another pass. Returns the number of rows removed.
+    """
+
+    entry = models.EmbeddingCacheEntry
+    total = session.scalar(select(func.coalesce(func.sum(entry.nbytes), 0)))
+    if total <= max_bytes:
+        return 0
+    to_free = total - int(max_bytes * target_ratio)
+    freed = 0
+    cutoff: datetime | None = None
+    rows = session.execute(select(entry.last_used_at, entry.nbytes).order_by(entry.last_used_at)).yield_per(1000)
+    for last_used_at, nbytes in rows:
+        freed += nbytes
+        cutoff = last_used_at
+        if freed >= to_free:
+            break
+    rows.close()
+    if cutoff is None:
+        return 0
+    return session.execute(delete(entry).where(entry.last_used_at <= cutoff)).rowcount
+
+
+def find_lsh_candidates(session: Session, buckets: list[str]) -> list[tuple[str, str]]:
+    """Return ``(bucket, chunk_id)`` pairs for stored chunks in any of ``buckets``."""
+
+    rows: list[tuple[str, str]] = []
+    for start in range(0, len(buckets), _IN_BATCH):
+        stmt = select(models.ChunkLshBucket.bucket, models.ChunkLshBucket.chunk_id).where(
+            models.ChunkLshBucket.bucket.in_(buckets[start : start + _IN_BATCH])
+        )
+        rows.extend(session.execute(stmt).tuples().all())
+    return rows
+
+
+def get_chunk_signatures(session: Session, chunk_ids: list[str]) -> dict[str, bytes]:
+    found: dict[str, bytes] = {}
+    for start in range(0, len(chunk_ids), _IN_BATCH):
+        stmt = select(models.ChunkSignature.chunk_id, models.ChunkSignature.signature).where(
+            models.ChunkSignature.chunk_id.in_(chunk_ids[start : start + _IN_BATCH])
+        )
+        found.update(session.execute(stmt).tuples().all())
+    return found
+
+
+def add_chunk_signatures(
+    session: Session, *, document_id: str, signatures: dict[str, bytes], buckets: dict[str, list[str]]
+) -> None:
+    """Index stored chunks: ``signatures`` and ``buckets`` are keyed by chunk id."""
+
+    if not signatures:
+        return
+    ids = list(signatures)
+    delete_chunk_signatures(session, ids)
+    session.execute(
+        models.ChunkSignature.__table__.insert(),
+        [{"chunk_id": chunk_id, "document_id": document_id, "signature": signature} for chunk_id, signature in signatures.items()],
+    )
+    session.execute(
+        models.ChunkLshBucket.__table__.insert(),
+        [{"bucket": bucket, "chunk_id": chunk_id} for chunk_id, keys in buckets.items() for bucket in keys],
+    )
+
+
+def delete_chunk_signatures(session: Session, chunk_ids: list[str]) -> None:
+    """Drop chunks from the duplicate index, along with duplicates that pointed at them.
+
+    Links from other documents should be promoted first (``ingest.promote_duplicates``),
+    or their content drops out of retrieval.
+    """
+
+    for start in range(0, len(chunk_ids), _IN_BATCH):
+        batch = chunk_ids[start : start + _IN_BATCH]
+        session.execute(delete(models.ChunkLshBucket).where(models.ChunkLshBucket.chunk_id.in_(batch)))
+        session.execute(delete(models.ChunkSignature).where(models.ChunkSignature.chunk_id.in_(batch)))
+        session.execute(delete(models.ChunkDuplicate).where(models.ChunkDuplicate.canonical_chunk_id.in_(batch)))
+
+
+def record_chunk_duplicates(session: Session, duplicates: list[dict[str, object]]) -> None:
+    for fields in duplicates:
+        session.merge(models.ChunkDuplicate(**fields))
+
+
+def prune_chunk_duplicates(session: Session, document_id: str, keep_chunk_ids: set[str] | None = None) -> int:
+    """Delete a document's duplicate links, except those in ``keep_chunk_ids``."""
+
+    stmt = delete(models.ChunkDuplicate).where(models.ChunkDuplicate.document_id == document_id)
+    if keep_chunk_ids:
+        stmt = stmt.where(models.ChunkDuplicate.chunk_id.not_in(list(keep_chunk_ids)))
+    return session.execute(stmt).rowcount
+
+
+def list_duplicates_of(
+    session: Session, canonical_chunk_ids: list[str], *, exclude_document_id: Optional[str] = None
+) -> list[models.ChunkDuplicate]:
+    """Links pointing at any of ``canonical_chunk_ids``, most similar first."""
+
+    links: list[models.ChunkDuplicate] = []
+    for start in range(0, len(canonical_chunk_ids), _IN_BATCH):
+        stmt = select(models.ChunkDuplicate).where(
+            models.ChunkDuplicate.canonical_chunk_id.in_(canonical_chunk_ids[start : start + _IN_BATCH])
+        )
+        if exclude_document_id:
+            stmt = stmt.where(models.ChunkDuplicate.document_id != exclude_document_id)
+        links.extend(session.scalars(stmt))
+    return sorted(links, key=lambda link: (-link.similarity, link.chunk_id))
+
+
+def promote_chunk_duplicate(session: Session, link: models.ChunkDuplicate) -> None:
+    """Make the stored copy of ``link``'s chunk the canonical for the links that shared its canonical."""
+
+    session.execute(
+        update(models.ChunkDuplicate)
+        .where(
+            models.ChunkDuplicate.canonical_chunk_id == link.canonical_chunk_id,
+            models.ChunkDuplicate.chunk_id != link.chunk_id,
+        )
+        .values(canonical_chunk_id=link.chunk_id, canonical_document_id=link.document_id)
+    )
+    registry = session.get(models.DocumentRegistry, link.document_id)
+    if registry:
+        registry.chunk_count += 1
+    session.delete(link)
+
+
+def list_chunk_duplicates(session: Session, *, limit: int = 200) -> list[tuple[models.ChunkDuplicate, Optional[str]]]:
+    """Most recent duplicate links with the canonical chunk's file name."""
+
+    stmt = (
+        select(models.ChunkDuplicate, models.DocumentRegistry.file_name)
+        .outerjoin(
+            models.DocumentRegistry,
+            models.DocumentRegistry.document_id == models.ChunkDuplicate.canonical_document_id,
+        )
+        .order_by(models.ChunkDuplicate.updated_at.desc())
+        .limit(limit)
+    )
+    return list(session.execute(stmt).tuples().all())
 
 
 def upsert_document_registry(
@@ -50,8 +288,42 @@ def upsert_document_registry(
     return registry
 
 
-def list_documents(session: Session) -> list[models.DocumentRegistry]:
-    stmt = select(models.DocumentRegistry).order_by(models.DocumentRegistry.updated_at.desc())
+def get_document_registry(session: Session, document_id: str) -> Optional[models.DocumentRegistry]:
+    return session.get(models.DocumentRegistry, document_id)
+
+
+def mark_document_uploaded(session: Session, document_id: str) -> None:
+    registry = session.get(models.DocumentRegistry, document_id)
+    if registry:
+        registry.s3_uploaded = True
+
+
+def list_documents(
+    session: Session,
+    *,
+    limit: int = 100,
+    after: Optional[tuple[datetime, str]] = None,
+    topic: Optional[str] = None,
+    age_range: Optional[str] = None,
+    language: Optional[str] = None,
+) -> list[models.DocumentRegistry]:
+    """One page of the registry, most recently updated first.
+
+    ``after`` is the ``(updated_at, document_id)`` key of the last row of the
+    previous page; the next page starts strictly below it, so each page is a
+    single range scan on ``ix_document_registry_updated_at_document_id``.
+    """
+
+    registry = models.DocumentRegistry
+    stmt = select(registry).order_by(registry.updated_at.desc(), registry.document_id.desc()).limit(limit)
+    if after is not None:
+        stmt = stmt.where(tuple_(registry.updated_at, registry.document_id) < tuple_(*after))
+    if topic:
+        stmt = stmt.where(registry.topic == topic)
+    if age_range:
+        stmt = stmt.where(registry.age_range == age_range)
+    if language:
+        stmt = stmt.where(registry.language == language)
     return session.scalars(stmt).all()
 
 
@@ -61,8 +333,101 @@ def delete_document_registry(session: Session, document_id: str) -> None:
         session.delete(registry)
 
 
-def get_household(session: Session, household_id: str) -> Optional[models.Household]:
-    return session.get(models.Household, household_id)
+def create_ingest_job(
+    session: Session,
+    *,
+    file_name: str,
+    spool_path: str,
+    overrides: dict[str, str],
+    document_id: Optional[str] = None,
+) -> models.IngestJob:
+    job = models.IngestJob(
+        file_name=file_name,
+        spool_path=spool_path,
+        overrides=overrides,
+        document_id=document_id,
+        status="queued",
+    )
+    session.add(job)
+    session.flush()
+    return job
+
+
+def get_ingest_job(session: Session, job_id: str) -> Optional[models.IngestJob]:
+    return session.get(models.IngestJob, job_id)
+
+
+def update_ingest_job(session: Session, job_id: str, **fields: object) -> None:
+    job = session.get(models.IngestJob, job_id)
+    if job is None:
+        return
+    for key, value in fields.items():
+        setattr(job, key, value)
+    session.flush()
+
+
+def list_unfinished_ingest_jobs(session: Session) -> list[models.IngestJob]:
+    stmt = (
+        select(models.IngestJob)
+        .where(models.IngestJob.status.in_(("queued", "running")))
+        .order_by(models.IngestJob.created_at)
+    )
+    return session.scalars(stmt).all()
+
+
+def claim_ingest_job(session: Session, job_id: str) -> bool:
+    """Move a queued job to running; False when another worker took it first."""
+
+    stmt = (
+        update(models.IngestJob)
+        .where(models.IngestJob.id == job_id, models.IngestJob.status == "queued")
+        .values(status="running", error=None)
+    )
+    return session.execute(stmt).rowcount == 1
+
+
+def claim_next_ingest_job(session: Session) -> Optional[str]:
+    """Claim the oldest queued job and return its id; None when none is left."""
+
+    stmt = (
+        select(models.IngestJob.id)
+        .where(models.IngestJob.status == "queued")
+        .order_by(models.IngestJob.created_at)
+        .limit(1)
+        .with_for_update(skip_locked=True)
+    )
+    while (job_id := session.scalars(stmt).first()) is not None:
+        if claim_ingest_job(session, job_id):
+            return job_id
+    return None
+
+
+def requeue_stale_ingest_jobs(session: Session, *, updated_before: datetime) -> int:
+    """Queue running jobs again whose worker stopped reporting progress, e.g. after a crash."""
+
+    stmt = (
+        update(models.IngestJob)
+        .where(models.IngestJob.status == "running", models.IngestJob.updated_at < updated_before)
+        .values(status="queued")
+    )
+    return session.execute(stmt).rowcount
+
+
+def list_failed_ingest_jobs(session: Session, *, updated_before: datetime) -> list[models.IngestJob]:
+    stmt = select(models.IngestJob).where(
+        models.IngestJob.status == "failed", models.IngestJob.updated_at < updated_before
+    )
+    return session.scalars(stmt).all()
+
+
+def get_household(session: Session, household_id: str, *, with_children: bool = False) -> Optional[models.Household]:
+    options = [selectinload(models.Household.children)] if with_children else []
+    return session.get(models.Household, household_id, options=options)
+
+
+def list_households(session: Session) -> list[models.Household]:
+    stmt = select(models.Household).options(selectinload(models.Household.children)).order_by(models.Household.name)
+    return session.scalars(stmt).all()
 
 
 def get_household_by_email(session: Session, email: str) -> Optional[models.Household]:
@@ -78,6 +443,26 @@ def upsert_household(session: Session, *, name: str, country: str, language_pref
     household = models.Household(name=name, country=country, language_preference=language_preference)
     session.add(household)
     session.flush()
+    mark_household_stale(session, household.id)  # drops a cached miss for the id
+    return household
+
+
+def update_household(
+    session: Session,
+    household: models.Household,
+    *,
+    name: Optional[str] = None,
+    country: Optional[str] = None,
+    language_preference: Optional[str] = None,
+) -> models.Household:
+    if name:
+        household.name = name
+    if country:
+        household.country = country
+    if language_preference:
+        household.language_preference = language_preference
+    session.flush()
+    mark_household_stale(session, household.id)
     return household
 
 
@@ -86,13 +471,20 @@ def create_parent_user(
     *,
     household: models.Household,
     email: str,
-    password: str,
+    password: str | None = None,
+    password_hash: str | None = None,
     is_admin: bool = False,
 ) -> models.ParentUser:
+    """Create a parent from a plain ``password`` or one hashed beforehand off the event loop."""
+
+    if password_hash is None:
+        if password is None:
+            raise ValueError("password or password_hash is required")
+        password_hash = get_password_hash(password)
     parent = models.ParentUser(
         household_id=household.id,
         email=email,
-        password_hash=get_password_hash(password),
+        password_hash=password_hash,
         is_admin=is_admin,
     )
     session.add(parent)
@@ -111,6 +503,7 @@ def upsert_child(
     child = models.Child(household_id=household_id, name=name, age=age, favorite_topics=favorite_topics)
     session.add(child)
     session.flush()
+    mark_household_stale(session, household_id)
     return child
 
 
@@ -124,7 +517,7 @@ def record_chat_log(
     assistant_message: str,
     needs_human: bool,
     safety_reasons: list[str],
-    context_snippets: list[str],
+    context_refs: list[dict[str, object]],
 ) -> models.ChatLog:
     log = models.ChatLog(
         household_id=household_id,
@@ -134,13 +527,26 @@ def record_chat_log(
         assistant_message=assistant_message,
         needs_human=needs_human,
         safety_reasons=safety_reasons or None,
-        context_snippets=context_snippets or None,
+        context_refs=context_refs or None,
     )
     session.add(log)
     session.flush()
     return log
 
 
+def list_chat_logs(
+    session: Session, *, limit: int = 50, household_id: Optional[str] = None
+) -> list[models.ChatLog]:
+    stmt = select(models.ChatLog).order_by(models.ChatLog.created_at.desc()).limit(limit)
+    if household_id:
+        stmt = stmt.where(models.ChatLog.household_id == household_id)
+    return list(session.scalars(stmt).all())
+
+
+def get_chat_log(session: Session, log_id: str) -> Optional[models.ChatLog]:
+    return session.get(models.ChatLog, log_id)
+
+
 def log_turn(session: Session, thread_id: str, role: str, content: str) -> None:
     turn = models.ChatTurn(thread_id=thread_id, role=role, content=content)
     session.add(turn)
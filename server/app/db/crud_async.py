@@ -0,0 +1,49 @@
+"""Async forms of the crud helpers for request handlers.
+
+Each helper runs its ``app.db.crud`` counterpart through ``AsyncSession.run_sync``,
+so the query logic lives in one place while the driver I/O (psycopg async or
+aiosqlite) is awaited instead of blocking the event loop. Pass the session from
+``async_session_scope`` as the first argument, exactly like the sync helpers.
+"""
+from __future__ import annotations
+
+from functools import wraps
+from typing import Any, Awaitable, Callable, TypeVar
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db import crud
+
+T = TypeVar("T")
+
+
+def _async(fn: Callable[..., T]) -> Callable[..., Awaitable[T]]:
+    @wraps(fn)
+    async def wrapper(session: AsyncSession, *args: Any, **kwargs: Any) -> T:
+        return await session.run_sync(fn, *args, **kwargs)
+
+    return wrapper
+
+
+fetch_history = _async(crud.fetch_history)
+log_turn = _async(crud.log_turn)
+record_chat_log = _async(crud.record_chat_log)
+list_chat_logs = _async(crud.list_chat_logs)
+get_chat_log = _async(crud.get_chat_log)
+
+get_household = _async(crud.get_household)
+upsert_household = _async(crud.upsert_household)
+update_household = _async(crud.update_household)
+create_parent_user = _async(crud.create_parent_user)
+upsert_child = _async(crud.upsert_child)
+
+get_document_registry = _async(crud.get_document_registry)
+list_documents = _async(crud.list_documents)
+delete_document_metadata = _async(crud.delete_document_metadata)
+delete_document_registry = _async(crud.delete_document_registry)
+delete_chunk_signatures = _async(crud.delete_chunk_signatures)
+prune_chunk_duplicates = _async(crud.prune_chunk_duplicates)
+list_chunk_duplicates = _async(crud.list_chunk_duplicates)
+get_ingest_job = _async(crud.get_ingest_job)
+
+update_rate_limit_bucket = _async(crud.update_rate_limit_bucket)
@@ -6,7 +6,7 @@ from typing import Optional
 from uuid import uuid4
 
 from pgvector.sqlalchemy import Vector
-from sqlalchemy import JSON, Boolean, Column, DateTime, ForeignKey, Integer, String, Text
+from sqlalchemy import JSON, Boolean, Column, DateTime, Float, ForeignKey, Index, Integer, LargeBinary, String, Text
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from sqlalchemy.sql import func
@@ -68,12 +68,16 @@ class DocumentMeta(Base, TimestampMixin):
     tone: Mapped[str] = mapped_column(String(32), default="supportive")
     country: Mapped[str] = mapped_column(String(8), default="jo")
     language: Mapped[str] = mapped_column(String(8), default="ar")
+    heading_path: Mapped[str] = mapped_column(String(512), default="")
     content: Mapped[str] = mapped_column(Text)
     embedding: Mapped[list[float]] = Column(Vector(3072))
 
 
 class ChatLog(Base, TimestampMixin):
+    """One answered chat request. Range-partitioned by month on Postgres, like ``ChatTurn``."""
+
     __tablename__ = "chat_logs"
+    __table_args__ = (Index("ix_chat_logs_created_at", "created_at"),)
 
     id: Mapped[str] = mapped_column(UUID(as_uuid=False), primary_key=True, default=lambda: str(uuid4()))
     household_id: Mapped[Optional[str]] = mapped_column(String(64), nullable=True, index=True)
@@ -83,11 +87,16 @@ class ChatLog(Base, TimestampMixin):
     assistant_message: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
     needs_human: Mapped[bool] = mapped_column(Boolean, default=False)
     safety_reasons: Mapped[Optional[list[str]]] = mapped_column(JSON, nullable=True)
-    context_snippets: Mapped[Optional[list[str]]] = mapped_column(JSON, nullable=True)
+    # One {"chunk_ids": [...], "score": float} per passage given to the model; snippet text is
+    # rehydrated from the vector store on read. Rows converted from before this carry a "text" key
+    # when their snippet could not be traced back to a stored chunk.
+    context_refs: Mapped[Optional[list[dict]]] = mapped_column(JSON, nullable=True)
 
 
 class DocumentRegistry(Base, TimestampMixin):
     __tablename__ = "document_registry"
+    # Keyset pagination key for the admin listing (see ``crud.list_documents``).
+    __table_args__ = (Index("ix_document_registry_updated_at_document_id", "updated_at", "document_id"),)
 
     document_id: Mapped[str] = mapped_column(String(64), primary_key=True)
     file_name: Mapped[str] = mapped_column(String(255))
@@ -100,14 +109,108 @@ class DocumentRegistry(Base, TimestampMixin):
     s3_uploaded: Mapped[bool] = mapped_column(Boolean, default=False)
 
 
+class IngestJob(Base, TimestampMixin):
+    __tablename__ = "ingest_jobs"
+
+    id: Mapped[str] = mapped_column(String(64), primary_key=True, default=lambda: str(uuid4()))
+    status: Mapped[str] = mapped_column(String(16), default="queued", index=True)
+    file_name: Mapped[str] = mapped_column(String(255))
+    document_id: Mapped[Optional[str]] = mapped_column(String(64), nullable=True)
+    spool_path: Mapped[str] = mapped_column(String(512))
+    overrides: Mapped[Optional[dict[str, str]]] = mapped_column(JSON, nullable=True)
+    chunks_total: Mapped[int] = mapped_column(Integer, default=0)
+    chunks_embedded: Mapped[int] = mapped_column(Integer, default=0)
+    chunks_stored: Mapped[int] = mapped_column(Integer, default=0)
+    error: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
+
+
+class EmbeddingCacheEntry(Base):
+    """One embedding vector, stored as raw float32 bytes, keyed by the text that produced it."""
+
+    __tablename__ = "embedding_cache"
+
+    model: Mapped[str] = mapped_column(String(64), primary_key=True)
+    # Requested output size; 0 means the model's native size.
+    dimensions: Mapped[int] = mapped_column(Integer, primary_key=True)
+    text_hash: Mapped[str] = mapped_column(String(64), primary_key=True)
+    vector: Mapped[bytes] = mapped_column(LargeBinary)
+    nbytes: Mapped[int] = mapped_column(Integer)
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+    last_used_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, index=True)
+
+
+class RateLimitBucket(Base):
+    """Shared token-bucket state for chat rate limits when several workers serve the API."""
+
+    __tablename__ = "rate_limit_buckets"
+
+    key: Mapped[str] = mapped_column(String(160), primary_key=True)
+    tokens: Mapped[float] = mapped_column(Float)
+    # Epoch seconds of the last refill; compared with the caller's clock, so workers need NTP-synced hosts.
+    updated_at: Mapped[float] = mapped_column(Float)
+    # Whether the last take() succeeded, returned alongside the level in one upsert.
+    allowed: Mapped[bool] = mapped_column(Boolean, default=True)
+
+
+# --- Near-duplicate detection ---
+
+
+class ChunkSignature(Base):
+    """MinHash signature of a stored chunk, for near-duplicate lookups at ingest."""
+
+    __tablename__ = "chunk_signatures"
+
+    chunk_id: Mapped[str] = mapped_column(String(128), primary_key=True)
+    document_id: Mapped[str] = mapped_column(String(64), index=True)
+    signature: Mapped[bytes] = mapped_column(LargeBinary)
+
+
+class ChunkLshBucket(Base):
+    """One LSH band bucket a stored chunk falls into; chunks sharing a bucket are candidates."""
+
+    __tablename__ = "chunk_lsh_buckets"
+
+    bucket: Mapped[str] = mapped_column(String(32), primary_key=True)
+    chunk_id: Mapped[str] = mapped_column(String(128), primary_key=True, index=True)
+
+
+class ChunkDuplicate(Base, TimestampMixin):
+    """A chunk that was not stored because a near-identical canonical chunk already was."""
+
+    __tablename__ = "chunk_duplicates"
+
+    chunk_id: Mapped[str] = mapped_column(String(128), primary_key=True)
+    document_id: Mapped[str] = mapped_column(String(64), index=True)
+    file_name: Mapped[str] = mapped_column(String(255))
+    canonical_chunk_id: Mapped[str] = mapped_column(String(128), index=True)
+    canonical_document_id: Mapped[str] = mapped_column(String(64))
+    similarity: Mapped[float] = mapped_column(Float)
+    preview: Mapped[str] = mapped_column(Text, default="")
+    # The full chunk, so it can take over as canonical when the canonical chunk is deleted.
+    content: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
+    heading_path: Mapped[str] = mapped_column(String(512), default="")
+
+
 # --- Chat memory (per-thread) ---
 
 
 class ChatTurn(Base):
+    """One message in a thread.
+
+    Range-partitioned by month on Postgres, where the primary key must include ``created_at``.
+    The ORM keeps identifying rows by their random ``id``.
+    """
+
     __tablename__ = "chat_turns"
 
     id: Mapped[str] = mapped_column(String(64), primary_key=True, default=lambda: str(uuid4()))
-    thread_id: Mapped[str] = mapped_column(String(128), nullable=False, index=True)
+    thread_id: Mapped[str] = mapped_column(String(128), nullable=False)
     role: Mapped[str] = mapped_column(String(16), nullable=False)
     content: Mapped[str] = mapped_column(Text, nullable=False)
-    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now(), index=True)
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now())
+
+
+# Serves fetch_history's newest-first scan of one thread without a sort. Not covering: role and
+# content come from the heap, at most ``limit`` rows. INCLUDE (content) would put long messages
+# over the btree row size limit and make their inserts fail.
+Index("ix_chat_turns_thread_id_created_at", ChatTurn.thread_id, ChatTurn.created_at.desc())
@@ -0,0 +1,287 @@
+"""Monthly partitions and archive-then-drop retention for chat history tables.
+
+On Postgres, ``chat_turns`` and ``chat_logs`` are range-partitioned by month on
+``created_at`` (see the ``partition_chat_history`` migration), with a default
+partition as a safety net. ``ensure_partitions`` keeps the coming months
+created ahead of time; it runs at startup and then every few hours through
+``PartitionMaintainer``. If rows did land in the default partition, creating
+their month moves them into it. Retention writes each expired month to a gzip NDJSON
+archive and only removes the rows after the archive is stored. On Postgres it
+detaches and drops the month's partition. On SQLite, or on tables that were
+never partitioned, it deletes the month's rows.
+"""
+from __future__ import annotations
+
+import asyncio
+import gzip
+import json
+import re
+import tempfile
+from dataclasses import dataclass
+from datetime import date, datetime, timezone
+from pathlib import Path
+from typing import Mapping, Optional
+
+from loguru import logger
+from sqlalchemy import Connection, Engine, Table, delete, func, select, text
+
+from app.core.blobstore import BlobStore
+from app.db import models
+
+# Table name -> whether created_at is timestamptz; bounds must match the column type.
+PARTITIONED_TABLES: dict[str, bool] = {"chat_turns": True, "chat_logs": False}
+_PARTITION_RE = re.compile(r"_p(\d{4})(\d{2})$")
+# How often a running app checks that the coming months have partitions.
+MAINTENANCE_SECONDS = 6 * 3600.0
+
+
+def month_start(value: datetime | date) -> date:
+    return date(value.year, value.month, 1)
+
+
+def add_months(month: date, count: int) -> date:
+    index = month.year * 12 + month.month - 1 + count
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(table: str, month: date) -> str:
+    return f"{table}_p{month:%Y%m}"
+
+
+def _table(name: str) -> Table:
+    return models.Base.metadata.tables[name]
+
+
+def _bound(month: date, aware: bool) -> datetime:
+    moment = datetime(month.year, month.month, 1)
+    return moment.replace(tzinfo=timezone.utc) if aware else moment
+
+
+def _bound_literal(month: date, aware: bool) -> str:
+    return f"'{month:%Y-%m-%d} 00:00:00{'+00' if aware else ''}'"
+
+
+def is_partitioned(connection: Connection, table: str) -> bool:
+    if connection.dialect.name != "postgresql":
+        return False
+    stmt = text(
+        "SELECT 1 FROM pg_partitioned_table p JOIN pg_class c ON c.oid = p.partrelid "
+        "WHERE c.relname = :table AND c.relnamespace = to_regnamespace(current_schema())"
+    )
+    return connection.execute(stmt, {"table": table}).first() is not None
+
+
+def list_partitions(connection: Connection, table: str) -> list[date]:
+    """Months that have a dedicated partition, oldest first."""
+
+    stmt = text(
+        "SELECT child.relname FROM pg_inherits i "
+        "JOIN pg_class parent ON parent.oid = i.inhparent JOIN pg_class child ON child.oid = i.inhrelid "
+        "WHERE parent.relname = :table AND parent.relnamespace = to_regnamespace(current_schema())"
+    )
+    months = []
+    for (name,) in connection.execute(stmt, {"table": table}):
+        match = _PARTITION_RE.search(name)
+        if match:
+            months.append(date(int(match.group(1)), int(match.group(2)), 1))
+    return sorted(months)
+
+
+def _default_partition(connection: Connection, table: str) -> str | None:
+    stmt = text(
+        "SELECT child.relname FROM pg_inherits i "
+        "JOIN pg_class parent ON parent.oid = i.inhparent JOIN pg_class child ON child.oid = i.inhrelid "
+        "WHERE parent.relname = :table AND parent.relnamespace = to_regnamespace(current_schema()) "
+        "AND pg_get_expr(child.relpartbound, child.oid) = 'DEFAULT'"
+    )
+    return connection.execute(stmt, {"table": table}).scalar()
+
+
+def create_partition(connection: Connection, table: str, month: date) -> None:
+    """Create the partition for ``month``, moving any of its rows out of the default partition.
+
+    Postgres refuses a new partition while the default one holds rows in its range, which
+    happens once inserts outrun ``ensure_partitions``. The default partition is then
+    detached, the month created, its rows moved over and the default attached again, all
+    in the caller's transaction.
+    """
+
+    aware = PARTITIONED_TABLES[table]
+    name = partition_name(table, month)
+    lower, upper = _bound_literal(month, aware), _bound_literal(add_months(month, 1), aware)
+    bounds = f"FOR VALUES FROM ({lower}) TO ({upper})"
+    in_month = f"created_at >= {lower} AND created_at < {upper}"
+    default = _default_partition(connection, table)
+    if default is None or connection.execute(text(f"SELECT 1 FROM {default} WHERE {in_month} LIMIT 1")).first() is None:
+        connection.execute(text(f"CREATE TABLE IF NOT EXISTS {name} PARTITION OF {table} {bounds}"))
+        return
+    connection.execute(text(f"ALTER TABLE {table} DETACH PARTITION {default}"))
+    connection.execute(text(f"CREATE TABLE {name} PARTITION OF {table} {bounds}"))
+    connection.execute(
+        text(f"WITH moved AS (DELETE FROM {default} WHERE {in_month} RETURNING *) INSERT INTO {table} SELECT * FROM moved")
+    )
+    connection.execute(text(f"ALTER TABLE {table} ATTACH PARTITION {default} DEFAULT"))
+
+
+def ensure_partitions(connection: Connection, *, months_ahead: int = 3, today: date | None = None) -> None:
+    """Create partitions for the current month and the next ``months_ahead`` months."""
+
+    if connection.dialect.name != "postgresql":
+        return
+    # Every worker runs this at startup and then periodically; one at a time.
+    connection.execute(text("SELECT pg_advisory_xact_lock(hashtext('family_ai_ensure_partitions'))"))
+    current = month_start(today or datetime.now(timezone.utc))
+    for table in PARTITIONED_TABLES:
+        if not is_partitioned(connection, table):
+            continue
+        existing = set(list_partitions(connection, table))
+        for offset in range(months_ahead + 1):
+            month = add_months(current, offset)
+            if month not in existing:
+                create_partition(connection, table, month)
+
+
+class PartitionMaintainer:
+    """Re-runs ``ensure_partitions`` while the app is up, so a long-lived process never
+    outruns the months created at startup."""
+
+    def __init__(self, engine: Engine, *, months_ahead: int, interval: float = MAINTENANCE_SECONDS) -> None:
+        self._engine = engine
+        self._months_ahead = months_ahead
+        self._interval = interval
+        self._task: Optional[asyncio.Task] = None
+
+    def ensure(self) -> None:
+        with self._engine.begin() as connection:
+            ensure_partitions(connection, months_ahead=self._months_ahead)
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self._interval)
+            try:
+                await asyncio.to_thread(self.ensure)
+            except Exception:  # the default partition still takes the rows; try again next round
+                logger.exception("Failed to create upcoming chat partitions")
+
+    async def start(self) -> None:
+        if self._task is None and self._engine.dialect.name == "postgresql":
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+def expired_months(connection: Connection, table: str, cutoff: date) -> list[date]:
+    """Months before ``cutoff`` that still hold rows or have a partition, oldest first."""
+
+    months = {month for month in list_partitions(connection, table) if month < cutoff} if is_partitioned(
+        connection, table
+    ) else set()
+    oldest = connection.execute(select(func.min(_table(table).c.created_at))).scalar()
+    if oldest is not None:
+        month = month_start(oldest)
+        while month < cutoff:
+            months.add(month)
+            month = add_months(month, 1)
+    return sorted(months)
+
+
+def _json_default(value: object) -> str:
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return str(value)
+
+
+def ndjson_line(row: Mapping[str, object]) -> str:
+    """One row as an NDJSON line, in the format used by the archives and the admin export."""
+
+    return json.dumps(dict(row), ensure_ascii=False, default=_json_default) + "\n"
+
+
+def archive_month(connection: Connection, table: str, month: date, path: Path, *, batch_size: int = 1000) -> int:
+    """Stream one month of ``table`` into a gzip NDJSON file at ``path``; returns the row count."""
+
+    source = _table(table)
+    aware = PARTITIONED_TABLES[table]
+    stmt = (
+        select(source)
+        .where(source.c.created_at >= _bound(month, aware), source.c.created_at < _bound(add_months(month, 1), aware))
+        .order_by(source.c.created_at)
+    )
+    count = 0
+    with gzip.open(path, "wt", encoding="utf-8") as archive:
+        result = connection.execute(stmt, execution_options={"stream_results": True, "yield_per": batch_size})
+        for row in result.mappings():
+            archive.write(ndjson_line(row))
+            count += 1
+    return count
+
+
+def drop_month(connection: Connection, table: str, month: date) -> None:
+    """Remove one month of rows, dropping its partition when there is one."""
+
+    if is_partitioned(connection, table) and month in list_partitions(connection, table):
+        name = partition_name(table, month)
+        connection.execute(text(f"ALTER TABLE {table} DETACH PARTITION {name}"))
+        connection.execute(text(f"DROP TABLE {name}"))
+    source = _table(table)
+    aware = PARTITIONED_TABLES[table]
+    # Rows that landed in the default partition, or a table that was never partitioned.
+    connection.execute(
+        delete(source).where(
+            source.c.created_at >= _bound(month, aware), source.c.created_at < _bound(add_months(month, 1), aware)
+        )
+    )
+
+
+@dataclass(slots=True)
+class ArchivedMonth:
+    table: str
+    month: date
+    rows: int
+    key: str | None
+
+
+def archive_key(prefix: str, table: str, month: date) -> str:
+    return f"{prefix.strip('/')}/{table}/{month:%Y-%m}.ndjson.gz"
+
+
+def apply_retention(
+    engine,
+    store: BlobStore | None,
+    *,
+    keep_months: int,
+    prefix: str,
+    today: date | None = None,
+    dry_run: bool = False,
+) -> list[ArchivedMonth]:
+    """Archive and drop every month older than ``keep_months`` full months before the current one.
+
+    Each month is archived, stored and dropped in its own transaction, so an interrupted run
+    resumes where it stopped. Blocking; run from a CLI or a worker thread.
+    """
+
+    cutoff = add_months(month_start(today or datetime.now(timezone.utc)), -keep_months)
+    archived: list[ArchivedMonth] = []
+    for table in PARTITIONED_TABLES:
+        with engine.connect() as connection:
+            months = expired_months(connection, table, cutoff)
+        for month in months:
+            if dry_run:
+                archived.append(ArchivedMonth(table=table, month=month, rows=0, key=None))
+                continue
+            with engine.begin() as connection, tempfile.TemporaryDirectory() as workdir:
+                path = Path(workdir) / f"{table}-{month:%Y-%m}.ndjson.gz"
+                rows = archive_month(connection, table, month, path)
+                key = archive_key(prefix, table, month) if rows else None
+                if key:
+                    store.put_file(path, key)
+                drop_month(connection, table, month)
+            archived.append(ArchivedMonth(table=table, month=month, rows=rows, key=key))
+    return archived
@@ -0,0 +1,176 @@
+"""Cached read model of household profiles.
+
+A ``HouseholdProfile`` is an immutable snapshot of a household and its
+children, loaded in one round-trip (children come from a ``selectinload`` on
+the same connection) and kept in a process-local cache keyed by household id.
+Chat and profile reads go through ``get_household_profile``, so repeat lookups
+for the same household cost no database round-trip.
+
+Writers call ``mark_household_stale`` (the household and child crud helpers do
+this already). The entry is dropped immediately and again once the session
+commits, and a load that overlapped any invalidation is not cached, so a read
+racing the write cannot put the old rows back. Entries also expire after
+``profile_cache_ttl_seconds``, which bounds staleness for writes made by other
+processes.
+
+Unknown household ids are cached too, as misses that expire after
+``profile_cache_negative_ttl_seconds``, so a client sending made-up ids does not
+cost a database round-trip per request. Invalidation drops them the same way.
+"""
+from __future__ import annotations
+
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Optional
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session, selectinload
+
+from app.core.metrics import register_cache
+from app.core.settings import get_settings
+from app.db import models
+from app.db.session import async_session_scope
+
+_STALE_KEY = "stale_household_ids"
+
+
+@dataclass(frozen=True)
+class ChildProfile:
+    id: str
+    name: str
+    age: int
+    favorite_topics: Optional[str]
+
+
+@dataclass(frozen=True)
+class HouseholdProfile:
+    id: str
+    name: str
+    country: str
+    language_preference: str
+    children: tuple[ChildProfile, ...]
+
+
+def to_profile(household: models.Household) -> HouseholdProfile:
+    return HouseholdProfile(
+        id=household.id,
+        name=household.name,
+        country=household.country,
+        language_preference=household.language_preference,
+        children=tuple(
+            ChildProfile(id=child.id, name=child.name, age=child.age, favorite_topics=child.favorite_topics)
+            for child in household.children
+        ),
+    )
+
+
+def load_household_profile(session: Session, household_id: str) -> Optional[HouseholdProfile]:
+    household = session.get(models.Household, household_id, options=[selectinload(models.Household.children)])
+    return to_profile(household) if household else None
+
+
+class ProfileCache:
+    """Thread-safe LRU of profiles, and of ids known to be missing, with a time-to-live per entry."""
+
+    def __init__(self, *, max_entries: int, ttl_seconds: float, negative_ttl_seconds: float) -> None:
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.negative_ttl_seconds = negative_ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        # Bumped by every invalidation; a load that overlapped one is not cached.
+        self.generation = 0
+        # A None profile records a household id that does not exist.
+        self._entries: OrderedDict[str, tuple[float, Optional[HouseholdProfile]]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def lookup(self, household_id: str) -> tuple[bool, Optional[HouseholdProfile]]:
+        """``(True, profile)`` on a hit, where profile is None for a cached miss; ``(False, None)`` otherwise."""
+
+        with self._lock:
+            entry = self._entries.get(household_id)
+            if entry is None or entry[0] <= time.monotonic():
+                self._entries.pop(household_id, None)
+                self.misses += 1
+                return False, None
+            self._entries.move_to_end(household_id)
+            self.hits += 1
+            return True, entry[1]
+
+    def get(self, household_id: str) -> Optional[HouseholdProfile]:
+        return self.lookup(household_id)[1]
+
+    def put(self, profile: HouseholdProfile, *, generation: Optional[int] = None) -> None:
+        """Cache ``profile``, unless something was invalidated since ``generation`` was read."""
+
+        self._store(profile.id, profile, self.ttl_seconds, generation)
+
+    def put_missing(self, household_id: str, *, generation: Optional[int] = None) -> None:
+        """Remember that ``household_id`` does not exist, for the shorter negative TTL."""
+
+        self._store(household_id, None, self.negative_ttl_seconds, generation)
+
+    def _store(
+        self, household_id: str, profile: Optional[HouseholdProfile], ttl: float, generation: Optional[int]
+    ) -> None:
+        with self._lock:
+            if generation is not None and generation != self.generation:
+                return
+            self._entries[household_id] = (time.monotonic() + ttl, profile)
+            self._entries.move_to_end(household_id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, household_id: str) -> None:
+        with self._lock:
+            self.generation += 1
+            self._entries.pop(household_id, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self.generation += 1
+            self._entries.clear()
+
+    def snapshot(self) -> dict[str, int]:
+        with self._lock:
+            return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+
+_settings = get_settings()
+profile_cache = ProfileCache(
+    max_entries=_settings.profile_cache_max_entries,
+    ttl_seconds=_settings.profile_cache_ttl_seconds,
+    negative_ttl_seconds=_settings.profile_cache_negative_ttl_seconds,
+)
+register_cache("household_profile", profile_cache)
+
+
+def mark_household_stale(session: Session, household_id: str) -> None:
+    """Drop the cached profile now and again when ``session`` commits."""
+
+    profile_cache.invalidate(household_id)
+    session.info.setdefault(_STALE_KEY, set()).add(household_id)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_committed(session: Session) -> None:
+    for household_id in session.info.pop(_STALE_KEY, ()):
+        profile_cache.invalidate(household_id)
+
+
+async def get_household_profile(household_id: str) -> Optional[HouseholdProfile]:
+    """Cached profile for ``household_id``; None when the household does not exist."""
+
+    cached, profile = profile_cache.lookup(household_id)
+    if cached:
+        return profile
+    generation = profile_cache.generation
+    async with async_session_scope() as session:
+        profile = await session.run_sync(load_household_profile, household_id)
+    if profile is not None:
+        profile_cache.put(profile, generation=generation)
+    else:
+        profile_cache.put_missing(household_id, generation=generation)
+    return profile
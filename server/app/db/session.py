@@ -1,40 +1,302 @@
-"""Database session helpers and SQLAlchemy engine configuration."""
+"""Database session helpers and SQLAlchemy engine configuration.
+
+Engines are built on first use, not at import. Importing this module (and
+every model, crud helper or router that depends on it) loads no database
+driver and opens no pool. ``SessionLocal`` and ``AsyncSessionLocal`` bind
+themselves on their first call. ``engine`` and ``async_engine`` stay available
+as module attributes, through ``get_engine``/``get_async_engine``.
+"""
 from __future__ import annotations
 
-from contextlib import contextmanager
+import time
+from contextlib import asynccontextmanager, contextmanager
 from pathlib import Path
-from typing import Generator
+from threading import Lock
+from typing import AsyncGenerator, Generator
 
-from sqlalchemy import create_engine, text
+from sqlalchemy import create_engine, event, text
 from sqlalchemy.engine import make_url
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import Session, declarative_base, sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
 
-from app.core.settings import get_settings
+from app.core.metrics import REGISTRY
+from app.core.settings import Settings, get_settings
 
 settings = get_settings()
 
-connect_args: dict[str, object] = {}
-if settings.database_url.startswith("sqlite"):
-    connect_args["check_same_thread"] = False
+
+class PoolStats:
+    """Counters for connection checkouts and how long callers waited for them."""
+
+    def __init__(self) -> None:
+        self._lock = Lock()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+
+    def record_wait(self, seconds: float, *, timed_out: bool = False) -> None:
+        with self._lock:
+            if timed_out:
+                self.timeouts += 1
+            else:
+                self.checkouts += 1
+            self.wait_seconds_total += seconds
+            self.wait_seconds_max = max(self.wait_seconds_max, seconds)
+
+    def snapshot(self, pool) -> dict[str, float | int]:
+        with self._lock:
+            stats: dict[str, float | int] = {
+                "checkouts": self.checkouts,
+                "timeouts": self.timeouts,
+                "wait_seconds_total": round(self.wait_seconds_total, 6),
+                "wait_seconds_max": round(self.wait_seconds_max, 6),
+                "wait_seconds_avg": round(self.wait_seconds_total / self.checkouts, 6) if self.checkouts else 0.0,
+            }
+        if isinstance(pool, QueuePool):
+            stats.update(
+                size=pool.size(),
+                checked_out=pool.checkedout(),
+                checked_in=pool.checkedin(),
+                overflow=pool.overflow(),
+            )
+        return stats
+
+
+pool_stats = PoolStats()
+async_pool_stats = PoolStats()
+
+
+class _WaitTimingMixin:
+    stats: PoolStats
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except PoolTimeoutError:
+            self.stats.record_wait(time.perf_counter() - started, timed_out=True)
+            raise
+        self.stats.record_wait(time.perf_counter() - started)
+        return connection
+
+
+class InstrumentedQueuePool(_WaitTimingMixin, QueuePool):
+    """QueuePool that records how long each checkout waited for a connection."""
+
+    stats = pool_stats
+
+
+class InstrumentedAsyncQueuePool(_WaitTimingMixin, AsyncAdaptedQueuePool):
+    """The async engine's pool, with the same checkout accounting."""
+
+    stats = async_pool_stats
+
+
+def _sqlite_pragmas(settings: Settings):
+    statements = [
+        # WAL lets readers proceed while one writer commits; NORMAL is durable across app crashes in WAL mode.
+        "PRAGMA journal_mode=WAL",
+        "PRAGMA synchronous=NORMAL",
+        f"PRAGMA busy_timeout={settings.sqlite_busy_timeout_ms}",
+        f"PRAGMA mmap_size={settings.sqlite_mmap_size_mb * 1024 * 1024}",
+        "PRAGMA temp_store=MEMORY",
+    ]
+
+    def apply(dbapi_connection, _connection_record) -> None:
+        cursor = dbapi_connection.cursor()
+        try:
+            for statement in statements:
+                cursor.execute(statement)
+        finally:
+            cursor.close()
+
+    return apply
+
+
+def _is_memory_sqlite(url) -> bool:
+    return url.get_backend_name() == "sqlite" and (not url.database or url.database == ":memory:")
+
+
+def _pool_options(settings: Settings, url) -> dict[str, object]:
+    options: dict[str, object] = {
+        "pool_size": settings.db_pool_size,
+        "max_overflow": settings.db_max_overflow,
+        "pool_timeout": settings.db_pool_timeout,
+    }
+    if url.get_backend_name() != "sqlite":
+        options.update(pool_recycle=settings.db_pool_recycle, pool_pre_ping=settings.db_pool_pre_ping)
+    return options
+
+
+def _prepare_sqlite_path(url) -> None:
+    db_path = Path(url.database)
+    if not db_path.is_absolute():
+        db_path = Path.cwd() / db_path
+    db_path.parent.mkdir(parents=True, exist_ok=True)
+
+
+def build_engine(settings: Settings):
+    url = make_url(settings.database_url)
+    if url.get_backend_name() != "sqlite":
+        return create_engine(
+            url, echo=settings.sqlalchemy_echo, future=True, poolclass=InstrumentedQueuePool, **_pool_options(settings, url)
+        )
+
+    connect_args: dict[str, object] = {
+        "check_same_thread": False,
+        "timeout": settings.sqlite_busy_timeout_ms / 1000,
+    }
+    if _is_memory_sqlite(url):
+        return create_engine(url, echo=settings.sqlalchemy_echo, future=True, connect_args=connect_args)
+
+    _prepare_sqlite_path(url)
+    sqlite_engine = create_engine(
+        url,
+        echo=settings.sqlalchemy_echo,
+        future=True,
+        connect_args=connect_args,
+        poolclass=InstrumentedQueuePool,
+        **_pool_options(settings, url),
+    )
+    event.listen(sqlite_engine, "connect", _sqlite_pragmas(settings))
+    return sqlite_engine
+
+
+def build_async_engine(settings: Settings):
+    """Async twin of ``build_engine``: psycopg's async mode for Postgres, aiosqlite for SQLite."""
+
     url = make_url(settings.database_url)
-    if url.database:
-        db_path = Path(url.database)
-        if not db_path.is_absolute():
-            db_path = Path.cwd() / db_path
-        db_path.parent.mkdir(parents=True, exist_ok=True)
-
-engine = create_engine(settings.database_url, echo=settings.sqlalchemy_echo, future=True, connect_args=connect_args)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine, future=True)
+    if url.get_backend_name() != "sqlite":
+        return create_async_engine(
+            url.set(drivername="postgresql+psycopg"),
+            echo=settings.sqlalchemy_echo,
+            poolclass=InstrumentedAsyncQueuePool,
+            **_pool_options(settings, url),
+        )
+
+    url = url.set(drivername="sqlite+aiosqlite")
+    connect_args = {"timeout": settings.sqlite_busy_timeout_ms / 1000}
+    if _is_memory_sqlite(url):
+        return create_async_engine(url, echo=settings.sqlalchemy_echo, connect_args=connect_args)
+
+    _prepare_sqlite_path(url)
+    sqlite_engine = create_async_engine(
+        url,
+        echo=settings.sqlalchemy_echo,
+        connect_args=connect_args,
+        poolclass=InstrumentedAsyncQueuePool,
+        **_pool_options(settings, url),
+    )
+    event.listen(sqlite_engine.sync_engine, "connect", _sqlite_pragmas(settings))
+    return sqlite_engine
+
+
+_engines: dict[str, object] = {}
+_engines_lock = Lock()
+
+
+def get_engine():
+    with _engines_lock:
+        if "sync" not in _engines:
+            _engines["sync"] = build_engine(settings)
+        return _engines["sync"]
+
+
+def get_async_engine():
+    with _engines_lock:
+        if "async" not in _engines:
+            _engines["async"] = build_async_engine(settings)
+        return _engines["async"]
+
+
+async def dispose_async_engine() -> None:
+    """Close the async pool if it was ever opened."""
+
+    with _engines_lock:
+        async_engine = _engines.get("async")
+    if async_engine is not None:
+        await async_engine.dispose()
+
+
+class _LazySessionmaker(sessionmaker):
+    def __call__(self, **local_kw):
+        if self.kw.get("bind") is None:
+            self.configure(bind=get_engine())
+        return super().__call__(**local_kw)
+
+
+class _LazyAsyncSessionmaker(async_sessionmaker):
+    def __call__(self, **local_kw):
+        if self.kw.get("bind") is None:
+            self.configure(bind=get_async_engine())
+        return super().__call__(**local_kw)
+
+
+def __getattr__(name: str):
+    if name == "engine":
+        return get_engine()
+    if name == "async_engine":
+        return get_async_engine()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+SessionLocal = _LazySessionmaker(autocommit=False, autoflush=False, future=True)
+AsyncSessionLocal = _LazyAsyncSessionmaker(autoflush=False, expire_on_commit=False)
 Base = declarative_base()
 
 
+def _built_pools() -> dict[str, tuple[PoolStats, object | None]]:
+    # Only engines that exist: a probe or a scrape must not open a pool the app never used.
+    with _engines_lock:
+        async_engine = _engines.get("async")
+        return {
+            "sync": (pool_stats, _engines.get("sync")),
+            "async": (async_pool_stats, async_engine.sync_engine if async_engine is not None else None),
+        }
+
+
+def get_pool_stats() -> dict[str, dict[str, float | int]]:
+    """Pool counters per engine; an engine not built yet reports an empty entry."""
+
+    return {
+        name: stats.snapshot(engine.pool) if engine is not None else {}
+        for name, (stats, engine) in _built_pools().items()
+    }
+
+
+_POOL_COUNTERS = {"checkouts", "timeouts", "wait_seconds_total"}
+
+
+@REGISTRY.collector
+def _pool_metrics():
+    snapshots = {name: snapshot for name, snapshot in get_pool_stats().items() if snapshot}
+    fields = sorted({field for snapshot in snapshots.values() for field in snapshot})
+    for field in fields:
+        counter = field in _POOL_COUNTERS
+        name = f"family_ai_db_pool_{field.removesuffix('_total')}"
+        samples = [
+            (f"{name}_total" if counter else name, {"engine": engine}, snapshot[field])
+            for engine, snapshot in snapshots.items()
+            if field in snapshot
+        ]
+        yield name, "counter" if counter else "gauge", f"Connection pool {field.replace('_', ' ')}", samples
+
+
 def init_db() -> None:
     from app.db import models  # noqa: F401
+    from app.db.partitions import ensure_partitions
 
-    Base.metadata.create_all(bind=engine)
+    engine = get_engine()
     if settings.is_pgvector:
         with engine.begin() as connection:
             connection.execute(text("CREATE EXTENSION IF NOT EXISTS vector"))
+    Base.metadata.create_all(bind=engine)
+    if engine.dialect.name == "postgresql":
+        with engine.begin() as connection:
+            ensure_partitions(connection, months_ahead=settings.chat_partitions_ahead)
 
 
 def get_db() -> Generator[Session, None, None]:
@@ -45,6 +307,19 @@ def get_db() -> Generator[Session, None, None]:
         db.close()
 
 
+@asynccontextmanager
+async def async_session_scope() -> AsyncGenerator[AsyncSession, None]:
+    """Async counterpart of ``session_scope`` for request handlers."""
+
+    async with AsyncSessionLocal() as session:
+        try:
+            yield session
+            await session.commit()
+        except Exception:
+            await session.rollback()
+            raise
+
+
 @contextmanager
 def session_scope() -> Generator[Session, None, None]:
     session = SessionLocal()
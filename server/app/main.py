@@ -2,22 +2,43 @@
 from __future__ import annotations
 
 from contextlib import asynccontextmanager
-import os
 
-from fastapi import FastAPI
+from fastapi import FastAPI, Response
 from fastapi.middleware.cors import CORSMiddleware
 
-from app.api import chat, profile, tips, upload
+from app.api import chat, chat_logs, profile, tips, upload
+from app.core import metrics
+from app.core.governor import governor_snapshots
 from app.core.safety import SafetyChecker
+from app.core.security import shutdown_password_pool
 from app.core.settings import Settings, get_settings
-from app.db.session import Base, engine, init_db
+from app.db.partitions import PartitionMaintainer
+from app.db.session import SessionLocal, dispose_async_engine, get_engine, get_pool_stats, init_db
+from app.rag.ingest import build_vector_store
+from app.rag.jobs import IngestJobQueue
+from app.rag.tips import TipRotation
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
+    settings = get_settings()
     init_db()
     app.state.safety_checker = SafetyChecker()
+    app.state.ingest_jobs = IngestJobQueue(settings=settings, session_factory=SessionLocal)
+    await app.state.ingest_jobs.start()
+    app.state.tips = TipRotation(
+        settings,
+        lambda: build_vector_store(settings=settings, session_factory=SessionLocal).iter_chunks(with_embeddings=False),
+    )
+    await app.state.tips.start()
+    app.state.partitions = PartitionMaintainer(get_engine(), months_ahead=settings.chat_partitions_ahead)
+    await app.state.partitions.start()
     yield
+    await app.state.partitions.stop()
+    await app.state.tips.stop()
+    await app.state.ingest_jobs.stop()
+    await dispose_async_engine()
+    shutdown_password_pool()
 
 
 def create_app() -> FastAPI:
@@ -35,14 +56,24 @@ def create_app() -> FastAPI:
     app.include_router(profile.router, prefix="/api", tags=["profile"])
     app.include_router(tips.router, prefix="/api", tags=["tips"])
     app.include_router(upload.router, prefix="/api", tags=["admin"])
-
-    if os.getenv("ENVIRONMENT", "development") == "development":
-        Base.metadata.create_all(bind=engine)
+    app.include_router(chat_logs.router, prefix="/api", tags=["admin"])
 
     @app.get("/healthz", tags=["health"])
     async def health() -> dict[str, str]:
         return {"status": "ok"}
 
+    @app.get("/healthz/db", tags=["health"])
+    async def database_pool() -> dict[str, dict[str, float | int]]:
+        return get_pool_stats()
+
+    @app.get("/healthz/openai", tags=["health"])
+    async def openai_governors() -> dict[str, dict[str, float | int | str]]:
+        return governor_snapshots()
+
+    @app.get("/metrics", tags=["health"], include_in_schema=False)
+    async def prometheus_metrics() -> Response:
+        return Response(content=metrics.REGISTRY.render(), media_type=metrics.CONTENT_TYPE)
+
     return app
 
 
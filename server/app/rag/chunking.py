@@ -0,0 +1,214 @@
+"""Structure-aware Markdown chunking sized by embedding-model tokens."""
+from __future__ import annotations
+
+import re
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Callable, Iterable, Iterator
+
+TokenCounter = Callable[[str], int]
+
+HEADING_RE = re.compile(r"^(#{1,6})\s+(.*?)\s*#*\s*$")
+LIST_ITEM_RE = re.compile(r"^\s*(?:[-*+•]|\d+[.)])\s+")
+# Sentence ends (Latin and Arabic question mark / semicolon), then Arabic/Latin commas as a fallback.
+SENTENCE_SPLIT_RE = re.compile(r"(?<=[.!?؟؛…])\s+")
+CLAUSE_SPLIT_RE = re.compile(r"(?<=[،,])\s+")
+# Bounds on what is buffered before chunking, so single-line or huge-paragraph uploads stay flat.
+MAX_LINE_CHARS = 16 * 1024
+BLOCK_CHARS_PER_TOKEN = 8
+
+
+@dataclass(slots=True)
+class TextChunk:
+    text: str
+    heading_path: str = ""
+
+
+@lru_cache
+def token_counter(model: str) -> TokenCounter:
+    import tiktoken
+
+    try:
+        encoding = tiktoken.encoding_for_model(model)
+    except KeyError:
+        encoding = tiktoken.get_encoding("cl100k_base")
+    return lambda text: len(encoding.encode(text, disallowed_special=()))
+
+
+def _cut_long(line: str, limit: int) -> tuple[list[str], str]:
+    """Cut ``line`` into parts of at most ``limit`` characters, at spaces where possible."""
+
+    parts: list[str] = []
+    while len(line) > limit:
+        cut = line.rfind(" ", 1, limit + 1)
+        if cut <= 0:
+            cut = limit
+        parts.append(line[:cut])
+        line = line[cut:]
+    return parts, line
+
+
+def iter_lines(pieces: Iterable[str], *, max_line_chars: int = MAX_LINE_CHARS) -> Iterator[str]:
+    """Re-split a stream of text pieces into lines.
+
+    Only the unfinished line is buffered. Lines longer than ``max_line_chars``
+    (minified or single-line uploads) come out in parts, which the paragraph
+    logic joins back with a space.
+    """
+
+    partial: list[str] = []
+    partial_chars = 0
+    for piece in pieces:
+        *lines, rest = piece.split("\n")
+        if lines:
+            lines[0] = "".join(partial) + lines[0]
+            partial, partial_chars = [], 0
+            for line in lines:
+                parts, line = _cut_long(line, max_line_chars)
+                yield from parts
+                yield line
+        if rest:
+            partial.append(rest)
+            partial_chars += len(rest)
+            if partial_chars > max_line_chars:
+                parts, rest = _cut_long("".join(partial), max_line_chars)
+                yield from parts
+                partial, partial_chars = [rest], len(rest)
+    if partial_chars:
+        yield "".join(partial)
+
+
+def iter_blocks(lines: Iterable[str], *, max_chars: int | None = None) -> Iterator[tuple[list[str], str, bool]]:
+    """Yield ``(heading_path, block, more)``: paragraphs and list items under their headings.
+
+    A heading is yielded as an empty block so callers can close the current section.
+    A paragraph that grows past ``max_chars`` is yielded early with ``more`` set,
+    and the next block continues it.
+    """
+
+    headings: list[str] = []
+    paragraph: list[str] = []
+    paragraph_chars = 0
+
+    def flush(more: bool = False) -> Iterator[tuple[list[str], str, bool]]:
+        nonlocal paragraph_chars
+        if paragraph:
+            yield list(headings), " ".join(paragraph), more
+            paragraph.clear()
+            paragraph_chars = 0
+
+    for raw_line in lines:
+        line = raw_line.strip()
+        if not line:
+            yield from flush()
+            continue
+        heading = HEADING_RE.match(line)
+        if heading:
+            yield from flush()
+            level = len(heading.group(1))
+            del headings[level - 1 :]
+            headings.extend([""] * (level - 1 - len(headings)))
+            headings.append(heading.group(2))
+            yield list(headings), "", False
+            continue
+        if LIST_ITEM_RE.match(line):
+            yield from flush()
+        elif max_chars is not None and paragraph_chars > max_chars:
+            yield from flush(more=True)  # this line continues it, so ``more`` never dangles
+        paragraph.append(line)
+        paragraph_chars += len(line) + 1
+    yield from flush()
+
+
+def _split_oversized(text: str, *, max_tokens: int, overlap_tokens: int, count_tokens: TokenCounter) -> Iterator[tuple[str, bool]]:
+    """Split one block into pieces under ``max_tokens``.
+
+    Yields ``(piece, clean)`` where ``clean`` is False if the piece had to be cut
+    mid-sentence and should carry overlap into the next one.
+    """
+
+    if count_tokens(text) <= max_tokens:
+        yield text, True
+        return
+    for splitter in (SENTENCE_SPLIT_RE, CLAUSE_SPLIT_RE):
+        parts = [part for part in splitter.split(text) if part.strip()]
+        if len(parts) > 1:
+            for part in parts:
+                yield from _split_oversized(part, max_tokens=max_tokens, overlap_tokens=overlap_tokens, count_tokens=count_tokens)
+            return
+
+    # No natural boundary left: cut by words and overlap the cut so the thought carries over.
+    words = text.split()
+    window: list[str] = []
+    window_tokens = 0
+    for word in words:
+        word_tokens = count_tokens(" " + word)
+        if window and window_tokens + word_tokens > max_tokens:
+            yield " ".join(window), False
+            tail: list[str] = []
+            tail_tokens = 0
+            for kept in reversed(window):
+                kept_tokens = count_tokens(" " + kept)
+                if tail_tokens + kept_tokens > overlap_tokens:
+                    break
+                tail.insert(0, kept)
+                tail_tokens += kept_tokens
+            window, window_tokens = tail, tail_tokens
+        window.append(word)
+        window_tokens += word_tokens
+    if window:
+        yield " ".join(window), True
+
+
+def chunk_markdown(
+    lines: Iterable[str],
+    *,
+    max_tokens: int = 400,
+    overlap_tokens: int = 48,
+    count_tokens: TokenCounter,
+) -> Iterator[TextChunk]:
+    """Pack Markdown blocks into chunks of at most ``max_tokens``.
+
+    Chunks never cross a heading and prefer to end on paragraph, list-item or
+    sentence boundaries. Overlap is only added where a split had to fall inside a
+    sentence, so most chunks carry no duplicated text.
+    """
+
+    current: list[str] = []
+    current_tokens = 0
+    current_path = ""
+    # Tail of a paragraph that continues in the next block; it may end mid-sentence.
+    carry = ""
+    separator = "\n"
+
+    def emit() -> Iterator[TextChunk]:
+        nonlocal current, current_tokens
+        if current:
+            yield TextChunk(text="".join(current).strip(), heading_path=current_path)
+        current, current_tokens = [], 0
+
+    for headings, block, more in iter_blocks(lines, max_chars=max_tokens * BLOCK_CHARS_PER_TOKEN):
+        path = " > ".join(heading for heading in headings if heading)
+        if path != current_path:
+            yield from emit()
+            current_path = path
+        if not block:
+            continue
+        if carry:
+            block, carry = carry + " " + block, ""
+        pieces = list(_split_oversized(block, max_tokens=max_tokens, overlap_tokens=overlap_tokens, count_tokens=count_tokens))
+        if more:
+            carry = pieces.pop()[0]
+        for piece, clean in pieces:
+            piece_tokens = count_tokens(piece)
+            if current and current_tokens + piece_tokens > max_tokens:
+                yield from emit()
+            current.append(separator + piece)
+            separator = " "
+            current_tokens += piece_tokens
+            if not clean:
+                # The next piece repeats this one's tail; keep them in separate chunks.
+                yield from emit()
+        if not more:
+            separator = "\n"  # blocks stay on their own lines; sentences of one block share a line
+    yield from emit()
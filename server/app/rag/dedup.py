@@ -0,0 +1,165 @@
+"""Near-duplicate chunk detection with MinHash signatures and a persisted LSH index.
+
+Each chunk is reduced to word 3-gram shingles over normalized Arabic text and
+summarized by a 128-value MinHash signature. The signature is cut into 16 bands
+of 8 rows; chunks that share any band bucket are candidates and are confirmed by
+comparing full signatures, whose agreement estimates Jaccard similarity. With
+these parameters a pair at similarity 0.8 becomes a candidate ~95% of the time,
+and a pair at 0.5 well under 10%.
+"""
+from __future__ import annotations
+
+import hashlib
+import re
+import unicodedata
+import zlib
+from dataclasses import dataclass
+
+import numpy as np
+
+from app.core.settings import Settings
+from app.db import crud
+
+NUM_PERM = 128
+BANDS = 16
+ROWS = NUM_PERM // BANDS
+SHINGLE_SIZE = 3
+PREVIEW_CHARS = 280
+
+_PRIME = (1 << 31) - 1
+# Fixed seed: signatures are persisted, so the permutations must never change between processes.
+_rng = np.random.default_rng(0x5EED)
+_A = _rng.integers(1, _PRIME, NUM_PERM, dtype=np.uint64)
+_B = _rng.integers(0, _PRIME, NUM_PERM, dtype=np.uint64)
+
+# Harakat, superscript alef, Quranic marks and tatweel carry no meaning for duplicate detection.
+_DIACRITICS_RE = re.compile("[\u0610-\u061a\u064b-\u065f\u0670\u06d6-\u06ed\u0640]")
+_LETTER_MAP = str.maketrans({"أ": "ا", "إ": "ا", "آ": "ا", "ٱ": "ا", "ى": "ي", "ة": "ه", "ؤ": "و", "ئ": "ي"})
+_TOKEN_RE = re.compile(r"\w+")
+
+
+def normalize_tokens(text: str) -> list[str]:
+    text = unicodedata.normalize("NFKC", text).lower()
+    text = _DIACRITICS_RE.sub("", text).translate(_LETTER_MAP)
+    return _TOKEN_RE.findall(text)
+
+
+def shingles(text: str) -> set[str]:
+    tokens = normalize_tokens(text)
+    if len(tokens) <= SHINGLE_SIZE:
+        return {" ".join(tokens)} if tokens else set()
+    return {" ".join(tokens[index : index + SHINGLE_SIZE]) for index in range(len(tokens) - SHINGLE_SIZE + 1)}
+
+
+def minhash(text: str) -> np.ndarray:
+    shingle_set = shingles(text)
+    if not shingle_set:
+        return np.full(NUM_PERM, _PRIME, dtype=np.uint32)
+    hashes = np.fromiter(
+        (zlib.crc32(shingle.encode("utf-8")) for shingle in shingle_set), dtype=np.uint64, count=len(shingle_set)
+    ) % _PRIME
+    # (a * x + b) mod p stays below 2**62, so uint64 never overflows.
+    return ((np.outer(hashes, _A) + _B) % _PRIME).min(axis=0).astype(np.uint32)
+
+
+def similarity(left: np.ndarray, right: np.ndarray) -> float:
+    return float(np.count_nonzero(left == right)) / NUM_PERM
+
+
+def band_buckets(signature: np.ndarray) -> list[str]:
+    return [
+        f"{band}:{hashlib.blake2b(signature[band * ROWS : (band + 1) * ROWS].tobytes(), digest_size=8).hexdigest()}"
+        for band in range(BANDS)
+    ]
+
+
+@dataclass(slots=True)
+class DuplicateMatch:
+    canonical_chunk_id: str
+    similarity: float
+
+
+class NearDuplicateIndex:
+    """LSH lookups against stored chunks, plus the chunks accepted earlier in this run.
+
+    One instance serves one ingestion run of one document. Stored chunks of that same
+    document are never used as canonicals: they may be the previous version of the
+    very paragraph being re-ingested and are about to be deleted. Methods block; call
+    them from a thread.
+    """
+
+    def __init__(self, *, session_factory, document_id: str, threshold: float) -> None:
+        self._session_factory = session_factory
+        self._document_prefix = f"{document_id}:"
+        self._document_id = document_id
+        self._threshold = threshold
+        self._run_buckets: dict[str, list[str]] = {}
+        self._run_signatures: dict[str, np.ndarray] = {}
+
+    def match(self, signatures: dict[str, np.ndarray]) -> dict[str, DuplicateMatch]:
+        """Return the best canonical match for each chunk id that has one.
+
+        Chunks without a match are remembered for the rest of the run so a paragraph
+        repeated later in the same upload collapses onto its first occurrence.
+        """
+
+        buckets = {chunk_id: band_buckets(signature) for chunk_id, signature in signatures.items()}
+        session = self._session_factory()
+        try:
+            stored_pairs = crud.find_lsh_candidates(session, sorted({key for keys in buckets.values() for key in keys}))
+            stored_buckets: dict[str, list[str]] = {}
+            stored_pairs = [pair for pair in stored_pairs if not pair[1].startswith(self._document_prefix)]
+            for bucket, chunk_id in stored_pairs:
+                stored_buckets.setdefault(bucket, []).append(chunk_id)
+            stored_signatures = {
+                chunk_id: np.frombuffer(signature, dtype=np.uint32)
+                for chunk_id, signature in crud.get_chunk_signatures(
+                    session, sorted({chunk_id for _, chunk_id in stored_pairs})
+                ).items()
+            }
+        finally:
+            session.close()
+
+        matches: dict[str, DuplicateMatch] = {}
+        for chunk_id, signature in signatures.items():
+            best: DuplicateMatch | None = None
+            for key in buckets[chunk_id]:
+                for candidate in stored_buckets.get(key, []) + self._run_buckets.get(key, []):
+                    if candidate == chunk_id:
+                        continue
+                    candidate_signature = stored_signatures.get(candidate)
+                    if candidate_signature is None:
+                        candidate_signature = self._run_signatures.get(candidate)
+                    if candidate_signature is None:
+                        continue
+                    score = similarity(signature, candidate_signature)
+                    if score >= self._threshold and (best is None or score > best.similarity):
+                        best = DuplicateMatch(canonical_chunk_id=candidate, similarity=score)
+            if best is not None:
+                matches[chunk_id] = best
+                continue
+            self._run_signatures[chunk_id] = signature
+            for key in buckets[chunk_id]:
+                self._run_buckets.setdefault(key, []).append(chunk_id)
+        return matches
+
+    def add(self, signatures: dict[str, np.ndarray]) -> None:
+        """Persist signatures and buckets for chunks that were stored."""
+
+        session = self._session_factory()
+        try:
+            crud.add_chunk_signatures(
+                session,
+                document_id=self._document_id,
+                signatures={chunk_id: signature.tobytes() for chunk_id, signature in signatures.items()},
+                buckets={chunk_id: band_buckets(signature) for chunk_id, signature in signatures.items()},
+            )
+            session.commit()
+        finally:
+            session.close()
+
+
+def build_duplicate_index(*, settings: Settings, session_factory, document_id: str) -> NearDuplicateIndex | None:
+    if not settings.dedup_enabled:
+        return None
+    return NearDuplicateIndex(session_factory=session_factory, document_id=document_id, threshold=settings.dedup_threshold)
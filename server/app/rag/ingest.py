@@ -2,38 +2,88 @@
 from __future__ import annotations
 
 import asyncio
+import codecs
+import hashlib
 from pathlib import Path
-from typing import Iterable
+from typing import Awaitable, Callable, Iterable, Iterator
 from uuid import uuid4
 
-import boto3
 from fastapi import UploadFile
+from loguru import logger
+from tenacity import AsyncRetrying, stop_after_attempt, wait_exponential
 
+from app.core.blobstore import get_blob_store
 from app.core.openai_client import OpenAIClient
 from app.core.settings import Settings
-from app.db import crud
+from app.db import crud, models
+from app.rag.chunking import TextChunk, chunk_markdown, iter_lines, token_counter
+from app.rag.dedup import PREVIEW_CHARS, band_buckets, build_duplicate_index, minhash
 from app.rag.schemas import DocumentChunk, DocumentMetadata, IngestResult
-from app.rag.vectorstore_chroma import ChromaVectorStore
-from app.rag.vectorstore_pgvector import PgVectorStore
 
+ProgressFn = Callable[[dict[str, int]], Awaitable[None]]
+EmbedFn = Callable[[list[str]], Awaitable[list[list[float]]]]
 
-def chunk_text(text: str, *, max_words: int = 220, overlap: int = 40) -> list[str]:
-    words = text.split()
-    if not words:
-        return []
-    chunks: list[str] = []
-    step = max_words - overlap
-    for start in range(0, len(words), step):
-        slice_words = words[start : start + max_words]
-        chunk = " ".join(slice_words).strip()
-        if chunk:
-            chunks.append(chunk)
-    return chunks
+READ_BLOCK_SIZE = 64 * 1024
+# Document-level fields copied onto every stored chunk, and kept in the registry.
+CHUNK_METADATA_FIELDS = ("file_name", "topic", "age_range", "tone", "country", "language")
+
+
+def iter_file_text(path: Path, *, block_size: int = READ_BLOCK_SIZE) -> Iterator[str]:
+    """Yield decoded text from ``path`` block by block, keeping split UTF-8 sequences intact."""
+
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="ignore")
+    with path.open("rb") as handle:
+        while block := handle.read(block_size):
+            if text := decoder.decode(block):
+                yield text
+    if tail := decoder.decode(b"", final=True):
+        yield tail
+
+
+def iter_chunks(pieces: Iterable[str], settings: Settings) -> Iterator[TextChunk]:
+    return chunk_markdown(
+        iter_lines(pieces),
+        max_tokens=settings.chunk_max_tokens,
+        overlap_tokens=settings.chunk_overlap_tokens,
+        count_tokens=token_counter(settings.embedding_model),
+    )
+
+
+def chunk_text(text: str, settings: Settings) -> list[str]:
+    return [chunk.text for chunk in iter_chunks([text], settings)]
+
+
+def document_id_for(file_name: str) -> str:
+    """Derive a stable document id from the file name so re-ingests update in place."""
+
+    return hashlib.sha1(file_name.strip().lower().encode("utf-8")).hexdigest()
+
+
+def chunk_hash(content: str, heading_path: str = "") -> str:
+    normalized = heading_path + "\n" + " ".join(content.split())
+    return hashlib.sha256(normalized.encode("utf-8")).hexdigest()[:32]
+
+
+def registered_metadata(session_factory, document_id: str) -> dict[str, str] | None:
+    """Metadata the document was last ingested with; None for a new document."""
+
+    session = session_factory()
+    try:
+        registry = crud.get_document_registry(session, document_id)
+        return None if registry is None else {field: getattr(registry, field) for field in CHUNK_METADATA_FIELDS}
+    finally:
+        session.close()
 
 
 def build_vector_store(settings: Settings, session_factory):
+    """Store for the configured backend; only that backend's client library is imported."""
+
     if settings.is_pgvector:
+        from app.rag.vectorstore_pgvector import PgVectorStore
+
         return PgVectorStore(session_factory=session_factory, settings=settings)
+    from app.rag.vectorstore_chroma import ChromaVectorStore
+
     return ChromaVectorStore(settings=settings)
 
 
@@ -45,9 +95,42 @@ async def ingest_text(
     session_factory,
     settings: Settings,
     openai_client: OpenAIClient,
+    document_id: str | None = None,
+    progress: ProgressFn | None = None,
+) -> IngestResult:
+    return await ingest_stream(
+        pieces=[text],
+        file_name=file_name,
+        metadata_overrides=metadata_overrides,
+        session_factory=session_factory,
+        settings=settings,
+        openai_client=openai_client,
+        document_id=document_id,
+        progress=progress,
+    )
+
+
+async def ingest_stream(
+    *,
+    pieces: Iterable[str],
+    file_name: str,
+    metadata_overrides: dict[str, str] | None,
+    session_factory,
+    settings: Settings,
+    openai_client: OpenAIClient,
+    document_id: str | None = None,
+    progress: ProgressFn | None = None,
 ) -> IngestResult:
-    document_id = str(uuid4())
+    """Chunk, embed and store a document streamed as text pieces.
+
+    Chunks are embedded and upserted in batches of ``embedding_batch_size`` as soon as
+    a batch fills up, so memory stays bounded by one batch regardless of document size.
+    New chunks that nearly duplicate a chunk already stored (from another document or
+    earlier in this one) are recorded as links to it instead of being embedded.
+    """
+
     overrides = metadata_overrides or {}
+    document_id = document_id or overrides.get("document_id") or document_id_for(file_name)
     meta = DocumentMetadata(
         document_id=document_id,
         file_name=file_name,
@@ -57,68 +140,291 @@ async def ingest_text(
         country=overrides.get("country", "jo"),
         language=overrides.get("language", "ar"),
     )
-    chunks_raw = chunk_text(text)
-    if not chunks_raw:
-        return IngestResult(document_id=document_id, stored_chunks=0, metadata=meta, extras={})
-    embeddings = await openai_client.embed_texts(chunks_raw)
+    chunk_meta = meta.model_dump(exclude={"created_at"}, mode="json")
+
+    store = build_vector_store(settings=settings, session_factory=session_factory)
+    duplicate_index = build_duplicate_index(settings=settings, session_factory=session_factory, document_id=document_id)
+    existing_ids = set(await asyncio.to_thread(store.list_chunk_ids, document_id))
+    # Chunks are keyed by content hash, so unchanged text maps to an id we already store.
+    # Their metadata is not part of that key: when it changed, every chunk is stored again
+    # (re-embedding unchanged text is served by the embedding store).
+    previous_meta = await asyncio.to_thread(registered_metadata, session_factory, document_id)
+    refresh = previous_meta is not None and previous_meta != {field: chunk_meta[field] for field in CHUNK_METADATA_FIELDS}
+    seen_ids: set[str] = set()
+    duplicates: list[dict[str, object]] = []
+    counts = {"chunks_total": 0, "chunks_embedded": 0, "chunks_stored": 0}
+
+    def iter_batches() -> Iterator[list[tuple[str, TextChunk]]]:
+        batch: list[tuple[str, TextChunk]] = []
+        for chunk in iter_chunks(pieces, settings):
+            chunk_id = f"{document_id}:{chunk_hash(chunk.text, chunk.heading_path)}"
+            if chunk_id in seen_ids:
+                continue
+            seen_ids.add(chunk_id)
+            if chunk_id in existing_ids and not refresh:
+                continue
+            counts["chunks_total"] += 1
+            batch.append((chunk_id, chunk))
+            if len(batch) >= settings.embedding_batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+    async def flush(unique: list[tuple[str, TextChunk]]) -> None:
+        if duplicate_index is not None:
+            signatures = await asyncio.to_thread(lambda: {chunk_id: minhash(chunk.text) for chunk_id, chunk in unique})
+            matches = await asyncio.to_thread(duplicate_index.match, signatures)
+            for chunk_id, chunk in unique:
+                if match := matches.get(chunk_id):
+                    duplicates.append(
+                        {
+                            "chunk_id": chunk_id,
+                            "document_id": document_id,
+                            "file_name": file_name,
+                            "canonical_chunk_id": match.canonical_chunk_id,
+                            "canonical_document_id": match.canonical_chunk_id.split(":", 1)[0],
+                            "similarity": match.similarity,
+                            "preview": chunk.text[:PREVIEW_CHARS],
+                            "content": chunk.text,
+                            "heading_path": chunk.heading_path[:512],
+                        }
+                    )
+            unique = [(chunk_id, chunk) for chunk_id, chunk in unique if chunk_id not in matches]
+            counts["chunks_total"] -= len(matches)
+        if unique:
+            embeddings = await openai_client.embed_texts([chunk.text for _, chunk in unique])
+            counts["chunks_embedded"] += len(embeddings)
+            chunks = [
+                DocumentChunk(
+                    chunk_id=chunk_id,
+                    content=chunk.text,
+                    embedding=embedding,
+                    metadata=DocumentMetadata(**{**chunk_meta, "heading_path": chunk.heading_path}),
+                )
+                for (chunk_id, chunk), embedding in zip(unique, embeddings, strict=True)
+            ]
+            counts["chunks_stored"] += await asyncio.to_thread(store.upsert, chunks)
+            if duplicate_index is not None:
+                await asyncio.to_thread(duplicate_index.add, {chunk_id: signatures[chunk_id] for chunk_id, _ in unique})
+        if progress:
+            await progress(dict(counts))
+
+    # Reading, decoding and chunking run in a worker thread one batch at a time, so a large
+    # upload leaves the event loop free for chat requests; only embedding and storage await here.
+    batches = iter_batches()
+    flushed = False
+    while (batch := await asyncio.to_thread(next, batches, None)) is not None:
+        await flush(batch)
+        flushed = True
+    if not flushed and progress:
+        await progress(dict(counts))
+
+    removed_ids = sorted(existing_ids - seen_ids)
+    promoted = 0
+    if removed_ids and duplicate_index is not None:
+        promoted = await promote_duplicates(
+            canonical_ids=removed_ids,
+            document_id=document_id,
+            store=store,
+            session_factory=session_factory,
+            embed=openai_client.embed_texts,
+        )
+    if removed_ids:
+        await asyncio.to_thread(store.delete, removed_ids)
+
+    stored = len(seen_ids) - len(duplicates)
+
+    def write_registry() -> None:
+        session = session_factory()
+        try:
+            if duplicate_index is not None:
+                crud.delete_chunk_signatures(session, removed_ids)
+                crud.prune_chunk_duplicates(session, document_id, {row["chunk_id"] for row in duplicates})
+                crud.record_chunk_duplicates(session, duplicates)
+            crud.upsert_document_registry(
+                session,
+                document_id=document_id,
+                file_name=file_name,
+                metadata=meta.model_dump(mode="json"),
+                chunk_count=stored,
+                s3_uploaded=False,
+            )
+            session.commit()
+        finally:
+            session.close()
+
+    await asyncio.to_thread(write_registry)
+
+    embedded = counts["chunks_stored"]
+    return IngestResult(
+        document_id=document_id,
+        stored_chunks=stored,
+        metadata=meta,
+        extras={
+            "embedded_chunks": embedded,
+            "unchanged_chunks": stored - embedded,
+            "deleted_chunks": len(removed_ids),
+            "duplicate_chunks": len(duplicates),
+            "promoted_chunks": promoted,
+        },
+    )
+
+
+async def promote_duplicates(
+    *,
+    canonical_ids: list[str],
+    document_id: str,
+    store,
+    session_factory,
+    embed: EmbedFn,
+) -> int:
+    """Store a new canonical for chunks that are about to be deleted but still have duplicates.
+
+    Documents whose chunk was collapsed onto a canonical never stored their own copy,
+    so deleting the canonical alone would drop their text from retrieval. For each
+    canonical in ``canonical_ids``, the most similar duplicate from another document
+    is embedded and stored under its own chunk id, and the remaining links point at
+    it. Links from ``document_id`` itself are left for the caller to prune. Call
+    this before deleting the canonicals. Returns the number of chunks promoted.
+    """
+
+    if not canonical_ids:
+        return 0
+
+    def load_links() -> list[models.ChunkDuplicate]:
+        session = session_factory()
+        try:
+            return crud.list_duplicates_of(session, canonical_ids, exclude_document_id=document_id)
+        finally:
+            session.close()
+
+    chosen: dict[str, models.ChunkDuplicate] = {}
+    for link in await asyncio.to_thread(load_links):
+        chosen.setdefault(link.canonical_chunk_id, link)
+    if not chosen:
+        return 0
+
+    canonicals = {chunk.chunk_id: chunk for chunk in await asyncio.to_thread(store.get_chunks, list(chosen))}
+    promotions: list[tuple[models.ChunkDuplicate, str, str]] = []
+    for canonical_id, link in chosen.items():
+        if link.content:
+            promotions.append((link, link.content, link.heading_path or ""))
+        elif canonical := canonicals.get(canonical_id):
+            # Links recorded before their text was kept take the near-identical canonical text.
+            promotions.append((link, canonical.content, canonical.metadata.heading_path))
+        else:
+            logger.warning("Cannot promote duplicate {}: neither its text nor its canonical is stored", link.chunk_id)
+    if not promotions:
+        return 0
+
+    metadata: dict[str, dict[str, str]] = {}
+    for link, _, _ in promotions:
+        if link.document_id not in metadata:
+            stored = await asyncio.to_thread(registered_metadata, session_factory, link.document_id)
+            metadata[link.document_id] = stored or {"file_name": link.file_name}
+    embeddings = await embed([text for _, text, _ in promotions])
     chunks = [
         DocumentChunk(
-            chunk_id=f"{document_id}:{idx}",
-            content=chunk_text_value,
+            chunk_id=link.chunk_id,
+            content=text,
             embedding=embedding,
-            metadata=DocumentMetadata(
-                **meta.model_dump(
-                    exclude={"created_at"},
-                    mode="json",
-                )
-            ),
+            metadata=DocumentMetadata(**metadata[link.document_id], document_id=link.document_id, heading_path=heading_path),
         )
-        for idx, (chunk_text_value, embedding) in enumerate(zip(chunks_raw, embeddings, strict=True))
+        for (link, text, heading_path), embedding in zip(promotions, embeddings, strict=True)
     ]
-    store = build_vector_store(settings=settings, session_factory=session_factory)
-    stored = store.upsert(chunks)
+    await asyncio.to_thread(store.upsert, chunks)
 
-    session = session_factory()
+    def record() -> None:
+        session = session_factory()
+        try:
+            for link, text, _ in promotions:
+                signature = minhash(text)
+                crud.add_chunk_signatures(
+                    session,
+                    document_id=link.document_id,
+                    signatures={link.chunk_id: signature.tobytes()},
+                    buckets={link.chunk_id: band_buckets(signature)},
+                )
+                crud.promote_chunk_duplicate(session, session.get(models.ChunkDuplicate, link.chunk_id))
+            session.commit()
+        finally:
+            session.close()
+
+    await asyncio.to_thread(record)
+    logger.info("Promoted {} duplicate chunks to canonical before deleting {} chunks", len(chunks), len(canonical_ids))
+    return len(chunks)
+
+
+async def spool_upload(*, file: UploadFile, settings: Settings) -> Path:
+    """Stream an upload to the spool directory so a background job can ingest it."""
+
+    spool_dir = Path(settings.ingest_spool_dir)
+    spool_dir.mkdir(parents=True, exist_ok=True)
+    spool_path = spool_dir / f"{uuid4()}.upload"
+    handle = await asyncio.to_thread(spool_path.open, "wb")
     try:
-        crud.upsert_document_registry(
-            session,
-            document_id=document_id,
-            file_name=file_name,
-            metadata=meta.model_dump(mode="json"),
-            chunk_count=stored,
-            s3_uploaded=bool(settings.s3_bucket_corpus),
-        )
-        session.commit()
+        while block := await file.read(READ_BLOCK_SIZE):
+            await asyncio.to_thread(handle.write, block)
     finally:
-        session.close()
-
-    return IngestResult(document_id=document_id, stored_chunks=stored, metadata=meta, extras={})
+        await asyncio.to_thread(handle.close)
+    return spool_path
 
 
-async def ingest_upload(
-    *, file: UploadFile, overrides: dict[str, str] | None, session_factory, settings: Settings, openai_client: OpenAIClient
+async def ingest_file(
+    *,
+    path: Path,
+    file_name: str,
+    overrides: dict[str, str] | None,
+    session_factory,
+    settings: Settings,
+    openai_client: OpenAIClient,
+    document_id: str | None = None,
+    progress: ProgressFn | None = None,
 ) -> IngestResult:
-    file_bytes = await file.read()
-    text = file_bytes.decode("utf-8", errors="ignore")
-    ingest_result = await ingest_text(
-        text=text,
-        file_name=file.filename or "uploaded.md",
+    return await ingest_stream(
+        pieces=iter_file_text(path),
+        file_name=file_name,
         metadata_overrides=overrides,
         session_factory=session_factory,
         settings=settings,
         openai_client=openai_client,
+        document_id=document_id,
+        progress=progress,
     )
-    _maybe_upload_to_s3(settings=settings, content=file_bytes, file_name=file.filename or ingest_result.metadata.file_name)
-    return ingest_result
-
-
-def _maybe_upload_to_s3(*, settings: Settings, content: bytes, file_name: str) -> None:
-    if not settings.s3_bucket_corpus or not content:
-        return
-    client = boto3.client(
-        "s3",
-        region_name=settings.aws_region,
-        aws_access_key_id=settings.aws_access_key_id or None,
-        aws_secret_access_key=settings.aws_secret_access_key or None,
-    )
-    client.put_object(Bucket=settings.s3_bucket_corpus, Key=file_name, Body=content, ContentType="text/markdown")
+
+
+async def archive_original(
+    *,
+    path: Path,
+    file_name: str,
+    document_id: str,
+    session_factory,
+    settings: Settings,
+) -> bool:
+    """Copy an ingested upload to the blob store off the event loop and flag the registry.
+
+    Returns False when no blob store is configured.
+    """
+
+    store = get_blob_store(settings)
+    if store is None or not path.stat().st_size:
+        return False
+    async for attempt in AsyncRetrying(
+        wait=wait_exponential(multiplier=1, min=1, max=30),
+        stop=stop_after_attempt(settings.blob_upload_attempts),
+        reraise=True,
+    ):
+        with attempt:
+            await asyncio.to_thread(store.put_file, path, file_name)
+
+    def mark_uploaded() -> None:
+        session = session_factory()
+        try:
+            crud.mark_document_uploaded(session, document_id)
+            session.commit()
+        finally:
+            session.close()
+
+    await asyncio.to_thread(mark_uploaded)
+    return True
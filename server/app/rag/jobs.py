@@ -0,0 +1,236 @@
+"""Bounded in-process worker pool for background document ingestion."""
+from __future__ import annotations
+
+import asyncio
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from loguru import logger
+
+from app.core.openai_client import OpenAIClient
+from app.core.settings import Settings
+from app.db import crud
+from app.db.session import session_scope
+from app.rag.ingest import archive_original, ingest_file
+
+# How long shutdown waits for in-flight archive uploads before abandoning them.
+_ARCHIVE_SHUTDOWN_TIMEOUT = 30
+# How often an idle worker looks in the table for jobs it was not handed directly.
+_POLL_SECONDS = 5.0
+
+
+class IngestQueueFull(RuntimeError):
+    """Raised when the ingestion backlog has reached ``ingest_queue_size``."""
+
+
+class IngestJobNotRetryable(RuntimeError):
+    """Raised when a job is unknown, has not failed, or its upload is gone."""
+
+
+class IngestJobQueue:
+    """Run ingestion jobs on a fixed number of asyncio workers.
+
+    Job state lives in the ``ingest_jobs`` table and the upload itself in the spool
+    directory. The in-memory queue only hands new job ids to this process's workers;
+    a worker runs a job only after claiming its row (``queued`` -> ``running``), so
+    each job runs once even with several app processes. Idle workers claim queued
+    jobs from the table, which covers jobs left by a restart or submitted elsewhere,
+    and running jobs that stop reporting progress for ``ingest_stale_job_minutes``
+    are queued again. Re-running a half-finished job is safe because ingestion is
+    content-addressed.
+    A failed job keeps its upload for ``ingest_failed_spool_days`` so ``retry`` can
+    run it again; ``start`` removes older ones.
+    """
+
+    def __init__(self, *, settings: Settings, session_factory) -> None:
+        self._settings = settings
+        self._session_factory = session_factory
+        self._queue: asyncio.Queue[str] = asyncio.Queue(maxsize=settings.ingest_queue_size)
+        # Slots held by submissions still writing their job row; they count against the queue size.
+        self._reserved = 0
+        self._workers: list[asyncio.Task[None]] = []
+        self._archives: set[asyncio.Task[None]] = set()
+
+    async def start(self) -> None:
+        await asyncio.to_thread(self._prune_failed_spools)
+        await asyncio.to_thread(self._recover)
+        self._workers = [
+            asyncio.create_task(self._worker(), name=f"ingest-worker-{index}")
+            for index in range(self._settings.ingest_workers)
+        ]
+
+    async def stop(self) -> None:
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        if self._archives:
+            await asyncio.wait(self._archives, timeout=_ARCHIVE_SHUTDOWN_TIMEOUT)
+
+    async def submit(
+        self,
+        *,
+        file_name: str,
+        spool_path: Path,
+        overrides: dict[str, str],
+        document_id: str | None = None,
+    ) -> str:
+        if self._queue.qsize() + self._reserved >= self._settings.ingest_queue_size:
+            spool_path.unlink(missing_ok=True)
+            raise IngestQueueFull("Ingestion queue is full")
+
+        def create() -> str:
+            with session_scope() as session:
+                job = crud.create_ingest_job(
+                    session,
+                    file_name=file_name,
+                    spool_path=str(spool_path),
+                    overrides=overrides,
+                    document_id=document_id,
+                )
+                return job.id
+
+        # Reserve the slot before awaiting so concurrent uploads cannot take it in the meantime.
+        self._reserved += 1
+        try:
+            job_id = await asyncio.to_thread(create)
+        except BaseException:
+            spool_path.unlink(missing_ok=True)
+            raise
+        finally:
+            self._reserved -= 1
+        self._queue.put_nowait(job_id)
+        return job_id
+
+    async def retry(self, job_id: str) -> None:
+        """Queue a failed job again, reusing the upload it kept."""
+
+        if self._queue.qsize() + self._reserved >= self._settings.ingest_queue_size:
+            raise IngestQueueFull("Ingestion queue is full")
+
+        def requeue() -> None:
+            with session_scope() as session:
+                job = crud.get_ingest_job(session, job_id)
+                if job is None or job.status != "failed":
+                    raise IngestJobNotRetryable("Only failed jobs can be retried")
+                if not Path(job.spool_path).exists():
+                    raise IngestJobNotRetryable("The upload for this job is no longer kept; upload it again")
+                job.status = "queued"
+                job.error = None
+
+        self._reserved += 1
+        try:
+            await asyncio.to_thread(requeue)
+        finally:
+            self._reserved -= 1
+        self._queue.put_nowait(job_id)
+
+    def _prune_failed_spools(self) -> None:
+        cutoff = datetime.utcnow() - timedelta(days=self._settings.ingest_failed_spool_days)
+        with session_scope() as session:
+            for job in crud.list_failed_ingest_jobs(session, updated_before=cutoff):
+                Path(job.spool_path).unlink(missing_ok=True)
+
+    def _recover(self) -> None:
+        with session_scope() as session:
+            for job in crud.list_unfinished_ingest_jobs(session):
+                if job.status == "queued" and not Path(job.spool_path).exists():
+                    job.status = "failed"
+                    job.error = "Upload was lost before ingestion finished"
+
+    def _claim(self, job_id: str | None) -> str | None:
+        """Claim ``job_id``, or the oldest queued job when None; None if nothing was claimed."""
+
+        with session_scope() as session:
+            if job_id is not None:
+                return job_id if crud.claim_ingest_job(session, job_id) else None
+            stale_before = datetime.utcnow() - timedelta(minutes=self._settings.ingest_stale_job_minutes)
+            if requeued := crud.requeue_stale_ingest_jobs(session, updated_before=stale_before):
+                logger.info("Re-queued {} ingestion jobs that stopped making progress", requeued)
+            return crud.claim_next_ingest_job(session)
+
+    async def _update(self, job_id: str, **fields: object) -> None:
+        def update() -> None:
+            with session_scope() as session:
+                crud.update_ingest_job(session, job_id, **fields)
+
+        await asyncio.to_thread(update)
+
+    async def _worker(self) -> None:
+        while True:
+            if self._queue.empty():
+                try:
+                    job_id = await asyncio.to_thread(self._claim, None)
+                except Exception:  # noqa: BLE001 - the database may come back; keep the worker
+                    logger.exception("Could not look for queued ingestion jobs")
+                    job_id = None
+                if job_id is not None:
+                    await self._process(job_id)
+                    continue
+                try:
+                    handed = await asyncio.wait_for(self._queue.get(), _POLL_SECONDS)
+                except asyncio.TimeoutError:
+                    continue
+            else:
+                handed = self._queue.get_nowait()
+            try:
+                if await asyncio.to_thread(self._claim, handed):
+                    await self._process(handed)
+            except Exception:  # noqa: BLE001 - the job stays queued for the next poll
+                logger.exception("Could not claim ingestion job {}", handed)
+            finally:
+                self._queue.task_done()
+
+    async def _process(self, job_id: str) -> None:
+        try:
+            await self._run(job_id)
+        except Exception as exc:  # noqa: BLE001 - a failed job must not kill the worker
+            logger.exception("Ingestion job {} failed", job_id)
+            await self._update(job_id, status="failed", error=str(exc) or exc.__class__.__name__)
+
+    async def _run(self, job_id: str) -> None:
+        def load() -> tuple[str, str, dict[str, str], str | None] | None:
+            with session_scope() as session:
+                job = crud.get_ingest_job(session, job_id)
+                if job is None:
+                    return None
+                return job.file_name, job.spool_path, dict(job.overrides or {}), job.document_id
+
+        loaded = await asyncio.to_thread(load)
+        if loaded is None:
+            return
+        file_name, spool_path, overrides, document_id = loaded
+
+        async def progress(fields: dict[str, int]) -> None:
+            await self._update(job_id, **fields)
+
+        # On failure the spool is kept so the job can be retried without another upload.
+        result = await ingest_file(
+            path=Path(spool_path),
+            file_name=file_name,
+            overrides=overrides,
+            session_factory=self._session_factory,
+            settings=self._settings,
+            openai_client=OpenAIClient(self._settings),
+            document_id=document_id,
+            progress=progress,
+        )
+        await self._update(job_id, status="succeeded", document_id=result.document_id)
+        # Archiving the original is not part of the job; it must not hold up the next upload.
+        task = asyncio.create_task(self._archive(Path(spool_path), file_name, result.document_id))
+        self._archives.add(task)
+        task.add_done_callback(self._archives.discard)
+
+    async def _archive(self, spool_path: Path, file_name: str, document_id: str) -> None:
+        try:
+            await archive_original(
+                path=spool_path,
+                file_name=file_name,
+                document_id=document_id,
+                session_factory=self._session_factory,
+                settings=self._settings,
+            )
+        except Exception:  # noqa: BLE001 - the document is already searchable
+            logger.exception("Archiving original upload for {} failed", document_id)
+        finally:
+            spool_path.unlink(missing_ok=True)
@@ -1,15 +1,150 @@
 """Vector store selection and retrieval orchestration."""
 from __future__ import annotations
 
-from typing import Awaitable, Callable
+import asyncio
+import time
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable, Sequence
 
+import numpy as np
+
+from app.core.metrics import CHAT_STAGE_SECONDS, VECTOR_QUERY_SECONDS
 from app.core.settings import Settings
-from app.rag.schemas import RetrievalResult
-from app.rag.vectorstore_chroma import ChromaVectorStore
-from app.rag.vectorstore_pgvector import PgVectorStore
+from app.rag.schemas import DocumentChunk, RetrievalResult
 
 EmbedderFn = Callable[[str], Awaitable[list[float]]]
 
+# Shorter shared runs are more likely coincidental phrasing than a chunker overlap.
+MIN_OVERLAP_WORDS = 4
+# Length of the context bullets shown to clients and of rehydrated log snippets.
+SNIPPET_CHARS = 280
+
+
+@dataclass
+class Passage:
+    chunk: DocumentChunk
+    score: float
+    chunk_ids: list[str] = field(default_factory=list)
+
+
+def merge_overlapping(first: DocumentChunk, second: DocumentChunk) -> DocumentChunk | None:
+    """Join two chunks of one section if one continues the other; None if they don't touch.
+
+    The chunker only overlaps chunks where it had to split mid-sentence, repeating the
+    tail of one chunk at the head of the next, so a shared run of words marks neighbours.
+    """
+
+    if (first.metadata.document_id, first.metadata.heading_path) != (
+        second.metadata.document_id,
+        second.metadata.heading_path,
+    ):
+        return None
+    for head, tail in ((first, second), (second, first)):
+        if tail.content in head.content:
+            return head
+        head_words, tail_words = head.content.split(), tail.content.split()
+        for size in range(min(len(head_words), len(tail_words)) - 1, MIN_OVERLAP_WORDS - 1, -1):
+            if head_words[-size:] == tail_words[:size]:
+                content = head.content.rstrip() + " " + " ".join(tail_words[size:])
+                return head.model_copy(update={"content": content})
+    return None
+
+
+def select_passages(
+    query_embedding: Sequence[float],
+    candidates: Sequence[DocumentChunk],
+    *,
+    top_k: int,
+    lambda_mult: float,
+) -> list[Passage]:
+    """Pick up to ``top_k`` passages by maximal marginal relevance.
+
+    Each step takes the candidate maximizing ``lambda * sim(query) - (1 - lambda) *
+    max sim(already picked)``. A pick that overlaps an earlier pick from the same
+    section is merged into that passage instead of taking a slot of its own.
+    """
+
+    if not candidates:
+        return []
+    query = np.asarray(query_embedding, dtype=np.float32)
+    if any(len(chunk.embedding) != len(query) for chunk in candidates):
+        # Without comparable vectors there is nothing to diversify on; keep store order.
+        return [Passage(chunk=chunk, score=0.0, chunk_ids=[chunk.chunk_id]) for chunk in candidates[:top_k]]
+
+    vectors = np.asarray([chunk.embedding for chunk in candidates], dtype=np.float32)
+    vectors /= np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+    query /= max(float(np.linalg.norm(query)), 1e-12)
+    relevance = vectors @ query
+    redundancy = np.full(len(candidates), -np.inf, dtype=np.float32)
+    remaining = np.ones(len(candidates), dtype=bool)
+    passages: list[Passage] = []
+
+    while remaining.any() and len(passages) < top_k:
+        penalty = np.where(np.isneginf(redundancy), 0.0, redundancy)
+        mmr = np.where(remaining, lambda_mult * relevance - (1.0 - lambda_mult) * penalty, -np.inf)
+        best = int(np.argmax(mmr))
+        remaining[best] = False
+        redundancy = np.maximum(redundancy, vectors @ vectors[best])
+        chunk, score = candidates[best], float(relevance[best])
+        for passage in passages:
+            merged = merge_overlapping(passage.chunk, chunk)
+            if merged is not None:
+                passage.chunk = merged
+                passage.score = max(passage.score, score)
+                passage.chunk_ids.append(chunk.chunk_id)
+                break
+        else:
+            passages.append(Passage(chunk=chunk, score=score, chunk_ids=[chunk.chunk_id]))
+    return passages
+
+
+def snippet(chunk: DocumentChunk) -> str:
+    return chunk.content.strip()[:SNIPPET_CHARS]
+
+
+def budget_passages(
+    chunks: Sequence[DocumentChunk], *, max_tokens: int, count_tokens: Callable[[str], int]
+) -> list[str]:
+    """Full passage texts for the prompt, in rank order, within ``max_tokens``.
+
+    The passage that crosses the budget is cut at a word boundary and the rest are left out.
+    """
+
+    texts: list[str] = []
+    remaining = max_tokens
+    for chunk in chunks:
+        text = chunk.content.strip()
+        if not text:
+            continue
+        cost = count_tokens(text)
+        if cost <= remaining:
+            texts.append(text)
+            remaining -= cost
+            continue
+        words = text.split()
+        low, high = 0, len(words)  # longest prefix of words that still fits
+        while low < high:
+            middle = (low + high + 1) // 2
+            if count_tokens(" ".join(words[:middle])) <= remaining:
+                low = middle
+            else:
+                high = middle - 1
+        if low:
+            texts.append(" ".join(words[:low]))
+        break
+    return texts
+
+
+def rebuild_passage(chunks: Sequence[DocumentChunk]) -> DocumentChunk | None:
+    """Re-join the chunks behind one selected passage, given in the order they were picked."""
+
+    if not chunks:
+        return None
+    passage = chunks[0]
+    for chunk in chunks[1:]:
+        passage = merge_overlapping(passage, chunk) or passage
+    return passage
+
 
 class Retriever:
     def __init__(self, *, vector_store, embedder: EmbedderFn, settings: Settings) -> None:
@@ -17,19 +152,40 @@ class Retriever:
         self._embedder = embedder
         self._settings = settings
 
+    def _search(self, embedding: list[float], fetch_k: int) -> list[DocumentChunk]:
+        # Timed inside the worker thread, so the backend's own latency excludes executor queueing.
+        started = time.perf_counter()
+        try:
+            return self._vector_store.similarity_search(embedding, top_k=fetch_k)
+        finally:
+            VECTOR_QUERY_SECONDS.observe(time.perf_counter() - started, self._settings.vector_backend)
+
     async def retrieve(self, query: str, *, top_k: int | None = None) -> RetrievalResult:
         if not query.strip():
             return RetrievalResult(chunks=[], context_bullets=[])
-        embedding = await self._embedder(query)
+        with CHAT_STAGE_SECONDS.time("embed"):
+            embedding = await self._embedder(query)
         top_k = top_k or self._settings.max_context_docs
-        chunks = self._vector_store.similarity_search(embedding, top_k=top_k)
-        bullets = [chunk.content.strip()[:280] for chunk in chunks]
-        return RetrievalResult(chunks=chunks, context_bullets=bullets)
+        with CHAT_STAGE_SECONDS.time("vector_search"):
+            # Over-fetch so MMR has near-duplicates to skip and neighbours to merge.
+            candidates = await asyncio.to_thread(self._search, embedding, max(top_k, self._settings.retrieval_fetch_k))
+            passages = select_passages(embedding, candidates, top_k=top_k, lambda_mult=self._settings.mmr_lambda)
+        return RetrievalResult(
+            chunks=[passage.chunk for passage in passages],
+            context_bullets=[snippet(passage.chunk) for passage in passages],
+            scores=[passage.score for passage in passages],
+            source_chunk_ids=[passage.chunk_ids for passage in passages],
+        )
 
 
 def build_retriever(*, settings: Settings, session_factory, embedder: EmbedderFn) -> Retriever:
+    # Imported here so a pgvector deployment never loads chromadb, and vice versa.
     if settings.is_pgvector:
+        from app.rag.vectorstore_pgvector import PgVectorStore
+
         store = PgVectorStore(session_factory=session_factory, settings=settings)
     else:
+        from app.rag.vectorstore_chroma import ChromaVectorStore
+
         store = ChromaVectorStore(settings=settings)
     return Retriever(vector_store=store, embedder=embedder, settings=settings)
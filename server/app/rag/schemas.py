@@ -15,6 +15,7 @@ class DocumentMetadata(BaseModel):
     tone: str = Field(default="neutral")
     country: str = Field(default="jo")
     language: str = Field(default="ar")
+    heading_path: str = Field(default="", description="Markdown headings enclosing the chunk, joined by ' > '")
     created_at: datetime = Field(default_factory=datetime.utcnow)
 
 
@@ -28,6 +29,10 @@ class DocumentChunk(BaseModel):
 class RetrievalResult(BaseModel):
     chunks: list[DocumentChunk]
     context_bullets: list[str]
+    scores: list[float] = Field(default_factory=list, description="Cosine similarity of each chunk to the query")
+    source_chunk_ids: list[list[str]] = Field(
+        default_factory=list, description="Stored chunk ids behind each passage; merged passages list several"
+    )
 
 
 class IngestResult(BaseModel):
@@ -0,0 +1,155 @@
+"""Daily tips drawn from the ingested corpus.
+
+``build_tip_index`` walks the vector store once (without embeddings) and keeps
+the bullet-point advice lines of every chunk, grouped by age range and
+language. An age-specific bucket also includes tips tagged ``all``. Each
+bucket is shuffled with the day as the seed. Every response the endpoint can
+give is then serialised ahead of time together with its ETag, so serving a
+tip is a dict lookup that never touches the database or the model.
+``TipRotation`` rebuilds the index in a worker thread just after midnight UTC.
+"""
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import random
+import re
+from collections import defaultdict
+from dataclasses import dataclass
+from datetime import date, datetime, time, timedelta, timezone
+from typing import Callable, Iterable, Iterator, Optional
+
+from loguru import logger
+
+from app.core.settings import Settings
+from app.rag.schemas import DocumentChunk
+
+MAX_TIPS_PER_RESPONSE = 5
+TIP_MIN_CHARS = 25
+TIP_MAX_CHARS = 240
+RETRY_SECONDS = 300.0
+_BULLET_RE = re.compile(r"^\s*(?:[-*•]|\d+[.)])\s+(?P<text>.+?)\s*$")
+_MARKUP_RE = re.compile(r"\*\*|__|`")
+
+
+def extract_tips(content: str) -> list[str]:
+    """Bullet and numbered list items of tip length from a chunk's Markdown."""
+
+    tips = []
+    for line in content.splitlines():
+        match = _BULLET_RE.match(line)
+        if not match:
+            continue
+        tip = _MARKUP_RE.sub("", match.group("text")).strip()
+        if TIP_MIN_CHARS <= len(tip) <= TIP_MAX_CHARS:
+            tips.append(tip)
+    return tips
+
+
+@dataclass(frozen=True)
+class TipPayload:
+    body: bytes
+    etag: str
+
+
+def _payload(age_range: str, language: str, day: date, tips: list[str]) -> TipPayload:
+    body = json.dumps(
+        {"age_range": age_range, "language": language, "day": day.isoformat(), "tips": tips}, ensure_ascii=False
+    ).encode("utf-8")
+    return TipPayload(body=body, etag=f'"{hashlib.blake2b(body, digest_size=12).hexdigest()}"')
+
+
+class TipIndex:
+    """One day's rotation: every (age_range, language, limit) response, ready to send."""
+
+    def __init__(self, day: date, tips: dict[tuple[str, str], list[str]]) -> None:
+        self.day = day
+        self.expires_at = datetime.combine(day + timedelta(days=1), time(), tzinfo=timezone.utc)
+        by_language: dict[str, list[str]] = defaultdict(list)
+        for (_, language), bucket in tips.items():
+            by_language[language].extend(bucket)
+
+        buckets: dict[tuple[str, str], list[str]] = {}
+        for (age_range, language), bucket in tips.items():
+            if age_range != "all":
+                buckets[(age_range, language)] = bucket + tips.get(("all", language), [])
+        for language, bucket in by_language.items():
+            buckets[("all", language)] = bucket
+
+        self._payloads: dict[tuple[str, str, int], TipPayload] = {}
+        for (age_range, language), bucket in buckets.items():
+            rotation = sorted(set(bucket))
+            random.Random(f"{day.isoformat()}:{age_range}:{language}").shuffle(rotation)
+            for limit in range(1, MAX_TIPS_PER_RESPONSE + 1):
+                self._payloads[(age_range, language, limit)] = _payload(age_range, language, day, rotation[:limit])
+        self.size = sum(len(set(bucket)) for (age, _), bucket in buckets.items() if age == "all")
+
+    def lookup(self, age_range: str, language: str, limit: int) -> TipPayload:
+        """The response for a request; unknown age ranges fall back to the language's ``all`` bucket."""
+
+        limit = max(1, min(limit, MAX_TIPS_PER_RESPONSE))
+        payload = self._payloads.get((age_range, language, limit)) or self._payloads.get(("all", language, limit))
+        return payload or _payload(age_range, language, self.day, [])
+
+
+def group_tips(chunks: Iterable[DocumentChunk]) -> dict[tuple[str, str], list[str]]:
+    grouped: dict[tuple[str, str], list[str]] = defaultdict(list)
+    for chunk in chunks:
+        key = (chunk.metadata.age_range or "all", chunk.metadata.language or "ar")
+        grouped[key].extend(extract_tips(chunk.content))
+    return {key: tips for key, tips in grouped.items() if tips}
+
+
+def default_tips(settings: Settings) -> dict[tuple[str, str], list[str]]:
+    """The built-in Arabic tips, used until a corpus with tips has been ingested."""
+
+    return {(age_range, "ar"): list(tips) for age_range, tips in settings.default_daily_tips.items()}
+
+
+def build_tip_index(
+    chunk_pages: Iterable[list[DocumentChunk]], settings: Settings, day: Optional[date] = None
+) -> TipIndex:
+    day = day or datetime.now(timezone.utc).date()
+    tips = group_tips(chunk for page in chunk_pages for chunk in page)
+    return TipIndex(day, tips or default_tips(settings))
+
+
+class TipRotation:
+    """Holds the current ``TipIndex`` and rebuilds it from the corpus once a day."""
+
+    def __init__(self, settings: Settings, load_chunks: Callable[[], Iterator[list[DocumentChunk]]]) -> None:
+        self._settings = settings
+        self._load_chunks = load_chunks
+        self._task: Optional[asyncio.Task] = None
+        # Served until the first corpus scan finishes, so startup never waits on it.
+        self.index = TipIndex(datetime.now(timezone.utc).date(), default_tips(settings))
+
+    async def refresh(self) -> TipIndex:
+        day = datetime.now(timezone.utc).date()
+        self.index = await asyncio.to_thread(lambda: build_tip_index(self._load_chunks(), self._settings, day))
+        logger.info("Tip rotation for {} built with {} tips", day, self.index.size)
+        return self.index
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await self.refresh()
+                delay = (self.index.expires_at - datetime.now(timezone.utc)).total_seconds() + 5.0
+            except Exception:  # keep serving the current rotation and try again soon
+                logger.exception("Failed to rebuild the tip rotation")
+                delay = RETRY_SECONDS
+            await asyncio.sleep(max(1.0, delay))
+
+    async def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
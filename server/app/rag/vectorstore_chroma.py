@@ -1,7 +1,7 @@
 """ChromaDB-backed lightweight vector store for local development."""
 from __future__ import annotations
 
-from typing import Sequence
+from typing import Iterator, Sequence
 
 import numpy as np
 
@@ -22,7 +22,7 @@ _COLLECTION_NAME = "family_ai_docs"
 class ChromaVectorStore:
     def __init__(self, settings: Settings) -> None:
         client_settings = ChromaConfig(anonymized_telemetry=False, persist_directory=settings.chroma_persist_dir)
-        self._client = chromadb.PersistentClient(settings=client_settings)
+        self._client = chromadb.PersistentClient(path=settings.chroma_persist_dir, settings=client_settings)
         self._collection = self._client.get_or_create_collection(name=_COLLECTION_NAME, metadata={"hnsw:space": "cosine"})
         self._supports_persist = hasattr(self._client, "persist")
 
@@ -70,6 +70,52 @@ class ChromaVectorStore:
             )
         return chunks
 
+    def iter_chunks(self, batch_size: int = 500, *, with_embeddings: bool = True) -> Iterator[list[DocumentChunk]]:
+        """Yield every stored chunk in pages of ``batch_size``."""
+
+        include = ["documents", "metadatas", "embeddings"] if with_embeddings else ["documents", "metadatas"]
+        offset = 0
+        while True:
+            page = self._collection.get(limit=batch_size, offset=offset, include=include)
+            ids = page.get("ids") or []
+            if not ids:
+                return
+            embeddings = page["embeddings"] if with_embeddings else [[]] * len(ids)
+            yield [
+                DocumentChunk(
+                    chunk_id=chunk_id,
+                    content=content,
+                    embedding=list(embedding),
+                    metadata=DocumentMetadata(**(metadata or {})),
+                )
+                for chunk_id, content, metadata, embedding in zip(
+                    ids, page["documents"], page["metadatas"], embeddings, strict=True
+                )
+            ]
+            offset += len(ids)
+
+    def get_chunks(self, chunk_ids: Sequence[str]) -> list[DocumentChunk]:
+        """Fetch stored chunks by id without their embeddings; unknown ids are skipped."""
+
+        if not chunk_ids:
+            return []
+        results = self._collection.get(ids=list(dict.fromkeys(chunk_ids)), include=["documents", "metadatas"])
+        return [
+            DocumentChunk(
+                chunk_id=chunk_id,
+                content=content,
+                embedding=[],
+                metadata=DocumentMetadata(**(metadata or {})),
+            )
+            for chunk_id, content, metadata in zip(
+                results.get("ids") or [], results.get("documents") or [], results.get("metadatas") or [], strict=True
+            )
+        ]
+
+    def list_chunk_ids(self, document_id: str) -> list[str]:
+        results = self._collection.get(where={"document_id": document_id}, include=[])
+        return list(results.get("ids") or [])
+
     def delete(self, chunk_ids: Sequence[str]) -> None:
         if not chunk_ids:
             return
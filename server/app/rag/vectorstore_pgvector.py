@@ -1,17 +1,41 @@
 """pgvector-backed similarity search implementation."""
 from __future__ import annotations
 
-from typing import Callable, Sequence
+from datetime import datetime
+from typing import Callable, Iterator, Sequence
 
-from pgvector.sqlalchemy import Vector
-from sqlalchemy import select
+import numpy as np
+import psycopg
+from pgvector.psycopg import register_vector
+from sqlalchemy import delete, select
 from sqlalchemy.exc import SQLAlchemyError
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, defer
 
 from app.core.settings import Settings
-from app.db import models
+from app.db import crud, models
 from app.rag.schemas import DocumentChunk, DocumentMetadata
 
+# Rows per DELETE statement; keeps bind parameters well under Postgres' 65535 limit.
+_BATCH_SIZE = 500
+_STAGING_TABLE = "document_chunks_staging"
+_COPY_COLUMNS = (
+    "chunk_id",
+    "document_id",
+    "file_name",
+    "topic",
+    "age_range",
+    "tone",
+    "country",
+    "language",
+    "heading_path",
+    "content",
+    "embedding",
+    "created_at",
+    "updated_at",
+)
+_COPY_TYPES = ["varchar"] * 10 + ["vector", "timestamp", "timestamp"]
+_UPDATE_COLUMNS = [name for name in _COPY_COLUMNS if name not in {"chunk_id", "created_at"}]
+
 
 class PgVectorStore:
     def __init__(self, session_factory: Callable[[], Session], settings: Settings) -> None:
@@ -19,26 +43,54 @@ class PgVectorStore:
         self._settings = settings
 
     def upsert(self, chunks: Sequence[DocumentChunk]) -> int:
+        """Bulk upsert via binary COPY into a staging table and one INSERT ... ON CONFLICT.
+
+        Binary COPY sends embeddings as packed float4 arrays instead of formatting
+        thousands of floats per row as text, which dominated the old per-row merge.
+        """
+
+        if not chunks:
+            return 0
+        columns = ", ".join(_COPY_COLUMNS)
+        updates = ", ".join(f"{name} = excluded.{name}" for name in _UPDATE_COLUMNS)
+        now = datetime.utcnow()
         try:
             with self._session_factory() as session:
-                for chunk in chunks:
-                    session.merge(
-                        models.DocumentMeta(
-                            chunk_id=chunk.chunk_id,
-                            document_id=chunk.metadata.document_id,
-                            file_name=chunk.metadata.file_name,
-                            topic=chunk.metadata.topic,
-                            age_range=chunk.metadata.age_range,
-                            tone=chunk.metadata.tone,
-                            country=chunk.metadata.country,
-                            language=chunk.metadata.language,
-                            content=chunk.content,
-                            embedding=Vector(chunk.embedding),
-                        )
+                connection = session.connection().connection.driver_connection
+                register_vector(connection)
+                with connection.cursor() as cursor:
+                    cursor.execute(
+                        f"CREATE TEMP TABLE IF NOT EXISTS {_STAGING_TABLE} "
+                        f"(LIKE {models.DocumentMeta.__tablename__} INCLUDING DEFAULTS) ON COMMIT DELETE ROWS"
+                    )
+                    with cursor.copy(f"COPY {_STAGING_TABLE} ({columns}) FROM STDIN (FORMAT BINARY)") as copy:
+                        copy.set_types(_COPY_TYPES)
+                        for chunk in chunks:
+                            copy.write_row(
+                                (
+                                    chunk.chunk_id,
+                                    chunk.metadata.document_id,
+                                    chunk.metadata.file_name,
+                                    chunk.metadata.topic,
+                                    chunk.metadata.age_range,
+                                    chunk.metadata.tone,
+                                    chunk.metadata.country,
+                                    chunk.metadata.language,
+                                    chunk.metadata.heading_path[:512],
+                                    chunk.content,
+                                    np.asarray(chunk.embedding, dtype=np.float32),
+                                    now,
+                                    now,
+                                )
+                            )
+                    cursor.execute(
+                        f"INSERT INTO {models.DocumentMeta.__tablename__} ({columns}) "
+                        f"SELECT DISTINCT ON (chunk_id) {columns} FROM {_STAGING_TABLE} "
+                        f"ON CONFLICT (chunk_id) DO UPDATE SET {updates}"
                     )
                 session.commit()
             return len(chunks)
-        except SQLAlchemyError as exc:  # pragma: no cover - DB path
+        except (SQLAlchemyError, psycopg.Error) as exc:  # pragma: no cover - DB path
             raise RuntimeError("pgvector upsert failed") from exc
 
     def similarity_search(self, query_embedding: Sequence[float], top_k: int) -> list[DocumentChunk]:
@@ -51,18 +103,65 @@ class PgVectorStore:
             rows = session.scalars(stmt).all()
         return [self._to_chunk(row) for row in rows]
 
+    def iter_chunks(self, batch_size: int = 500, *, with_embeddings: bool = True) -> Iterator[list[DocumentChunk]]:
+        """Yield every stored chunk in pages of ``batch_size``.
+
+        Pages are keyed on ``chunk_id`` rather than OFFSET so late pages stay cheap.
+        """
+
+        last_id: str | None = None
+        while True:
+            stmt = select(models.DocumentMeta).order_by(models.DocumentMeta.chunk_id).limit(batch_size)
+            if not with_embeddings:
+                stmt = stmt.options(defer(models.DocumentMeta.embedding))
+            if last_id is not None:
+                stmt = stmt.where(models.DocumentMeta.chunk_id > last_id)
+            with self._session_factory() as session:
+                rows = session.scalars(stmt).all()
+                page = [self._to_chunk(row, with_embedding=with_embeddings) for row in rows]
+            if not page:
+                return
+            yield page
+            last_id = page[-1].chunk_id
+
+    def get_chunks(self, chunk_ids: Sequence[str]) -> list[DocumentChunk]:
+        """Fetch stored chunks by id without their embeddings; unknown ids are skipped."""
+
+        ids = list(dict.fromkeys(chunk_ids))
+        chunks: list[DocumentChunk] = []
+        with self._session_factory() as session:
+            for start in range(0, len(ids), _BATCH_SIZE):
+                stmt = (
+                    select(models.DocumentMeta)
+                    .options(defer(models.DocumentMeta.embedding))
+                    .where(models.DocumentMeta.chunk_id.in_(ids[start : start + _BATCH_SIZE]))
+                )
+                chunks.extend(self._to_chunk(row, with_embedding=False) for row in session.scalars(stmt))
+        return chunks
+
+    def list_chunk_ids(self, document_id: str) -> list[str]:
+        with self._session_factory() as session:
+            return crud.get_chunk_ids_by_document(session, document_id)
+
     def delete(self, chunk_ids: Sequence[str]) -> None:
         if not chunk_ids:
             return
+        ids = list(chunk_ids)
         with self._session_factory() as session:
-            stmt = select(models.DocumentMeta).where(models.DocumentMeta.chunk_id.in_(list(chunk_ids)))
-            rows = session.scalars(stmt).all()
-            for row in rows:
-                session.delete(row)
+            for start in range(0, len(ids), _BATCH_SIZE):
+                session.execute(
+                    delete(models.DocumentMeta).where(models.DocumentMeta.chunk_id.in_(ids[start : start + _BATCH_SIZE]))
+                )
+            session.commit()
+
+    def delete_document(self, document_id: str) -> int:
+        with self._session_factory() as session:
+            deleted = crud.delete_document_metadata(session, document_id)
             session.commit()
+        return deleted
 
     @staticmethod
-    def _to_chunk(row: models.DocumentMeta) -> DocumentChunk:
+    def _to_chunk(row: models.DocumentMeta, *, with_embedding: bool = True) -> DocumentChunk:
         metadata = DocumentMetadata(
             document_id=row.document_id,
             file_name=row.file_name,
@@ -71,11 +170,12 @@ class PgVectorStore:
             tone=row.tone,
             country=row.country,
             language=row.language,
+            heading_path=row.heading_path or "",
             created_at=row.created_at,
         )
         return DocumentChunk(
             chunk_id=row.chunk_id,
             content=row.content,
-            embedding=list(row.embedding),
+            embedding=list(row.embedding) if with_embedding else [],
             metadata=metadata,
         )
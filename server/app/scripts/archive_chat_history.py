@@ -0,0 +1,47 @@
+"""Archive chat history older than the retention window, then drop it.
+
+Each expired month of ``chat_turns`` and ``chat_logs`` is written as gzip NDJSON
+to the blob store under ``CHAT_ARCHIVE_PREFIX/<table>/<YYYY-MM>.ndjson.gz``. The
+rows are removed only after the upload succeeds. On Postgres this also creates
+the partitions for the coming months. Schedule it daily or monthly.
+
+    python -m app.scripts.archive_chat_history --keep-months 12
+    python -m app.scripts.archive_chat_history --output-dir /backups/chat --dry-run
+"""
+from __future__ import annotations
+
+import argparse
+
+from app.core.blobstore import LocalBlobStore, get_blob_store
+from app.core.settings import get_settings
+from app.db.partitions import apply_retention
+from app.db.session import engine, init_db
+
+
+def main() -> None:
+    settings = get_settings()
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--keep-months", type=int, default=settings.chat_retention_months, help="Full months to keep")
+    parser.add_argument("--output-dir", help="Write archives to this directory instead of the configured blob store")
+    parser.add_argument("--dry-run", action="store_true", help="List the months that would be archived")
+    args = parser.parse_args()
+
+    store = LocalBlobStore(args.output_dir) if args.output_dir else get_blob_store(settings)
+    if store is None and not args.dry_run:
+        raise SystemExit("No blob store configured (BLOB_BACKEND); pass --output-dir to archive locally")
+
+    init_db()
+    archived = apply_retention(
+        engine, store, keep_months=args.keep_months, prefix=settings.chat_archive_prefix, dry_run=args.dry_run
+    )
+    for month in archived:
+        if args.dry_run:
+            print(f"would archive {month.table} {month.month:%Y-%m}")
+        else:
+            print(f"{month.table} {month.month:%Y-%m}: {month.rows} rows -> {month.key or '(empty, nothing stored)'}")
+    if not archived:
+        print("Nothing older than the retention window.")
+
+
+if __name__ == "__main__":
+    main()
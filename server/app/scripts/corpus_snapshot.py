@@ -0,0 +1,253 @@
+"""Export or import the whole vector corpus as a single portable snapshot file.
+
+A snapshot is a zip archive holding:
+
+- ``manifest.json``: format version, embedding model, dimensions, dtype and row count
+- ``chunks.ndjson``: one line per chunk (id, content, metadata), deflate-compressed
+- ``embeddings.bin``: a contiguous little-endian ``count x dimensions`` array in
+  row order, stored uncompressed
+
+Both vector backends can be the source or the target, so the same file seeds a
+fresh environment or moves a corpus between pgvector and Chroma without
+re-embedding anything.
+
+    python -m app.scripts.corpus_snapshot export corpus.snap --dtype float16
+    python -m app.scripts.corpus_snapshot import corpus.snap --backend chroma
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import shutil
+import tempfile
+import time
+import zipfile
+from collections import Counter
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Iterable, Iterator
+
+import numpy as np
+
+from app.core.settings import Settings, get_settings
+from app.rag.schemas import DocumentChunk, DocumentMetadata
+
+FORMAT_VERSION = 1
+MANIFEST_NAME = "manifest.json"
+CHUNKS_NAME = "chunks.ndjson"
+EMBEDDINGS_NAME = "embeddings.bin"
+DTYPES = {"float16": "<f2", "float32": "<f4"}
+
+
+def export_snapshot(
+    pages: Iterable[list[DocumentChunk]],
+    path: Path,
+    *,
+    dtype: str = "float32",
+    embedding_model: str = "",
+    source: str = "",
+) -> dict[str, object]:
+    """Stream chunk pages into a snapshot at ``path`` and return its manifest."""
+
+    np_dtype = np.dtype(DTYPES[dtype])
+    count = 0
+    dimensions = 0
+    tmp_path = path.with_name(f".{path.name}.tmp")
+    # Chunks and vectors arrive together, but a zip entry must be written in one go:
+    # vectors are spooled to a temp file and appended after the NDJSON entry.
+    try:
+        with tempfile.TemporaryFile() as vectors:
+            with zipfile.ZipFile(tmp_path, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+                with archive.open(CHUNKS_NAME, "w", force_zip64=True) as lines:
+                    for page in pages:
+                        if not page:
+                            continue
+                        matrix = np.asarray([chunk.embedding for chunk in page], dtype=np.float32)
+                        if not dimensions:
+                            dimensions = matrix.shape[1]
+                        if matrix.shape[1] != dimensions:
+                            raise ValueError(f"Mixed embedding sizes in corpus: {dimensions} and {matrix.shape[1]}")
+                        vectors.write(matrix.astype(np_dtype).tobytes())
+                        for chunk in page:
+                            record = {
+                                "chunk_id": chunk.chunk_id,
+                                "content": chunk.content,
+                                "metadata": chunk.metadata.model_dump(mode="json"),
+                            }
+                            lines.write((json.dumps(record, ensure_ascii=False) + "\n").encode("utf-8"))
+                        count += len(page)
+
+                vectors.seek(0)
+                info = zipfile.ZipInfo(EMBEDDINGS_NAME, date_time=time.localtime()[:6])
+                info.compress_type = zipfile.ZIP_STORED
+                with archive.open(info, "w", force_zip64=True) as target:
+                    shutil.copyfileobj(vectors, target, length=1024 * 1024)
+
+                manifest = {
+                    "format_version": FORMAT_VERSION,
+                    "created_at": datetime.now(timezone.utc).isoformat(),
+                    "source_backend": source,
+                    "embedding_model": embedding_model,
+                    "count": count,
+                    "dimensions": dimensions,
+                    "dtype": dtype,
+                }
+                archive.writestr(MANIFEST_NAME, json.dumps(manifest, indent=2))
+    except BaseException:
+        tmp_path.unlink(missing_ok=True)
+        raise
+    tmp_path.replace(path)
+    return manifest
+
+
+def read_manifest(path: Path) -> dict[str, object]:
+    with zipfile.ZipFile(path) as archive:
+        manifest = json.loads(archive.read(MANIFEST_NAME))
+    if manifest.get("format_version") != FORMAT_VERSION:
+        raise ValueError(f"Unsupported snapshot format: {manifest.get('format_version')}")
+    return manifest
+
+
+def iter_snapshot(path: Path, batch_size: int = 500) -> Iterator[list[DocumentChunk]]:
+    """Yield the chunks of a snapshot in pages, reading embeddings as float32."""
+
+    manifest = read_manifest(path)
+    np_dtype = np.dtype(DTYPES[str(manifest["dtype"])])
+    row_bytes = int(manifest["dimensions"]) * np_dtype.itemsize
+    with zipfile.ZipFile(path) as archive, archive.open(CHUNKS_NAME) as lines, archive.open(EMBEDDINGS_NAME) as vectors:
+        page: list[dict[str, object]] = []
+
+        def build() -> list[DocumentChunk]:
+            block = vectors.read(row_bytes * len(page))
+            if len(block) != row_bytes * len(page):
+                raise ValueError("Snapshot embeddings are truncated")
+            matrix = np.frombuffer(block, dtype=np_dtype).reshape(len(page), -1).astype(np.float32)
+            return [
+                DocumentChunk(
+                    chunk_id=record["chunk_id"],
+                    content=record["content"],
+                    embedding=row.tolist(),
+                    metadata=DocumentMetadata(**record["metadata"]),
+                )
+                for record, row in zip(page, matrix)
+            ]
+
+        for line in lines:
+            page.append(json.loads(line))
+            if len(page) == batch_size:
+                yield build()
+                page = []
+        if page:
+            yield build()
+
+
+def import_snapshot(path: Path, store, *, batch_size: int = 500) -> dict[str, tuple[DocumentMetadata, int]]:
+    """Bulk-load a snapshot into ``store``.
+
+    Returns each document's metadata and chunk count, for rebuilding the registry.
+    """
+
+    counts: Counter[str] = Counter()
+    metadata: dict[str, DocumentMetadata] = {}
+    for page in iter_snapshot(path, batch_size=batch_size):
+        store.upsert(page)
+        for chunk in page:
+            counts[chunk.metadata.document_id] += 1
+            metadata.setdefault(chunk.metadata.document_id, chunk.metadata)
+    return {document_id: (metadata[document_id], count) for document_id, count in counts.items()}
+
+
+def _build_store(settings: Settings):
+    from app.db.session import SessionLocal
+    from app.rag.ingest import build_vector_store
+
+    return build_vector_store(settings=settings, session_factory=SessionLocal)
+
+
+def _settings_for(backend: str | None) -> Settings:
+    settings = get_settings()
+    return settings.model_copy(update={"vector_backend": backend}) if backend else settings
+
+
+def _restore_registry(documents: dict[str, tuple[DocumentMetadata, int]]) -> None:
+    from app.db import crud
+    from app.db.session import session_scope
+
+    with session_scope() as session:
+        for document_id, (metadata, chunk_count) in documents.items():
+            crud.upsert_document_registry(
+                session,
+                document_id=document_id,
+                file_name=metadata.file_name,
+                metadata=metadata.model_dump(mode="json"),
+                chunk_count=chunk_count,
+                s3_uploaded=False,
+            )
+
+
+def run_export(path: Path, *, backend: str | None = None, dtype: str = "float32", batch_size: int = 500) -> None:
+    settings = _settings_for(backend)
+    started = time.perf_counter()
+    store = _build_store(settings)
+    manifest = export_snapshot(
+        store.iter_chunks(batch_size=batch_size),
+        path,
+        dtype=dtype,
+        embedding_model=settings.embedding_model,
+        source=settings.vector_backend,
+    )
+    elapsed = time.perf_counter() - started
+    size_mb = path.stat().st_size / (1024 * 1024)
+    print(
+        f"Exported {manifest['count']} chunks ({manifest['dimensions']}d {dtype}) from {settings.vector_backend} "
+        f"to {path}: {size_mb:.1f} MiB in {elapsed:.1f}s"
+    )
+
+
+def run_import(path: Path, *, backend: str | None = None, batch_size: int = 500) -> None:
+    settings = _settings_for(backend)
+    manifest = read_manifest(path)
+    if manifest["embedding_model"] and manifest["embedding_model"] != settings.embedding_model:
+        raise SystemExit(
+            f"Snapshot was embedded with {manifest['embedding_model']} but EMBEDDING_MODEL is {settings.embedding_model}"
+        )
+    from app.db.session import init_db
+
+    init_db()
+    started = time.perf_counter()
+    documents = import_snapshot(path, _build_store(settings), batch_size=batch_size)
+    _restore_registry(documents)
+    elapsed = time.perf_counter() - started
+    print(
+        f"Imported {manifest['count']} chunks from {len(documents)} documents into {settings.vector_backend} "
+        f"in {elapsed:.1f}s"
+    )
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    export = commands.add_parser("export", help="Write the current corpus to a snapshot file")
+    export.add_argument("path", type=Path)
+    export.add_argument("--dtype", choices=sorted(DTYPES), default="float32", help="Embedding precision on disk")
+
+    load = commands.add_parser("import", help="Bulk-load a snapshot into the vector store")
+    load.add_argument("path", type=Path)
+
+    for command in (export, load):
+        command.add_argument("--backend", choices=["pgvector", "chroma"], help="Override VECTOR_BACKEND")
+        command.add_argument("--batch-size", type=int, default=500, help="Chunks per read/write batch")
+    return parser
+
+
+def main() -> None:
+    args = build_parser().parse_args()
+    if args.command == "export":
+        run_export(args.path, backend=args.backend, dtype=args.dtype, batch_size=args.batch_size)
+    else:
+        run_import(args.path, backend=args.backend, batch_size=args.batch_size)
+
+
+if __name__ == "__main__":
+    main()
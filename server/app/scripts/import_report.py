@@ -0,0 +1,126 @@
+"""Report what importing the API costs, and fail when it goes over budget.
+
+Imports ``--module`` (default ``app.main``) in fresh interpreters with
+``python -X importtime``. The fastest of ``--runs`` attempts is kept. The
+report shows the total, the heaviest top-level packages by their own import
+time, and the slowest individual modules. Exits with status 1 when the
+total exceeds ``--budget-ms`` or when any ``--forbid`` package was loaded.
+Use it in CI to catch a heavy dependency creeping back into startup.
+
+    python -m app.scripts.import_report --budget-ms 2500
+    VECTOR_BACKEND=pgvector python -m app.scripts.import_report --forbid chromadb boto3
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+from collections import defaultdict
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Optional
+
+SERVER_ROOT = Path(__file__).resolve().parents[2]
+
+
+@dataclass(frozen=True)
+class ImportTiming:
+    module: str
+    self_us: int
+    cumulative_us: int
+
+
+def parse_importtime(output: str) -> list[ImportTiming]:
+    """Parse the ``import time: self | cumulative | name`` lines written to stderr."""
+
+    timings = []
+    for line in output.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        fields = line[len("import time:") :].split("|")
+        if len(fields) != 3 or not fields[0].strip().isdigit():
+            continue  # the column header
+        timings.append(ImportTiming(fields[2].strip(), int(fields[0]), int(fields[1])))
+    return timings
+
+
+def measure(module: str, *, runs: int = 3, env: Optional[dict[str, str]] = None) -> list[ImportTiming]:
+    """Import ``module`` in ``runs`` fresh interpreters and return the fastest run's timings."""
+
+    best: list[ImportTiming] = []
+    for _ in range(runs):
+        result = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+            cwd=SERVER_ROOT,
+            env={**os.environ, **(env or {})},
+            capture_output=True,
+            text=True,
+        )
+        if result.returncode != 0:
+            raise RuntimeError(f"import {module} failed:\n{result.stderr[-2000:]}")
+        timings = parse_importtime(result.stderr)
+        if not best or total_ms(timings, module) < total_ms(best, module):
+            best = timings
+    return best
+
+
+def total_ms(timings: list[ImportTiming], module: str) -> float:
+    return next((timing.cumulative_us for timing in timings if timing.module == module), 0) / 1000
+
+
+def package_totals(timings: list[ImportTiming]) -> dict[str, float]:
+    """Own import time per top-level package in milliseconds, heaviest first."""
+
+    totals: dict[str, int] = defaultdict(int)
+    for timing in timings:
+        totals[timing.module.split(".")[0]] += timing.self_us
+    return {name: us / 1000 for name, us in sorted(totals.items(), key=lambda item: item[1], reverse=True)}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--module", default="app.main", help="Module whose import is measured")
+    parser.add_argument("--budget-ms", type=float, default=2500.0, help="Fail when the import takes longer")
+    parser.add_argument("--forbid", nargs="*", default=[], help="Top-level packages that must not be imported")
+    parser.add_argument("--runs", type=int, default=3, help="Fresh interpreters to try; the fastest counts")
+    parser.add_argument("--top", type=int, default=15, help="Packages and modules to list")
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON")
+    args = parser.parse_args()
+
+    timings = measure(args.module, runs=args.runs)
+    total = total_ms(timings, args.module)
+    packages = package_totals(timings)
+    loaded_forbidden = sorted(name for name in args.forbid if name in packages)
+    slowest = sorted(timings, key=lambda timing: timing.self_us, reverse=True)[: args.top]
+    over_budget = total > args.budget_ms
+
+    if args.json:
+        report = {
+            "module": args.module,
+            "total_ms": round(total, 1),
+            "budget_ms": args.budget_ms,
+            "over_budget": over_budget,
+            "forbidden_loaded": loaded_forbidden,
+            "packages_ms": {name: round(ms, 1) for name, ms in list(packages.items())[: args.top]},
+            "slowest_modules": [asdict(timing) for timing in slowest],
+        }
+        print(json.dumps(report, indent=2))
+    else:
+        print(f"import {args.module}: {total:.0f} ms (budget {args.budget_ms:.0f} ms)")
+        print("heaviest packages (own time):")
+        for name, ms in list(packages.items())[: args.top]:
+            print(f"  {ms:8.1f} ms  {name}")
+        print("slowest modules (own time):")
+        for timing in slowest:
+            print(f"  {timing.self_us / 1000:8.1f} ms  {timing.module}")
+        if loaded_forbidden:
+            print(f"forbidden packages imported: {', '.join(loaded_forbidden)}")
+
+    if over_budget or loaded_forbidden:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+"""Add MinHash signatures for stored chunks that predate near-duplicate detection.
+
+Only chunks in the LSH index can act as canonicals for later uploads; run this once
+after upgrading so the existing corpus is covered.
+
+    python -m app.scripts.index_duplicates
+"""
+from __future__ import annotations
+
+import argparse
+from collections import defaultdict
+
+from app.core.settings import get_settings
+from app.db import crud
+from app.db.session import SessionLocal, init_db, session_scope
+from app.rag.dedup import band_buckets, minhash
+from app.rag.ingest import build_vector_store
+
+
+def run(batch_size: int = 500) -> int:
+    init_db()
+    store = build_vector_store(settings=get_settings(), session_factory=SessionLocal)
+    indexed = 0
+    for page in store.iter_chunks(batch_size=batch_size):
+        with session_scope() as session:
+            known = crud.get_chunk_signatures(session, [chunk.chunk_id for chunk in page])
+            by_document: dict[str, dict[str, object]] = defaultdict(dict)
+            for chunk in page:
+                if chunk.chunk_id not in known:
+                    by_document[chunk.metadata.document_id][chunk.chunk_id] = minhash(chunk.content)
+            for document_id, signatures in by_document.items():
+                crud.add_chunk_signatures(
+                    session,
+                    document_id=document_id,
+                    signatures={chunk_id: signature.tobytes() for chunk_id, signature in signatures.items()},
+                    buckets={chunk_id: band_buckets(signature) for chunk_id, signature in signatures.items()},
+                )
+                indexed += len(signatures)
+    return indexed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--batch-size", type=int, default=500, help="Chunks read per page")
+    args = parser.parse_args()
+    print(f"Indexed {run(batch_size=args.batch_size)} chunks for near-duplicate detection.")
+
+
+if __name__ == "__main__":
+    main()
@@ -6,13 +6,14 @@ Equivalent to the one-liner run via:
 """
 
 from app.db.session import session_scope
-from app.db import models
+from app.db import crud
 
 
 def list_households():
     """Print household info with children details."""
     with session_scope() as session:
-        households = session.query(models.Household).all()
+        # Children are loaded for all households in one extra query, not one per household.
+        households = crud.list_households(session)
         for h in households:
             print(f"{h.id} • {h.name} • {h.country} • {h.language_preference}")
             for child in h.children:
@@ -0,0 +1,191 @@
+"""Seed the knowledge base from a directory tree of Markdown files.
+
+Files are ingested by a bounded pool of concurrent pipelines. Completed files are
+recorded in a checkpoint manifest (keyed by relative path and content hash), so a
+rerun after a failure skips everything that already made it in.
+
+    python -m app.scripts.seed_corpus /app/corpus --concurrency 4
+    python -m app.scripts.seed_corpus /app/corpus --dry-run
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+from app.core.settings import Settings, get_settings
+
+MANIFEST_NAME = ".seed_manifest.json"
+
+
+def parse_frontmatter(content: str) -> tuple[dict[str, str], str]:
+    if not content.startswith("---"):
+        return {}, content
+    parts = content.split("---", 2)
+    if len(parts) < 3:
+        return {}, content
+    meta_block, body = parts[1], parts[2]
+    metadata: dict[str, str] = {}
+    for line in meta_block.strip().splitlines():
+        if ":" in line:
+            key, value = line.split(":", 1)
+            metadata[key.strip()] = value.strip()
+    return metadata, body.strip()
+
+
+def discover_files(root: Path, pattern: str) -> list[Path]:
+    return sorted(path for path in root.rglob(pattern) if path.is_file())
+
+
+def load_manifest(path: Path) -> dict[str, dict[str, object]]:
+    if not path.exists():
+        return {}
+    return json.loads(path.read_text(encoding="utf-8"))
+
+
+def save_manifest(path: Path, manifest: dict[str, dict[str, object]]) -> None:
+    tmp_path = path.with_suffix(".tmp")
+    tmp_path.write_text(json.dumps(manifest, ensure_ascii=False, indent=2, sort_keys=True), encoding="utf-8")
+    os.replace(tmp_path, path)
+
+
+def dry_run(root: Path, files: list[Path], settings: Settings) -> None:
+    from app.rag.chunking import token_counter
+    from app.rag.ingest import chunk_text
+
+    count_tokens = token_counter(settings.embedding_model)
+    total_chunks = total_tokens = 0
+    for file_path in files:
+        _, body = parse_frontmatter(file_path.read_text(encoding="utf-8"))
+        chunks = chunk_text(body, settings)
+        tokens = sum(count_tokens(chunk) for chunk in chunks)
+        total_chunks += len(chunks)
+        total_tokens += tokens
+        print(f"{file_path.relative_to(root)}: {len(chunks)} chunks, {tokens} tokens")
+    print(f"Total: {len(files)} files, {total_chunks} chunks, {total_tokens} embedding tokens ({settings.embedding_model})")
+
+
+async def seed(root: Path, files: list[Path], *, manifest_path: Path, concurrency: int, force: bool) -> int:
+    from app.core.openai_client import OpenAIClient
+    from app.db.session import SessionLocal
+    from app.rag.ingest import ingest_text
+
+    settings = get_settings()
+    openai_client = OpenAIClient(settings)
+    manifest = {} if force else load_manifest(manifest_path)
+
+    pending: list[tuple[Path, str, str]] = []
+    for file_path in files:
+        key = str(file_path.relative_to(root))
+        digest = hashlib.sha256(file_path.read_bytes()).hexdigest()
+        if manifest.get(key, {}).get("sha256") == digest:
+            continue
+        pending.append((file_path, key, digest))
+    print(f"{len(files) - len(pending)} of {len(files)} files already seeded; {len(pending)} to go.", flush=True)
+
+    queue: asyncio.Queue[tuple[Path, str, str]] = asyncio.Queue()
+    for item in pending:
+        queue.put_nowait(item)
+    started = time.perf_counter()
+    stats = {"files": 0, "chunks": 0, "failed": 0}
+
+    async def worker() -> None:
+        while not queue.empty():
+            file_path, key, digest = queue.get_nowait()
+            try:
+                metadata, body = parse_frontmatter(file_path.read_text(encoding="utf-8"))
+                result = await ingest_text(
+                    text=body,
+                    file_name=key,
+                    metadata_overrides=metadata,
+                    session_factory=SessionLocal,
+                    settings=settings,
+                    openai_client=openai_client,
+                )
+            except Exception as exc:  # noqa: BLE001 - keep seeding the rest, rerun picks it up
+                stats["failed"] += 1
+                print(f"FAILED {key}: {exc}", flush=True)
+                continue
+            manifest[key] = {
+                "sha256": digest,
+                "document_id": result.document_id,
+                "chunks": result.stored_chunks,
+                "completed_at": datetime.now(timezone.utc).isoformat(),
+            }
+            save_manifest(manifest_path, manifest)
+            stats["files"] += 1
+            stats["chunks"] += result.extras.get("embedded_chunks", 0)
+            elapsed = time.perf_counter() - started
+            print(
+                f"[{stats['files'] + stats['failed']}/{len(pending)}] {key}: {result.stored_chunks} chunks "
+                f"({result.extras.get('embedded_chunks', 0)} embedded) | "
+                f"{stats['files'] / elapsed:.2f} files/s, {stats['chunks'] / elapsed:.1f} chunks/s",
+                flush=True,
+            )
+
+    await asyncio.gather(*(worker() for _ in range(max(1, concurrency))))
+    elapsed = time.perf_counter() - started
+    print(f"Seeded {stats['files']} files ({stats['chunks']} chunks embedded) in {elapsed:.1f}s; {stats['failed']} failed.")
+    return stats["failed"]
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("root", type=Path, help="Directory to walk for corpus files")
+    parser.add_argument("--pattern", default="*.md", help="Glob pattern matched recursively (default: *.md)")
+    parser.add_argument("--concurrency", type=int, default=4, help="Concurrent ingestion pipelines")
+    parser.add_argument("--manifest", type=Path, help=f"Checkpoint manifest path (default: <root>/{MANIFEST_NAME})")
+    parser.add_argument("--dry-run", action="store_true", help="Report chunk and token counts without ingesting")
+    parser.add_argument("--force", action="store_true", help="Ignore the manifest and re-ingest every file")
+    return parser
+
+
+def default_manifest_path(root: Path) -> Path:
+    if os.access(root, os.W_OK):
+        return root / MANIFEST_NAME
+    # Read-only corpus mounts (e.g. /app/sample_corpus) keep their manifest in the working directory.
+    root_key = hashlib.sha1(str(root).encode("utf-8")).hexdigest()[:12]
+    return Path.cwd() / f"{MANIFEST_NAME.lstrip('.').removesuffix('.json')}_{root_key}.json"
+
+
+def run(
+    root: Path,
+    *,
+    pattern: str = "*.md",
+    concurrency: int = 4,
+    manifest: Path | None = None,
+    dry: bool = False,
+    force: bool = False,
+) -> int:
+    root = root.resolve()
+    files = discover_files(root, pattern)
+    if not files:
+        print(f"No files matching {pattern} under {root}.")
+        return 0
+    if dry:
+        dry_run(root, files, get_settings())
+        return 0
+    manifest_path = manifest or default_manifest_path(root)
+    return asyncio.run(seed(root, files, manifest_path=manifest_path, concurrency=concurrency, force=force))
+
+
+def main() -> None:
+    args = build_parser().parse_args()
+    failed = run(
+        args.root,
+        pattern=args.pattern,
+        concurrency=args.concurrency,
+        manifest=args.manifest,
+        dry=args.dry_run,
+        force=args.force,
+    )
+    raise SystemExit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+from __future__ import annotations
+
+import json
+from datetime import datetime, timedelta, timezone
+from uuid import uuid4
+
+import pytest
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+
+from app.api.chat_logs import stream_chat_log_lines
+from app.api.upload import decode_cursor, encode_cursor
+from app.core.settings import Settings
+from app.db import crud, models
+from app.db import session as db_session
+
+
+def test_document_pages_follow_the_keyset_without_gaps(tmp_path):
+    engine = db_session.build_engine(Settings(DATABASE_URL=f"sqlite:///{tmp_path / 'app.db'}"))
+    db_session.Base.metadata.create_all(engine)
+    stamp = datetime(2025, 10, 1, 9, 30, 0, 123456)
+    with Session(engine) as session:
+        for index in range(7):
+            session.add(
+                models.DocumentRegistry(
+                    document_id=f"doc-{index}",
+                    file_name=f"doc-{index}.md",
+                    # Pairs of documents share a timestamp so the id has to break the tie.
+                    updated_at=stamp - timedelta(minutes=index // 2),
+                    language="en" if index == 3 else "ar",
+                )
+            )
+        session.commit()
+
+        seen: list[str] = []
+        after = None
+        while True:
+            page = crud.list_documents(session, limit=3, after=after)
+            seen.extend(doc.document_id for doc in page)
+            if len(page) < 3:
+                break
+            after = decode_cursor(encode_cursor(page[-1].updated_at, page[-1].document_id))
+
+        english = crud.list_documents(session, language="en")
+
+    assert seen == ["doc-1", "doc-0", "doc-3", "doc-2", "doc-5", "doc-4", "doc-6"]
+    assert [doc.document_id for doc in english] == ["doc-3"]
+
+
+@pytest.mark.asyncio
+async def test_chat_log_export_streams_the_requested_range(tmp_path):
+    settings = Settings(DATABASE_URL=f"sqlite:///{tmp_path / 'app.db'}")
+    db_session.Base.metadata.create_all(db_session.build_engine(settings))
+    logs = models.ChatLog.__table__
+    start = datetime(2025, 9, 1)
+    with db_session.build_engine(settings).begin() as connection:
+        for hour in range(-1, 6):
+            connection.execute(
+                insert(logs).values(
+                    id=str(uuid4()),
+                    household_id="h1" if hour % 2 else "h2",
+                    user_message=f"سؤال {hour}",
+                    context_refs=[{"chunk_ids": ["c:1"], "score": 0.5}],
+                    created_at=start + timedelta(hours=hour),
+                )
+            )
+
+    async_engine = db_session.build_async_engine(settings)
+    try:
+        chunks = [
+            chunk
+            async for chunk in stream_chat_log_lines(
+                async_engine, start.replace(tzinfo=timezone.utc), start + timedelta(hours=5), batch_size=2
+            )
+        ]
+    finally:
+        await async_engine.dispose()
+
+    rows = [json.loads(line) for chunk in chunks for line in chunk.decode("utf-8").splitlines()]
+    assert [row["user_message"] for row in rows] == [f"سؤال {hour}" for hour in range(5)]
+    assert rows[0]["context_refs"] == [{"chunk_ids": ["c:1"], "score": 0.5}]
+    assert len(chunks) == 3
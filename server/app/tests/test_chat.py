@@ -4,9 +4,10 @@ import asyncio
 
 import pytest
 
+from app.api.chat_logs import rehydrate_context
 from app.core.safety import SafetyChecker
 from app.core.settings import Settings
-from app.rag.retriever import Retriever
+from app.rag.retriever import SNIPPET_CHARS, Retriever, budget_passages
 from app.rag.schemas import DocumentChunk, DocumentMetadata, RetrievalResult
 
 
@@ -17,6 +18,9 @@ class FakeVectorStore:
     def similarity_search(self, query_embedding, top_k: int):
         return self._chunks[:top_k]
 
+    def get_chunks(self, chunk_ids):
+        return [chunk for chunk in self._chunks if chunk.chunk_id in set(chunk_ids)]
+
 
 async def fake_embedder(_: str) -> list[float]:
     return [0.1, 0.2, 0.3]
@@ -38,3 +42,72 @@ def test_safety_flags_high_risk():
     assert not result.safe
     assert result.needs_human
     assert any("انتحار" in reason for reason in result.reasons)
+
+
+@pytest.mark.asyncio
+async def test_retriever_skips_near_duplicates_and_merges_neighbours():
+    def chunk(chunk_id: str, document_id: str, content: str, embedding: list[float]) -> DocumentChunk:
+        meta = DocumentMetadata(document_id=document_id, file_name=f"{document_id}.md", heading_path="النوم")
+        return DocumentChunk(chunk_id=chunk_id, content=content, embedding=embedding, metadata=meta)
+
+    async def embed_query(_: str) -> list[float]:
+        return [1.0, 0.0, 0.0, 0.0]
+
+    words = [f"كلمة{i}" for i in range(14)]
+    routine = chunk("a:1", "a", "روتين ثابت قبل النوم يساعد الطفل.", [0.7, 0.71, 0.0, 0.0])
+    routine_copy = chunk("b:1", "b", "روتين ثابت قبل النوم يساعد الطفل كثيراً.", [0.69, 0.72, 0.05, 0.0])
+    head = chunk("c:1", "c", " ".join(words[:10]), [0.6, 0.0, 0.0, 0.8])
+    tail = chunk("c:2", "c", " ".join(words[6:]), [0.58, 0.0, 0.3, 0.75])
+    screens = chunk("d:1", "d", "خففوا الشاشات مساءً.", [0.3, 0.95, 0.0, 0.0])
+
+    diverse = Retriever(
+        vector_store=FakeVectorStore([routine, routine_copy, head]),
+        embedder=embed_query,
+        settings=Settings(mmr_lambda=0.6),
+    )
+    result = await diverse.retrieve("النوم", top_k=2)
+    assert result.source_chunk_ids == [["a:1"], ["c:1"]]
+    assert result.scores[0] == pytest.approx(0.7, abs=0.01)
+
+    # Overlapping neighbours from one section come back as a single passage.
+    relevance_only = Retriever(
+        vector_store=FakeVectorStore([tail, head, screens]),
+        embedder=embed_query,
+        settings=Settings(mmr_lambda=1.0),
+    )
+    result = await relevance_only.retrieve("النوم", top_k=2)
+    assert result.source_chunk_ids == [["c:1", "c:2"], ["d:1"]]
+    assert result.chunks[0].content == " ".join(words)
+
+
+def test_chat_log_context_is_rehydrated_from_chunk_references():
+    meta = DocumentMetadata(document_id="c", file_name="c.md", heading_path="النوم")
+    words = [f"كلمة{i}" for i in range(14)]
+    head = DocumentChunk(chunk_id="c:1", content=" ".join(words[:10]), embedding=[], metadata=meta)
+    tail = DocumentChunk(chunk_id="c:2", content=" ".join(words[6:]), embedding=[], metadata=meta)
+    refs = [
+        {"chunk_ids": ["c:1", "c:2"], "score": 0.91},
+        {"chunk_ids": ["gone:1"], "score": 0.4},
+        {"chunk_ids": [], "score": None, "text": "نص من سجل قديم"},
+    ]
+
+    merged, deleted, legacy = rehydrate_context(refs, FakeVectorStore([tail, head]))
+
+    assert merged.available and merged.snippet == " ".join(words)
+    assert (merged.file_name, merged.heading_path, merged.score) == ("c.md", "النوم", 0.91)
+    assert not deleted.available and deleted.snippet is None
+    assert not legacy.available and legacy.snippet == "نص من سجل قديم"
+
+
+def test_prompt_gets_full_passages_within_the_token_budget():
+    meta = DocumentMetadata(document_id="doc1", file_name="file.md")
+    long_text = " ".join(f"كلمة{i}" for i in range(200))
+    first = DocumentChunk(chunk_id="doc1:0", content=long_text, embedding=[], metadata=meta)
+    second = DocumentChunk(chunk_id="doc1:1", content="فقرة ثانية طويلة جداً", embedding=[], metadata=meta)
+    third = DocumentChunk(chunk_id="doc1:2", content="لا تصل", embedding=[], metadata=meta)
+    count_words = lambda text: len(text.split())  # noqa: E731
+
+    passages = budget_passages([first, second, third], max_tokens=202, count_tokens=count_words)
+
+    assert len(first.content) > SNIPPET_CHARS
+    assert passages == [long_text, "فقرة ثانية"]
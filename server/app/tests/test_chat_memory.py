@@ -19,6 +19,8 @@ os.environ.setdefault("DATABASE_URL", "sqlite:///./test_memory.db")
 os.environ.setdefault("VECTOR_BACKEND", "chroma")
 
 from app.api import chat as chat_api
+from app.core.openai_client import Completion
+from app.core.ratelimit import ChatRateLimiter, MemoryBuckets
 from app.core.safety import SafetyChecker
 from app.core.settings import Settings
 from app.db import crud
@@ -36,6 +38,9 @@ class StubOpenAIClient:
         last_user = [m for m in messages if m["role"] == "user"][::-1][0]["content"]
         return f"[hist={len(messages)}] {last_user}"
 
+    async def complete(self, messages: list[dict[str, str]]) -> Completion:
+        return Completion(text=await self.chat(messages), total_tokens=0)
+
 
 @pytest.mark.asyncio
 async def test_memory_roundtrip() -> None:
@@ -71,6 +76,7 @@ async def test_memory_roundtrip() -> None:
         settings=Settings(),
         retriever=StubRetriever(),
         openai_client=StubOpenAIClient(),
+        rate_limiter=ChatRateLimiter(Settings(), MemoryBuckets(max_keys=10)),
     )
 
     assert "hist=" in response.reply
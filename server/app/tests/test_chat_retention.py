@@ -0,0 +1,88 @@
+from __future__ import annotations
+
+import gzip
+import json
+import os
+from datetime import date, datetime, timezone
+from uuid import uuid4
+
+import pytest
+from sqlalchemy import create_engine, func, insert, inspect, select, text
+
+from app.core.blobstore import LocalBlobStore
+from app.core.settings import Settings
+from app.db import models, session as db_session
+from app.db.partitions import add_months, apply_retention, ensure_partitions, list_partitions
+
+
+def test_month_arithmetic_crosses_years():
+    assert add_months(date(2025, 11, 1), 3) == date(2026, 2, 1)
+    assert add_months(date(2025, 1, 1), -1) == date(2024, 12, 1)
+
+
+def test_retention_archives_expired_months_then_deletes_them(tmp_path):
+    engine = db_session.build_engine(Settings(DATABASE_URL=f"sqlite:///{tmp_path / 'app.db'}"))
+    db_session.Base.metadata.create_all(engine)
+    index = inspect(engine).get_indexes("chat_turns")
+    assert [entry["column_names"] for entry in index] == [["thread_id", "created_at"]]
+
+    turns = models.ChatTurn.__table__
+    logs = models.ChatLog.__table__
+    stamps = [datetime(2025, 1, 3), datetime(2025, 1, 30), datetime(2025, 9, 2)]
+    with engine.begin() as connection:
+        for position, stamp in enumerate(stamps):
+            turn = dict(id=f"turn-{position}", thread_id="t", role="user", content="مرحبا")
+            connection.execute(insert(turns).values(**turn, created_at=stamp.replace(tzinfo=timezone.utc)))
+            connection.execute(insert(logs).values(id=str(uuid4()), user_message="سؤال", created_at=stamp))
+
+    archived = apply_retention(
+        engine, LocalBlobStore(str(tmp_path / "blobs")), keep_months=6, prefix="archives/chat", today=date(2025, 10, 19)
+    )
+
+    # The cutoff is April 2025: January's rows are archived; the empty months after it are dropped without a file.
+    stored = {(month.table, month.month): month for month in archived if month.rows}
+    assert set(stored) == {("chat_turns", date(2025, 1, 1)), ("chat_logs", date(2025, 1, 1))}
+    archive = tmp_path / "blobs" / stored[("chat_turns", date(2025, 1, 1))].key
+    with gzip.open(archive, "rt", encoding="utf-8") as lines:
+        rows = [json.loads(line) for line in lines]
+    assert [row["id"] for row in rows] == ["turn-0", "turn-1"]
+    assert rows[0]["content"] == "مرحبا"
+
+    with engine.connect() as connection:
+        assert connection.execute(select(turns.c.id)).scalars().all() == ["turn-2"]
+        assert connection.execute(select(func.count()).select_from(logs)).scalar() == 1
+
+
+@pytest.mark.skipif(not os.environ.get("TEST_POSTGRES_URL"), reason="needs TEST_POSTGRES_URL")
+def test_creating_a_month_moves_its_rows_out_of_the_default_partition():
+    engine = create_engine(os.environ["TEST_POSTGRES_URL"], future=True)
+    schema = f"partitions_{uuid4().hex[:8]}"
+    with engine.connect() as connection:
+        try:
+            with connection.begin():
+                connection.execute(text(f"CREATE SCHEMA {schema}"))
+                connection.execute(text(f"SET search_path TO {schema}"))
+                connection.execute(
+                    text(
+                        "CREATE TABLE chat_turns (id varchar(64), thread_id varchar(128), role varchar(16), "
+                        "content text, created_at timestamptz, PRIMARY KEY (id, created_at)) "
+                        "PARTITION BY RANGE (created_at)"
+                    )
+                )
+                connection.execute(text("CREATE TABLE chat_turns_default PARTITION OF chat_turns DEFAULT"))
+                # The process outlived its months: a November row went to the default partition.
+                connection.execute(
+                    text("INSERT INTO chat_turns VALUES ('t1', 'thread', 'user', 'مرحبا', '2025-11-05 10:00:00+00')")
+                )
+
+            with connection.begin():
+                ensure_partitions(connection, months_ahead=1, today=date(2025, 11, 20))
+
+            assert list_partitions(connection, "chat_turns") == [date(2025, 11, 1), date(2025, 12, 1)]
+            assert connection.execute(text("SELECT count(*) FROM chat_turns_p202511")).scalar() == 1
+            assert connection.execute(text("SELECT count(*) FROM chat_turns_default")).scalar() == 0
+            assert connection.execute(text("SELECT count(*) FROM chat_turns")).scalar() == 1
+        finally:
+            connection.rollback()
+            connection.execute(text(f"DROP SCHEMA IF EXISTS {schema} CASCADE"))
+            connection.commit()
@@ -0,0 +1,59 @@
+from __future__ import annotations
+
+import numpy as np
+import pytest
+
+from app.rag.schemas import DocumentChunk, DocumentMetadata
+from app.scripts import corpus_snapshot
+
+
+class ListStore:
+    def __init__(self) -> None:
+        self.chunks: list[DocumentChunk] = []
+
+    def upsert(self, chunks) -> int:
+        self.chunks.extend(chunks)
+        return len(chunks)
+
+
+def make_chunks(count: int, dims: int = 16) -> list[DocumentChunk]:
+    rng = np.random.default_rng(7)
+    return [
+        DocumentChunk(
+            chunk_id=f"doc{i % 3}:{i:04d}",
+            content=f"نص المقطع رقم {i}",
+            embedding=rng.standard_normal(dims).astype(np.float32).tolist(),
+            metadata=DocumentMetadata(document_id=f"doc{i % 3}", file_name=f"doc{i % 3}.md", topic="sleep", heading_path="النوم"),
+        )
+        for i in range(count)
+    ]
+
+
+@pytest.mark.parametrize("dtype, tolerance", [("float32", 0.0), ("float16", 1e-2)])
+def test_snapshot_round_trip(tmp_path, dtype, tolerance):
+    chunks = make_chunks(23)
+    path = tmp_path / "corpus.snap"
+    pages = [chunks[start : start + 5] for start in range(0, len(chunks), 5)]
+
+    manifest = corpus_snapshot.export_snapshot(pages, path, dtype=dtype, embedding_model="m")
+    assert manifest["count"] == 23 and manifest["dimensions"] == 16
+
+    store = ListStore()
+    documents = corpus_snapshot.import_snapshot(path, store, batch_size=4)
+
+    assert [chunk.chunk_id for chunk in store.chunks] == [chunk.chunk_id for chunk in chunks]
+    assert store.chunks[5].content == chunks[5].content
+    assert store.chunks[5].metadata == chunks[5].metadata
+    np.testing.assert_allclose(
+        [chunk.embedding for chunk in store.chunks], [chunk.embedding for chunk in chunks], atol=tolerance
+    )
+    assert {document_id: count for document_id, (_, count) in documents.items()} == {"doc0": 8, "doc1": 8, "doc2": 7}
+
+
+def test_failed_export_leaves_no_partial_file(tmp_path):
+    path = tmp_path / "corpus.snap"
+    pages = [make_chunks(3, dims=16), make_chunks(3, dims=8)]
+
+    with pytest.raises(ValueError, match="Mixed embedding sizes"):
+        corpus_snapshot.export_snapshot(pages, path)
+    assert list(tmp_path.iterdir()) == []
@@ -0,0 +1,142 @@
+from __future__ import annotations
+
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import async_sessionmaker
+from sqlalchemy.orm import Session
+
+from app.core.settings import Settings
+from app.db import (
+    crud,
+    crud_async,
+    models,  # noqa: F401
+    profiles,
+    session as db_session,
+)
+from app.db.profiles import load_household_profile, profile_cache
+
+
+def test_sqlite_engine_uses_wal_and_busy_timeout(tmp_path):
+    engine = db_session.build_engine(
+        Settings(DATABASE_URL=f"sqlite:///{tmp_path / 'app.db'}", sqlite_busy_timeout_ms=1234)
+    )
+    with engine.connect() as connection:
+        assert connection.execute(text("PRAGMA journal_mode")).scalar() == "wal"
+        assert connection.execute(text("PRAGMA synchronous")).scalar() == 1  # NORMAL
+        assert connection.execute(text("PRAGMA busy_timeout")).scalar() == 1234
+
+
+def test_concurrent_sqlite_writers_wait_instead_of_failing(tmp_path):
+    engine = db_session.build_engine(Settings(DATABASE_URL=f"sqlite:///{tmp_path / 'app.db'}", db_pool_size=4))
+    with engine.begin() as connection:
+        connection.execute(text("CREATE TABLE counter (id INTEGER PRIMARY KEY, value TEXT)"))
+    before = db_session.pool_stats.checkouts
+
+    def write(index: int) -> None:
+        for offset in range(20):
+            with engine.begin() as connection:
+                connection.execute(text("INSERT INTO counter (value) VALUES (:value)"), {"value": f"{index}-{offset}"})
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        list(executor.map(write, range(8)))
+
+    with engine.connect() as connection:
+        assert connection.execute(text("SELECT count(*) FROM counter")).scalar() == 160
+    stats = db_session.pool_stats.snapshot(engine.pool)
+    assert stats["checkouts"] - before >= 161
+    assert stats["size"] == 4
+
+
+@pytest.mark.asyncio
+async def test_async_crud_round_trip_on_sqlite(tmp_path):
+    settings = Settings(DATABASE_URL=f"sqlite:///{tmp_path / 'app.db'}")
+    async_engine = db_session.build_async_engine(settings)
+    try:
+        async with async_engine.begin() as connection:
+            assert (await connection.execute(text("PRAGMA journal_mode"))).scalar() == "wal"
+            await connection.run_sync(db_session.Base.metadata.create_all)
+        factory = async_sessionmaker(async_engine, expire_on_commit=False)
+
+        async with factory() as session:
+            household = await crud_async.upsert_household(session, name="Test", country="JO", language_preference="ar")
+            await crud_async.upsert_child(session, household_id=household.id, name="Lina", age=6, favorite_topics=None)
+            await crud_async.log_turn(session, "thread-1", "user", "مرحبا")
+            await session.commit()
+
+        async with factory() as session:
+            loaded = await crud_async.get_household(session, household.id, with_children=True)
+            history = await crud_async.fetch_history(session, "thread-1")
+        # Children were loaded eagerly, so reading them after the session closed issues no lazy load.
+        assert [child.name for child in loaded.children] == ["Lina"]
+        assert history == [{"role": "user", "content": "مرحبا"}]
+    finally:
+        await async_engine.dispose()
+
+
+def test_profile_cache_drops_households_on_child_upsert_commit(tmp_path):
+    engine = db_session.build_engine(Settings(DATABASE_URL=f"sqlite:///{tmp_path / 'app.db'}"))
+    db_session.Base.metadata.create_all(engine)
+    with Session(engine) as session:
+        household = crud.upsert_household(session, name="Test", country="JO", language_preference="ar")
+        crud.upsert_child(session, household_id=household.id, name="Lina", age=6, favorite_topics=None)
+        session.commit()
+        household_id = household.id
+
+    profile_cache.clear()
+    with Session(engine) as session:
+        generation = profile_cache.generation
+        profile_cache.put(load_household_profile(session, household_id), generation=generation)
+    assert [child.name for child in profile_cache.get(household_id).children] == ["Lina"]
+
+    with Session(engine) as session:
+        crud.upsert_child(session, household_id=household_id, name="Omar", age=3, favorite_topics=None)
+        assert profile_cache.get(household_id) is None
+        # A reader that loaded before the write commits must not put its stale copy back.
+        profile_cache.put(load_household_profile(session, household_id), generation=generation)
+        assert profile_cache.get(household_id) is None
+        # A read between the flush and the commit still sees only Lina; the commit drops it again.
+        with Session(engine) as reader:
+            profile_cache.put(load_household_profile(reader, household_id), generation=profile_cache.generation)
+        assert profile_cache.get(household_id) is not None
+        session.commit()
+
+    assert profile_cache.get(household_id) is None
+    with Session(engine) as session:
+        profile_cache.put(load_household_profile(session, household_id), generation=profile_cache.generation)
+    assert sorted(child.name for child in profile_cache.get(household_id).children) == ["Lina", "Omar"]
+
+
+@pytest.mark.asyncio
+async def test_unknown_household_ids_are_cached_as_misses(monkeypatch):
+    loads: list[str] = []
+
+    class FakeSession:
+        async def run_sync(self, load, household_id):
+            loads.append(household_id)
+            return None
+
+    @asynccontextmanager
+    async def fake_scope():
+        yield FakeSession()
+
+    monkeypatch.setattr(profiles, "async_session_scope", fake_scope)
+    profile_cache.clear()
+
+    assert await profiles.get_household_profile("made-up") is None
+    assert await profiles.get_household_profile("made-up") is None
+    assert loads == ["made-up"]
+
+    profile_cache.invalidate("made-up")  # e.g. a household created with that id
+    assert await profiles.get_household_profile("made-up") is None
+    assert loads == ["made-up", "made-up"]
+
+
+def test_pool_stats_do_not_build_engines(monkeypatch):
+    monkeypatch.setattr(db_session, "_engines", {})
+
+    assert db_session.get_pool_stats() == {"sync": {}, "async": {}}
+    assert "family_ai_db_pool" not in db_session.REGISTRY.render()
+    assert db_session._engines == {}
@@ -0,0 +1,68 @@
+from __future__ import annotations
+
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import create_engine, func, select, update
+from sqlalchemy.orm import sessionmaker
+
+from app.core.embedding_store import EmbeddingStore, text_hash
+from app.core.openai_client import OpenAIClient
+from app.core.settings import Settings
+from app.db import crud, models
+
+
+@pytest.fixture()
+def session_factory(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'cache.db'}", future=True)
+    models.EmbeddingCacheEntry.__table__.create(engine)
+    return sessionmaker(bind=engine, future=True)
+
+
+@pytest.mark.asyncio
+async def test_embed_texts_only_sends_unseen_text(session_factory, monkeypatch):
+    settings = Settings(openai_api_key="sk-test")
+    client = OpenAIClient(settings, embedding_store=EmbeddingStore(session_factory=session_factory, settings=settings))
+    sent: list[list[str]] = []
+
+    def fake_embed(texts):
+        sent.append(list(texts))
+        return [[float(len(text)), 0.5] for text in texts]
+
+    monkeypatch.setattr(client, "_embed_sync", fake_embed)
+
+    first = await client.embed_texts(["النوم المبكر", "الشاشات", "النوم المبكر"])
+    assert sent == [["النوم المبكر", "الشاشات"]]
+    assert first[0] == first[2]
+
+    # Whitespace differences normalize to the same key; only the new text goes out.
+    second = await client.embed_texts(["  النوم   المبكر\n", "الغذاء"])
+    assert sent[1:] == [["الغذاء"]]
+    assert second[0] == first[0]
+
+
+def test_eviction_drops_least_recently_used(session_factory):
+    vector = bytes(4096)
+    with session_factory() as session:
+        crud.put_cached_embeddings(
+            session, model="m", dimensions=0, vectors={f"h{i}": vector for i in range(10)}
+        )
+        base = datetime.utcnow() - timedelta(days=1)
+        for i in range(10):
+            session.execute(
+                update(models.EmbeddingCacheEntry)
+                .where(models.EmbeddingCacheEntry.text_hash == f"h{i}")
+                .values(last_used_at=base + timedelta(minutes=i))
+            )
+        removed = crud.evict_cached_embeddings(session, max_bytes=4096 * 5)
+        remaining = session.scalars(select(models.EmbeddingCacheEntry.text_hash)).all()
+        total = session.scalar(select(func.sum(models.EmbeddingCacheEntry.nbytes)))
+
+    assert removed == 6
+    assert sorted(remaining) == ["h6", "h7", "h8", "h9"]
+    assert total <= 4096 * 5
+
+
+def test_text_hash_ignores_whitespace_and_unicode_form():
+    assert text_hash("نوم  الطفل") == text_hash("نوم الطفل\n")
+    assert text_hash("café") == text_hash("café")
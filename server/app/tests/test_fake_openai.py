@@ -0,0 +1,58 @@
+from __future__ import annotations
+
+import pytest
+from fastapi.testclient import TestClient
+from openai import OpenAI
+
+from app.bench.chat_load import histogram_quantile, stage_percentiles
+from app.bench.fake_openai import FakeOpenAIConfig, create_app
+from app.core.metrics import Histogram, Registry
+from app.core.openai_client import OpenAIClient
+from app.core.settings import Settings
+
+
+def _sdk(config: FakeOpenAIConfig) -> OpenAI:
+    # TestClient is an httpx.Client, so the SDK talks to the fake app in-process.
+    return OpenAI(api_key="sk-fake", base_url="http://testserver/v1", http_client=TestClient(create_app(config)))
+
+
+@pytest.mark.asyncio
+async def test_openai_client_talks_to_the_fake_server():
+    settings = Settings(
+        openai_api_key="sk-fake",
+        OPENAI_BASE_URL="http://testserver/v1",
+        EMBEDDING_CACHE_ENABLED=False,
+        embedding_dimensions=16,
+    )
+    client = OpenAIClient(settings)
+    assert str(client._client.base_url) == "http://testserver/v1/"
+    client._client = _sdk(FakeOpenAIConfig(reply_words=5))
+
+    first, second, again = await client.embed_texts(["النوم", "الغضب", "النوم"])
+    reply = await client.chat([{"role": "user", "content": "كيف أساعد طفلي على النوم؟"}])
+
+    assert len(first) == 16 and first == again and first != second
+    assert len(reply.split()) == 5
+
+
+def test_fake_server_streams_chat_chunks():
+    stream = _sdk(FakeOpenAIConfig(reply_words=4)).chat.completions.create(
+        model="gpt-4o-mini", messages=[{"role": "user", "content": "مرحبا"}], stream=True
+    )
+    words = "".join(chunk.choices[0].delta.content or "" for chunk in stream if chunk.choices).split()
+    assert len(words) == 4
+
+
+def test_stage_percentiles_use_only_the_measured_window():
+    registry = Registry()
+    stages = registry.register(Histogram("family_ai_chat_stage_seconds", "Stages", ["stage"], buckets=(0.1, 0.2, 0.4)))
+    stages.observe(5.0, "completion")
+    before = registry.render()
+    for seconds in (0.15, 0.15, 0.15, 0.3):
+        stages.observe(seconds, "completion")
+
+    report = stage_percentiles(before, registry.render())
+
+    assert report["completion"]["count"] == 4
+    assert report["completion"]["p50_ms"] == pytest.approx(166.7, abs=0.1)
+    assert histogram_quantile(0.99, {0.1: 0.0, float("inf"): 2.0}) == 0.1
@@ -0,0 +1,129 @@
+from __future__ import annotations
+
+import asyncio
+import threading
+
+import pytest
+from fastapi import HTTPException
+from fastapi.testclient import TestClient
+from openai import OpenAI
+
+from app.bench.fake_openai import FakeOpenAIConfig, create_app
+from app.core import governor
+from app.core.governor import AIMDLimiter, CircuitBreaker, Governor, UpstreamUnavailable
+from app.core.openai_client import OpenAIClient
+from app.core.settings import Settings
+
+
+@pytest.fixture(autouse=True)
+def fresh_governors():
+    governor.reset_governors()
+    yield
+    governor.reset_governors()
+
+
+@pytest.mark.asyncio
+async def test_limiter_grows_additively_and_halves_on_overload():
+    limiter = AIMDLimiter(initial=4, max_limit=8, latency_target=1.0, cooldown=0.0, queue_timeout=0.05)
+    for _ in range(4):
+        await limiter.acquire()
+    assert limiter.in_flight == 4
+
+    with pytest.raises(UpstreamUnavailable):
+        await limiter.acquire()  # over the limit: waits, then gives up
+    waiter = asyncio.create_task(limiter.acquire())
+    await asyncio.sleep(0)
+    assert limiter.queued == 1
+
+    limiter.release(0.1, "ok")
+    await waiter  # the freed slot went to the queued caller
+    assert limiter.limit == pytest.approx(4.25)
+    limiter.release(0.1, "overload")
+    assert limiter.limit == pytest.approx(2.125)
+    limiter.release(5.0, "ok")  # slower than the target
+    assert limiter.limit == pytest.approx(1.9125)
+    assert limiter.in_flight == 2
+
+
+def test_breaker_opens_fails_fast_and_closes_after_a_good_trial(monkeypatch):
+    clock = [100.0]
+    monkeypatch.setattr(governor.time, "monotonic", lambda: clock[0])
+    breaker = CircuitBreaker(failure_threshold=2, open_seconds=30.0)
+    breaker.record(failed=True)
+    breaker.record(failed=True)
+    assert breaker.state == "open"
+    with pytest.raises(UpstreamUnavailable) as rejected:
+        breaker.before_call()
+    assert rejected.value.retry_after == pytest.approx(30.0)
+
+    clock[0] += 31
+    breaker.before_call()  # the half-open trial
+    with pytest.raises(UpstreamUnavailable):
+        breaker.before_call()  # only one trial at a time
+    breaker.record(failed=False)
+    assert breaker.state == "closed" and breaker.opened == 1
+
+
+@pytest.mark.asyncio
+async def test_neutral_and_cancelled_calls_leave_the_breaker_and_the_slot_alone():
+    limiter = AIMDLimiter(initial=1, max_limit=1, latency_target=1.0, queue_timeout=0.05)
+    breaker = CircuitBreaker(failure_threshold=2, open_seconds=0.01)
+    gov = Governor(limiter, breaker, lambda exc: "overload" if isinstance(exc, TimeoutError) else "neutral")
+
+    def bad_request() -> None:
+        raise ValueError("400: bad request")
+
+    breaker.record(failed=True)
+    with pytest.raises(ValueError):
+        await gov.run(bad_request)
+    assert breaker.failures == 1  # a 400 does not reset the streak
+    breaker.record(failed=True)
+    await asyncio.sleep(0.02)
+    with pytest.raises(ValueError):
+        await gov.run(bad_request)  # the half-open trial got no real answer
+    assert breaker.state == "half_open"
+
+    upstream = threading.Event()
+    call = asyncio.create_task(gov.run(upstream.wait))
+    try:
+        await asyncio.sleep(0.01)
+        call.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await call
+        assert limiter.in_flight == 1  # the worker thread is still calling upstream
+        with pytest.raises(UpstreamUnavailable):
+            await gov.run(bad_request)  # neither the slot nor the trial was handed on
+    finally:
+        upstream.set()
+    for _ in range(100):
+        if limiter.in_flight == 0:
+            break
+        await asyncio.sleep(0.01)
+    assert limiter.in_flight == 0
+    assert breaker.state == "closed"  # the late answer was a real success
+
+
+@pytest.mark.asyncio
+async def test_client_returns_503_once_upstream_keeps_failing():
+    settings = Settings(
+        openai_api_key="sk-fake",
+        EMBEDDING_CACHE_ENABLED=False,
+        openai_breaker_failures=2,
+        openai_max_attempts=3,
+        openai_retry_max_wait=0.01,
+    )
+    client = OpenAIClient(settings)
+    fake = create_app(FakeOpenAIConfig(error_rate=1.0))
+    client._client = OpenAI(api_key="sk-fake", base_url="http://testserver/v1", http_client=TestClient(fake), max_retries=0)
+
+    with pytest.raises(HTTPException) as failed:
+        await client.chat([{"role": "user", "content": "مرحبا"}])
+    assert failed.value.status_code == 502
+    assert fake.state.requests["chat"] == 2  # the retry stopped once the breaker opened
+
+    with pytest.raises(HTTPException) as rejected:
+        await client.chat([{"role": "user", "content": "مرحبا"}])
+    assert rejected.value.status_code == 503
+    assert int(rejected.value.headers["Retry-After"]) >= 1
+    assert fake.state.requests["chat"] == 2
+    assert governor.governor_snapshots()["chat"]["state"] == "open"
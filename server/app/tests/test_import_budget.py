@@ -0,0 +1,13 @@
+from __future__ import annotations
+
+from app.scripts.import_report import measure, package_totals, total_ms
+
+
+def test_api_import_skips_unused_backends_and_drivers():
+    timings = measure("app.main", runs=1, env={"VECTOR_BACKEND": "pgvector", "BLOB_BACKEND": "s3"})
+    packages = package_totals(timings)
+
+    assert total_ms(timings, "app.main") > 0
+    # Vector-store clients, database drivers and the S3 SDK load when first used, not at import.
+    for unused in ("chromadb", "psycopg", "aiosqlite", "boto3"):
+        assert unused not in packages
@@ -0,0 +1,320 @@
+from __future__ import annotations
+
+import threading
+from contextlib import asynccontextmanager
+
+import pytest
+
+from sqlalchemy import create_engine, select
+from sqlalchemy.ext.asyncio import async_sessionmaker
+from sqlalchemy.orm import sessionmaker
+
+from app.core.settings import Settings
+from app.api import upload
+from app.db import crud, models
+from app.db import session as db_session
+from app.rag import chunking, ingest
+
+
+class MemoryVectorStore:
+    def __init__(self) -> None:
+        self.chunks: dict[str, object] = {}
+
+    def list_chunk_ids(self, document_id: str) -> list[str]:
+        return [chunk_id for chunk_id in self.chunks if chunk_id.startswith(f"{document_id}:")]
+
+    def upsert(self, chunks) -> int:
+        for chunk in chunks:
+            self.chunks[chunk.chunk_id] = chunk
+        return len(chunks)
+
+    def delete(self, chunk_ids) -> None:
+        for chunk_id in chunk_ids:
+            self.chunks.pop(chunk_id, None)
+
+    def get_chunks(self, chunk_ids):
+        return [self.chunks[chunk_id] for chunk_id in chunk_ids if chunk_id in self.chunks]
+
+
+class CountingEmbedder:
+    def __init__(self) -> None:
+        self.embedded: list[str] = []
+
+    async def embed_texts(self, texts):
+        self.embedded.extend(texts)
+        return [[0.1, 0.2, 0.3] for _ in texts]
+
+
+class NullSession:
+    def get(self, *args, **kwargs):
+        return None
+
+    def commit(self) -> None:
+        pass
+
+    def close(self) -> None:
+        pass
+
+
+def count_words(text: str) -> int:
+    return len(text.split())
+
+
+@pytest.fixture(autouse=True)
+def word_token_counter(monkeypatch):
+    # Counting words keeps the chunker deterministic without downloading tiktoken encodings.
+    monkeypatch.setattr(ingest, "token_counter", lambda model: count_words)
+
+
+@pytest.mark.asyncio
+async def test_reingest_only_embeds_changed_chunks(monkeypatch):
+    store = MemoryVectorStore()
+    monkeypatch.setattr(ingest, "build_vector_store", lambda **_: store)
+    monkeypatch.setattr(ingest.crud, "upsert_document_registry", lambda *args, **kwargs: None)
+    monkeypatch.setattr(ingest, "build_duplicate_index", lambda **_: None)
+    client = CountingEmbedder()
+    paragraphs = [" ".join(f"كلمة{p}_{i}" for i in range(220)) for p in range(3)]
+
+    async def run(text: str):
+        return await ingest.ingest_text(
+            text=text,
+            file_name="sleep.md",
+            metadata_overrides={"topic": "sleep"},
+            session_factory=NullSession,
+            settings=Settings(),
+            openai_client=client,
+        )
+
+    first = await run("\n\n".join(paragraphs))
+    assert first.document_id == ingest.document_id_for("sleep.md")
+    assert first.extras["embedded_chunks"] == first.stored_chunks
+
+    client.embedded.clear()
+    again = await run("\n\n".join(paragraphs))
+    assert again.document_id == first.document_id
+    assert client.embedded == []
+    assert again.extras["unchanged_chunks"] == first.stored_chunks
+
+    edited = await run("\n\n".join(paragraphs[:2]))
+    assert edited.extras["deleted_chunks"] == 1
+    assert edited.extras["embedded_chunks"] == 0
+    assert set(store.chunks) == set(store.list_chunk_ids(first.document_id))
+    assert len(store.chunks) == edited.stored_chunks
+
+
+@pytest.mark.asyncio
+async def test_reingest_with_new_metadata_restores_every_chunk(monkeypatch, tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'registry.db'}", future=True)
+    models.DocumentRegistry.__table__.create(engine)
+    store = MemoryVectorStore()
+    monkeypatch.setattr(ingest, "build_vector_store", lambda **_: store)
+    client = CountingEmbedder()
+    text = "\n\n".join(" ".join(f"كلمة{p}_{i}" for i in range(220)) for p in range(2))
+
+    async def run(topic: str):
+        return await ingest.ingest_text(
+            text=text,
+            file_name="sleep.md",
+            metadata_overrides={"topic": topic},
+            session_factory=sessionmaker(bind=engine, future=True),
+            settings=Settings(DEDUP_ENABLED=False),
+            openai_client=client,
+        )
+
+    first = await run("sleep")
+    retagged = await run("bedtime")
+    assert retagged.extras["embedded_chunks"] == first.stored_chunks
+    assert {chunk.metadata.topic for chunk in store.chunks.values()} == {"bedtime"}
+    assert (await run("bedtime")).extras["embedded_chunks"] == 0
+
+
+def test_streamed_chunks_match_whole_text(tmp_path):
+    settings = Settings()
+    text = "# النوم\n\n" + "\n\n".join(" ".join(f"كلمة{p}_{i}" for i in range(150)) + "." for p in range(8))
+    path = tmp_path / "doc.md"
+    path.write_text(text, encoding="utf-8")
+
+    # A tiny block size splits lines, words and multi-byte Arabic characters across reads.
+    streamed = [chunk.text for chunk in ingest.iter_chunks(ingest.iter_file_text(path, block_size=7), settings)]
+
+    assert streamed == ingest.chunk_text(text, settings)
+    assert all(count_words(chunk) <= settings.chunk_max_tokens for chunk in streamed)
+    assert streamed[-1].split()[-1] == "كلمة7_149."
+
+
+def test_chunker_respects_structure_and_overlaps_only_mid_sentence():
+    text = "\n".join(
+        [
+            "# الروتين",
+            "## المساء",
+            "اقرأ قصة قصيرة. أطفئ الشاشات قبل النوم بساعة؟ تحدث مع طفلك عن يومه.",
+            "",
+            "- حمّام دافئ",
+            "- تنظيف الأسنان",
+            "# الشاشات",
+            " ".join(["كلمة"] * 25),
+        ]
+    )
+    chunks = list(chunking.chunk_markdown(chunking.iter_lines([text]), max_tokens=10, overlap_tokens=3, count_tokens=count_words))
+
+    assert chunks[0].heading_path == "الروتين > المساء"
+    assert chunks[0].text == "اقرأ قصة قصيرة. أطفئ الشاشات قبل النوم بساعة؟"
+    assert chunks[1].text == "تحدث مع طفلك عن يومه.\n- حمّام دافئ"
+    assert chunks[2].text == "- تنظيف الأسنان"
+    tail = [chunk for chunk in chunks if chunk.heading_path == "الشاشات"]
+    assert [count_words(chunk.text) for chunk in tail] == [10, 10, 10, 4]
+    # Hard splits inside a sentence repeat the last few words of the previous chunk.
+    assert sum(count_words(chunk.text) for chunk in tail) == 25 + 3 * 3
+
+
+def test_single_line_uploads_are_buffered_in_bounded_pieces():
+    text = " ".join(f"كلمة{i}" for i in range(20_000))
+    pieces = (text[start : start + 7] for start in range(0, len(text), 7))
+
+    lines = list(chunking.iter_lines(pieces, max_line_chars=1000))
+    assert "".join(lines) == text
+    assert max(len(line) for line in lines) <= 1000
+
+    blocks = list(chunking.iter_blocks(lines, max_chars=3000))
+    assert max(len(block) for _, block, _ in blocks) <= 3000 + 1000
+    assert [more for _, _, more in blocks][-1] is False
+    chunks = list(chunking.chunk_markdown(iter(lines), max_tokens=50, overlap_tokens=5, count_tokens=count_words))
+    assert all(count_words(chunk.text) <= 50 for chunk in chunks)
+    assert chunks[-1].text.split()[-1] == "كلمة19999"
+
+
+@pytest.mark.asyncio
+async def test_near_duplicate_chunks_link_to_canonical(monkeypatch, tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'dedup.db'}", future=True)
+    for model in (models.DocumentRegistry, models.ChunkSignature, models.ChunkLshBucket, models.ChunkDuplicate):
+        model.__table__.create(engine)
+    session_factory = sessionmaker(bind=engine, future=True)
+    store = MemoryVectorStore()
+    monkeypatch.setattr(ingest, "build_vector_store", lambda **_: store)
+    client = CountingEmbedder()
+    shared = " ".join(f"نصيحة{i}" for i in range(60))
+    # Same advice with diacritics, tatweel and one changed word: still a near-duplicate.
+    variant = shared.replace("نصيحة5 ", "نصيـــحةٌ5 ").replace("نصيحة30", "فكرة")
+    other = " ".join(f"موضوع{i}" for i in range(60))
+
+    async def run(file_name: str, *paragraphs: str):
+        return await ingest.ingest_text(
+            text="\n\n".join(paragraphs),
+            file_name=file_name,
+            metadata_overrides=None,
+            session_factory=session_factory,
+            settings=Settings(chunk_max_tokens=60),
+            openai_client=client,
+        )
+
+    first = await run("a.md", shared, " ".join(f"كلمة{i}" for i in range(60)))
+    second = await run("b.md", variant, other)
+    assert second.extras["duplicate_chunks"] == 1
+    assert second.stored_chunks == 1
+    assert client.embedded[-1] == other
+    assert len(store.list_chunk_ids(second.document_id)) == 1
+
+    again = await run("b.md", variant, other)
+    assert again.extras["duplicate_chunks"] == 1 and again.extras["embedded_chunks"] == 0
+
+    with session_factory() as session:
+        links = session.scalars(select(models.ChunkDuplicate)).all()
+    assert [(link.document_id, link.canonical_document_id) for link in links] == [(second.document_id, first.document_id)]
+    assert links[0].similarity >= 0.8
+
+    # Editing a paragraph is not a duplicate of its own previous version.
+    edited = await run("a.md", variant, " ".join(f"كلمة{i}" for i in range(60)))
+    assert edited.extras["duplicate_chunks"] == 0 and edited.extras["embedded_chunks"] == 1
+    with session_factory() as session:
+        assert session.scalars(select(models.ChunkDuplicate)).all() == []
+
+
+@pytest.mark.asyncio
+async def test_deleting_a_canonical_promotes_its_duplicate(monkeypatch, tmp_path):
+    settings = Settings(DATABASE_URL=f"sqlite:///{tmp_path / 'app.db'}", VECTOR_BACKEND="chroma", chunk_max_tokens=60)
+    engine = db_session.build_engine(settings)
+    db_session.Base.metadata.create_all(engine)
+    session_factory = sessionmaker(bind=engine, future=True)
+    async_factory = async_sessionmaker(db_session.build_async_engine(settings), expire_on_commit=False)
+
+    @asynccontextmanager
+    async def async_scope():
+        async with async_factory() as session, session.begin():
+            yield session
+
+    store = MemoryVectorStore()
+    client = CountingEmbedder()
+    monkeypatch.setattr(ingest, "build_vector_store", lambda **_: store)
+    monkeypatch.setattr(upload, "build_vector_store", lambda **_: store)
+    monkeypatch.setattr(upload, "SessionLocal", session_factory)
+    monkeypatch.setattr(upload, "async_session_scope", async_scope)
+    monkeypatch.setattr(upload, "OpenAIClient", lambda settings: client)
+    shared = " ".join(f"نصيحة{i}" for i in range(60))
+
+    async def run(file_name: str, *paragraphs: str):
+        return await ingest.ingest_text(
+            text="\n\n".join(paragraphs),
+            file_name=file_name,
+            metadata_overrides={"topic": file_name.removesuffix(".md")},
+            session_factory=session_factory,
+            settings=settings,
+            openai_client=client,
+        )
+
+    first = await run("a.md", shared)
+    second = await run("b.md", shared, " ".join(f"موضوع{i}" for i in range(60)))
+    assert second.extras["duplicate_chunks"] == 1
+
+    await upload.delete_document(first.document_id, admin=None, settings=settings)
+
+    kept = [chunk for chunk in store.chunks.values() if chunk.content == shared]
+    assert [chunk.metadata.document_id for chunk in kept] == [second.document_id]
+    assert kept[0].metadata.topic == "b" and kept[0].embedding
+    assert len(store.list_chunk_ids(second.document_id)) == 2
+    with session_factory() as session:
+        assert session.scalars(select(models.ChunkDuplicate)).all() == []
+        assert crud.get_document_registry(session, second.document_id).chunk_count == 2
+        assert kept[0].chunk_id in crud.get_chunk_signatures(session, [kept[0].chunk_id])
+
+    # B's next re-ingest sees the promoted chunk as already stored.
+    assert (await run("b.md", shared, " ".join(f"موضوع{i}" for i in range(60)))).extras["embedded_chunks"] == 0
+
+
+@pytest.mark.asyncio
+async def test_uploads_are_spooled_and_chunked_off_the_event_loop(monkeypatch, tmp_path):
+    store = MemoryVectorStore()
+    monkeypatch.setattr(ingest, "build_vector_store", lambda **_: store)
+    monkeypatch.setattr(ingest.crud, "upsert_document_registry", lambda *args, **kwargs: None)
+    monkeypatch.setattr(ingest, "build_duplicate_index", lambda **_: None)
+    counted_on: set[threading.Thread] = set()
+
+    def counting_thread(text: str) -> int:
+        counted_on.add(threading.current_thread())
+        return count_words(text)
+
+    monkeypatch.setattr(ingest, "token_counter", lambda model: counting_thread)
+    text = "\n\n".join(" ".join(f"كلمة{p}_{i}" for i in range(220)) for p in range(3)).encode("utf-8")
+
+    class Upload:
+        def __init__(self) -> None:
+            self.offset = 0
+
+        async def read(self, size: int) -> bytes:
+            block = text[self.offset : self.offset + size]
+            self.offset += len(block)
+            return block
+
+    settings = Settings(INGEST_SPOOL_DIR=str(tmp_path), embedding_batch_size=2)
+    spool = await ingest.spool_upload(file=Upload(), settings=settings)
+    assert spool.read_bytes() == text
+
+    result = await ingest.ingest_file(
+        path=spool,
+        file_name="sleep.md",
+        overrides={},
+        session_factory=NullSession,
+        settings=settings,
+        openai_client=CountingEmbedder(),
+    )
+    assert result.stored_chunks == len(store.chunks) > 2
+    assert counted_on and threading.current_thread() not in counted_on
@@ -0,0 +1,147 @@
+from __future__ import annotations
+
+import asyncio
+import time
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.core.settings import Settings
+from app.db import crud, models
+from app.rag import jobs
+from app.rag.jobs import IngestJobNotRetryable, IngestJobQueue, IngestQueueFull
+
+
+@pytest.fixture
+def job_rows(monkeypatch):
+    rows: list[str] = []
+
+    @contextmanager
+    def null_scope():
+        yield None
+
+    def create_ingest_job(session, **fields):
+        time.sleep(0.05)  # a slow insert, so both submissions are mid-await together
+        rows.append(fields["spool_path"])
+        return SimpleNamespace(id=f"job-{len(rows)}")
+
+    monkeypatch.setattr(jobs, "session_scope", null_scope)
+    monkeypatch.setattr(jobs.crud, "create_ingest_job", create_ingest_job)
+    return rows
+
+
+@pytest.mark.asyncio
+async def test_concurrent_submissions_cannot_overfill_the_queue(job_rows, tmp_path):
+    queue = IngestJobQueue(settings=Settings(ingest_queue_size=1), session_factory=None)
+    spools = [tmp_path / f"{index}.upload" for index in range(2)]
+    for spool in spools:
+        spool.write_bytes(b"# doc")
+
+    results = await asyncio.gather(
+        *(queue.submit(file_name="a.md", spool_path=spool, overrides={}) for spool in spools),
+        return_exceptions=True,
+    )
+
+    assert results[0] == "job-1"
+    assert isinstance(results[1], IngestQueueFull)
+    assert job_rows == [str(spools[0])]  # no orphan row for the refused upload
+    assert spools[0].exists() and not spools[1].exists()
+
+
+@pytest.fixture
+def job_db(monkeypatch, tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'jobs.db'}", future=True)
+    models.IngestJob.__table__.create(engine)
+    session_factory = sessionmaker(bind=engine, future=True)
+
+    @contextmanager
+    def scope():
+        with session_factory() as session, session.begin():
+            yield session
+
+    async def archive_original(**kwargs):
+        return False
+
+    monkeypatch.setattr(jobs, "session_scope", scope)
+    monkeypatch.setattr(jobs, "archive_original", archive_original)
+    monkeypatch.setattr(jobs, "OpenAIClient", lambda settings: None)
+    monkeypatch.setattr(jobs, "_POLL_SECONDS", 0.05)
+    return SimpleNamespace(scope=scope, session_factory=session_factory)
+
+
+async def wait_for_status(scope, job_id: str, status: str) -> None:
+    for _ in range(200):
+        with scope() as session:
+            if crud.get_ingest_job(session, job_id).status == status:
+                return
+        await asyncio.sleep(0.02)
+    raise AssertionError(f"job {job_id} never reached {status}")
+
+
+@pytest.mark.asyncio
+async def test_failed_job_keeps_its_upload_and_can_be_retried(monkeypatch, job_db, tmp_path):
+    scope = job_db.scope
+
+    attempts: list[str] = []
+
+    async def ingest_file(*, path, **kwargs):
+        attempts.append(path.read_text())
+        if len(attempts) == 1:
+            raise RuntimeError("embeddings timed out")
+        return SimpleNamespace(document_id="doc-1")
+
+    monkeypatch.setattr(jobs, "ingest_file", ingest_file)
+    queue = IngestJobQueue(settings=Settings(ingest_workers=1), session_factory=job_db.session_factory)
+    spool = tmp_path / "a.upload"
+    spool.write_text("# doc")
+    await queue.start()
+    try:
+        job_id = await queue.submit(file_name="a.md", spool_path=spool, overrides={})
+        await wait_for_status(scope, job_id, "failed")
+        assert spool.exists()
+
+        await queue.retry(job_id)
+        await wait_for_status(scope, job_id, "succeeded")
+        with pytest.raises(IngestJobNotRetryable):
+            await queue.retry(job_id)
+    finally:
+        await queue.stop()
+    assert attempts == ["# doc", "# doc"]
+    assert not spool.exists()  # removed once the retry succeeded
+
+
+@pytest.mark.asyncio
+async def test_processes_share_the_backlog_and_run_each_job_once(monkeypatch, job_db, tmp_path):
+    runs: list[str] = []
+
+    async def ingest_file(*, path, **kwargs):
+        runs.append(path.name)
+        await asyncio.sleep(0.01)
+        return SimpleNamespace(document_id=path.stem)
+
+    monkeypatch.setattr(jobs, "ingest_file", ingest_file)
+    # More unfinished jobs than one queue holds, as after a restart with a long backlog.
+    job_ids = []
+    with job_db.scope() as session:
+        for index in range(5):
+            spool = tmp_path / f"{index}.upload"
+            spool.write_text("# doc")
+            job_ids.append(crud.create_ingest_job(session, file_name="a.md", spool_path=str(spool), overrides={}).id)
+        # Its process died mid-job an hour ago.
+        crud.update_ingest_job(session, job_ids[0], status="running", updated_at=datetime.utcnow() - timedelta(hours=1))
+
+    settings = Settings(ingest_workers=1, ingest_queue_size=1)
+    processes = [IngestJobQueue(settings=settings, session_factory=job_db.session_factory) for _ in range(2)]
+    for process in processes:
+        await process.start()
+    try:
+        for job_id in job_ids:
+            await wait_for_status(job_db.scope, job_id, "succeeded")
+    finally:
+        for process in processes:
+            await process.stop()
+    assert sorted(runs) == [f"{index}.upload" for index in range(5)]
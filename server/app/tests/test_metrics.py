@@ -0,0 +1,47 @@
+from __future__ import annotations
+
+import pytest
+
+from app.core.metrics import VECTOR_QUERY_SECONDS, Counter, Histogram, Registry
+from app.core.settings import Settings
+from app.rag.retriever import Retriever
+from app.rag.schemas import DocumentChunk, DocumentMetadata
+
+
+def test_registry_renders_prometheus_text():
+    registry = Registry()
+    latency = registry.register(Histogram("demo_seconds", "Demo latency", ["stage"], buckets=(0.1, 1.0)))
+    errors = registry.register(Counter("demo_errors", "Demo errors", ["kind"]))
+    latency.observe(0.05, "embed")
+    latency.observe(0.5, "embed")
+    latency.observe(3.0, "embed")
+    errors.inc('say "hi"')
+    registry.collector(lambda: [("demo_pool_size", "gauge", "Pool size", [("demo_pool_size", {}, 5)])])
+
+    lines = registry.render().splitlines()
+
+    assert "# TYPE demo_seconds histogram" in lines
+    assert 'demo_seconds_bucket{stage="embed",le="0.1"} 1' in lines
+    assert 'demo_seconds_bucket{stage="embed",le="1"} 2' in lines
+    assert 'demo_seconds_bucket{stage="embed",le="+Inf"} 3' in lines
+    assert 'demo_seconds_sum{stage="embed"} 3.55' in lines
+    assert 'demo_seconds_count{stage="embed"} 3' in lines
+    assert 'demo_errors_total{kind="say \\"hi\\""} 1' in lines
+    assert "demo_pool_size 5" in lines
+
+
+class _Store:
+    def similarity_search(self, query_embedding, top_k: int):
+        meta = DocumentMetadata(document_id="doc", file_name="doc.md")
+        return [DocumentChunk(chunk_id="doc:0", content="روتين النوم", embedding=[1.0, 0.0], metadata=meta)]
+
+
+@pytest.mark.asyncio
+async def test_retriever_times_vector_queries_by_backend():
+    async def embed(_: str) -> list[float]:
+        return [1.0, 0.0]
+
+    before = VECTOR_QUERY_SECONDS.count("chroma")
+    retriever = Retriever(vector_store=_Store(), embedder=embed, settings=Settings(VECTOR_BACKEND="chroma"))
+    await retriever.retrieve("النوم", top_k=1)
+    assert VECTOR_QUERY_SECONDS.count("chroma") == before + 1
@@ -0,0 +1,95 @@
+from __future__ import annotations
+
+import re
+from pathlib import Path
+
+import pytest
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+from sqlalchemy.orm import Session
+from uvicorn.middleware.proxy_headers import ProxyHeadersMiddleware
+
+from app.api.chat import client_address
+from app.core import ratelimit
+from app.core.ratelimit import ChatRateLimiter, MemoryBuckets, RateLimited
+from app.core.settings import Settings
+from app.db import crud, models, session as db_session
+
+NGINX_CONFS = sorted((Path(__file__).resolve().parents[3] / "ops" / "nginx").glob("nginx*.conf"))
+
+
+@pytest.mark.asyncio
+async def test_memory_bucket_refills_and_reports_the_wait(monkeypatch):
+    clock = [1000.0]
+    monkeypatch.setattr(ratelimit.time, "monotonic", lambda: clock[0])
+    buckets = MemoryBuckets(max_keys=2)
+
+    for _ in range(3):
+        assert await buckets.take("ip:a", cost=1, rate=0.5, capacity=3) == 0.0
+    assert await buckets.take("ip:a", cost=1, rate=0.5, capacity=3) == pytest.approx(2.0)
+
+    clock[0] += 2.0  # one token back at half a token per second
+    assert await buckets.take("ip:a", cost=1, rate=0.5, capacity=3) == 0.0
+    await buckets.take("ip:b", cost=1, rate=0.5, capacity=3)
+    await buckets.take("ip:c", cost=1, rate=0.5, capacity=3)
+    assert len(buckets) == 2  # the idlest key was dropped
+    assert await buckets.take("ip:a", cost=3, rate=0.5, capacity=3) == 0.0
+
+
+def test_database_bucket_takes_atomically_and_can_go_negative(tmp_path):
+    engine = db_session.build_engine(Settings(DATABASE_URL=f"sqlite:///{tmp_path / 'app.db'}"))
+    models.RateLimitBucket.__table__.create(engine)
+
+    def update(now: float, cost: float, conditional: bool = True) -> tuple[float, bool]:
+        with Session(engine) as session, session.begin():
+            return crud.update_rate_limit_bucket(
+                session, key="tokens:household:h1", cost=cost, rate=1.0, capacity=10.0, now=now, conditional=conditional
+            )
+
+    assert update(100.0, 4) == (6.0, True)
+    assert update(100.0, 7) == (6.0, False)  # refused: the level is untouched
+    assert update(101.0, 25, conditional=False) == (-18.0, True)
+    assert update(111.0, 0) == (-8.0, False)
+    assert update(200.0, 0) == (10.0, True)  # refilled, capped at capacity
+
+
+@pytest.mark.asyncio
+async def test_token_quota_refuses_until_the_overdraft_refills(monkeypatch):
+    clock = [0.0]
+    monkeypatch.setattr(ratelimit.time, "monotonic", lambda: clock[0])
+    settings = Settings(rate_limit_ip_burst=2, TOKEN_QUOTA_PER_DAY=86_400)
+    limiter = ChatRateLimiter(settings, MemoryBuckets(max_keys=100))
+
+    subject = await limiter.admit("10.0.0.1", None)
+    assert subject == "ip:10.0.0.1"
+    await limiter.charge_tokens(subject, 86_400 + 30)
+
+    with pytest.raises(RateLimited) as refused:
+        await limiter.admit("10.0.0.1", None)
+    assert refused.value.scope == "tokens" and refused.value.retry_after == pytest.approx(30.0)
+    with pytest.raises(RateLimited) as refused:
+        await limiter.admit("10.0.0.1", None)
+    assert refused.value.scope == "ip"
+
+    clock[0] += 60.0
+    assert await limiter.admit("10.0.0.1", None) == subject
+    assert await limiter.admit("10.0.0.2", None) == "ip:10.0.0.2"
+
+
+@pytest.mark.parametrize("conf", NGINX_CONFS, ids=lambda path: path.name)
+def test_spoofed_forwarded_for_does_not_change_the_ip_key(conf):
+    forwarded = re.findall(r"proxy_set_header\s+X-Forwarded-For\s+(\S+);", conf.read_text())
+    assert forwarded
+    app = FastAPI()
+
+    @app.get("/key")
+    def key(request: Request) -> str:
+        return client_address(request)
+
+    # uvicorn runs with --proxy-headers --forwarded-allow-ips "*" behind nginx.
+    client = TestClient(ProxyHeadersMiddleware(app, trusted_hosts="*"))
+    spoofed, peer = "6.6.6.6", "203.0.113.9"
+    for value in forwarded:
+        # The header nginx sends upstream when the client made up its own.
+        sent = {"$remote_addr": peer, "$proxy_add_x_forwarded_for": f"{spoofed}, {peer}"}[value]
+        assert client.get("/key", headers={"X-Forwarded-For": sent}).json() == peer
@@ -0,0 +1,56 @@
+from __future__ import annotations
+
+import numpy as np
+
+from app.bench import retrieval
+from app.core.settings import Settings
+
+
+class _ExactStore:
+    def __init__(self) -> None:
+        self.chunks = []
+
+    def upsert(self, chunks) -> int:
+        self.chunks.extend(chunks)
+        return len(chunks)
+
+    def similarity_search(self, query_embedding, top_k: int):
+        vectors = np.asarray([chunk.embedding for chunk in self.chunks])
+        order = np.argsort(-(vectors @ np.asarray(query_embedding)))[:top_k]
+        return [self.chunks[index] for index in order]
+
+
+def test_batched_ground_truth_matches_full_brute_force():
+    corpus = retrieval.SyntheticCorpus("clustered", size=530, dim=16, clusters=5, seed=3, batch_size=100)
+    queries = corpus.queries(12)
+    everything = np.concatenate([vectors for _, vectors in corpus.batches()])
+
+    expected = retrieval.exact_top_k(corpus, queries, top_k=7)
+
+    assert np.allclose(everything[250], corpus.batch(2)[50])
+    for query, ids in zip(queries, expected):
+        top = np.argsort(-(everything @ query))[:7]
+        assert ids == {f"{retrieval.BENCH_DOCUMENT_ID}:{index}" for index in top}
+
+
+def test_run_reports_each_backend_and_size(monkeypatch):
+    backend = retrieval.Backend(store=_ExactStore(), disk_bytes=lambda: 0, cleanup=lambda: None)
+    monkeypatch.setitem(retrieval.BACKENDS, "exact", lambda settings: backend)
+
+    report = retrieval.run(
+        ["exact"],
+        sizes=[300],
+        corpus="random",
+        dim=8,
+        clusters=1,
+        queries=5,
+        top_k=4,
+        batch_size=64,
+        seed=0,
+        settings=Settings(),
+    )
+
+    (row,) = report["results"]
+    assert row["backend"] == "exact" and row["size"] == 300
+    assert row["recall_at_k"] == 1.0
+    assert report["parameters"]["top_k"] == 4
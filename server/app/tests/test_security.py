@@ -0,0 +1,42 @@
+from __future__ import annotations
+
+import jwt
+import pytest
+from fastapi import HTTPException
+
+from app.core import security
+from app.core.settings import Settings
+
+
+@pytest.mark.asyncio
+async def test_password_hashing_uses_the_configured_cost_off_the_loop():
+    hashed = await security.hash_password("secret12", rounds=4)
+    assert hashed.startswith("$2b$04$")
+    assert await security.check_password("secret12", hashed)
+    assert not await security.check_password("wrong", hashed)
+    security.shutdown_password_pool()
+
+
+def test_cached_claims_never_outlive_the_token(monkeypatch):
+    settings = Settings(JWT_SECRET="s" * 32)
+    cache = security.TokenClaimsCache(max_entries=8, ttl_seconds=3600)
+    monkeypatch.setattr(security, "token_claims_cache", cache)
+    token = security.create_access_token(subject="admin", settings=settings, additional_claims={"is_admin": True})
+    calls = []
+    real_decode = jwt.decode
+    monkeypatch.setattr(security.jwt, "decode", lambda *args, **kwargs: calls.append(1) or real_decode(*args, **kwargs))
+
+    first = security.decode_token(token, settings)
+    first["is_admin"] = False  # a caller editing its claims must not change the cached entry
+    assert security.decode_token(token, settings)["is_admin"] is True
+    assert security.decode_token(token, settings)["sub"] == "admin"
+    assert len(calls) == 1
+    # Another secret never sees the cached claims.
+    with pytest.raises(HTTPException):
+        security.decode_token(token, Settings(JWT_SECRET="t" * 32))
+
+    short = security.create_access_token(subject="admin", settings=settings, expires_minutes=1)
+    claims = security.decode_token(short, settings)
+    monkeypatch.setattr(security.time, "time", lambda: claims["exp"] + 1)
+    assert cache.get((settings.jwt_secret, settings.jwt_algorithm, short)) is None
+    assert cache.get((settings.jwt_secret, settings.jwt_algorithm, token)) is not None
@@ -0,0 +1,68 @@
+from __future__ import annotations
+
+from datetime import date
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.api.tips import router
+from app.core.settings import Settings
+from app.rag.schemas import DocumentChunk, DocumentMetadata
+from app.rag.tips import TipRotation, build_tip_index, extract_tips
+
+
+def _chunk(content: str, age_range: str, language: str = "ar") -> DocumentChunk:
+    return DocumentChunk(
+        chunk_id=f"{age_range}-{language}-{len(content)}",
+        content=content,
+        embedding=[],
+        metadata=DocumentMetadata(document_id="doc", file_name="doc.md", age_range=age_range, language=language),
+    )
+
+
+PAGES = [
+    [
+        _chunk("## النوم\n- اجعل موعد النوم ثابتاً كل ليلة حتى يعتاد طفلك عليه.\n- قصير\n", "3-5"),
+        _chunk("1. **خصص** عشر دقائق يومياً للعب الحر مع طفلك دون هاتف.\n", "all"),
+    ],
+    [_chunk("* Read one short story together before bed every night.\n", "3-5", "en")],
+]
+
+
+def test_extract_tips_keeps_list_items_of_tip_length():
+    assert extract_tips(PAGES[0][1].content) == ["خصص عشر دقائق يومياً للعب الحر مع طفلك دون هاتف."]
+    assert extract_tips("فقرة عادية بدون قائمة ولكنها طويلة بما يكفي لتكون نصيحة.") == []
+
+
+def test_tip_index_rotates_daily_and_falls_back():
+    settings = Settings()
+    monday = build_tip_index(PAGES, settings, date(2025, 10, 20))
+    again = build_tip_index(PAGES, settings, date(2025, 10, 20))
+
+    toddlers = monday.lookup("3-5", "ar", 5)
+    assert toddlers == again.lookup("3-5", "ar", 5)
+    assert b"\xd8\xae\xd8\xb5\xd8\xb5" in toddlers.body  # "all" tips are mixed into every age bucket
+    assert monday.lookup("13-17", "en", 3).body == monday.lookup("all", "en", 3).body
+    assert b'"tips": []' in monday.lookup("3-5", "fr", 3).body
+
+    defaults = build_tip_index([], settings, date(2025, 10, 20))
+    assert defaults.lookup("3-5", "ar", 1).etag != toddlers.etag
+    assert defaults.size == sum(len(set(tips)) for tips in settings.default_daily_tips.values())
+
+
+def test_tips_endpoint_serves_etags_and_not_modified():
+    app = FastAPI()
+    app.include_router(router, prefix="/api")
+    app.state.tips = TipRotation(Settings(), lambda: iter(PAGES))
+    with TestClient(app) as client:
+        client.portal.call(app.state.tips.refresh)
+        response = client.get("/api/tips", params={"age_range": "3-5", "limit": 2})
+        cached = client.get(
+            "/api/tips", params={"age_range": "3-5", "limit": 2}, headers={"If-None-Match": response.headers["etag"]}
+        )
+
+    assert response.status_code == 200
+    assert len(response.json()["tips"]) == 2
+    assert response.headers["cache-control"].startswith("public, max-age=")
+    assert cached.status_code == 304
+    assert cached.headers["etag"] == response.headers["etag"]
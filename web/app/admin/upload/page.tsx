@@ -2,8 +2,8 @@
 
 import { useEffect, useState } from 'react';
 
-import { deleteDocument, fetchAdminDocuments, uploadDocument } from '@/lib/api';
-import type { AdminDocument } from '@/lib/types';
+import { deleteDocument, fetchAdminDocuments, fetchDuplicateChunks, fetchIngestJob, uploadDocument } from '@/lib/api';
+import type { AdminDocument, DuplicateChunk } from '@/lib/types';
 
 export default function AdminUploadPage() {
   const [token, setToken] = useState('');
@@ -17,26 +17,34 @@ export default function AdminUploadPage() {
   const [error, setError] = useState<string | null>(null);
   const [isUploading, setIsUploading] = useState(false);
   const [documents, setDocuments] = useState<AdminDocument[]>([]);
+  const [nextCursor, setNextCursor] = useState<string | null>(null);
   const [docsError, setDocsError] = useState<string | null>(null);
   const [isLoadingDocs, setIsLoadingDocs] = useState(false);
+  const [isLoadingMore, setIsLoadingMore] = useState(false);
   const [refreshFlag, setRefreshFlag] = useState(0);
+  const [duplicates, setDuplicates] = useState<DuplicateChunk[]>([]);
 
   useEffect(() => {
     if (!token) {
       setDocuments([]);
+      setNextCursor(null);
       setDocsError(null);
       return;
     }
     setIsLoadingDocs(true);
     fetchAdminDocuments(token)
-      .then((data) => {
-        setDocuments(data);
+      .then((page) => {
+        setDocuments(page.items);
+        setNextCursor(page.next_cursor);
         setDocsError(null);
       })
       .catch((err) => {
         setDocsError(err instanceof Error ? err.message : 'تعذر تحميل المكتبة');
       })
       .finally(() => setIsLoadingDocs(false));
+    fetchDuplicateChunks(token)
+      .then(setDuplicates)
+      .catch(() => setDuplicates([]));
   }, [token, refreshFlag]);
 
   const handleSubmit = async (event: React.FormEvent<HTMLFormElement>) => {
@@ -57,7 +65,17 @@ export default function AdminUploadPage() {
       formData.append('country', country);
       formData.append('language', language);
       const response = await uploadDocument(formData, token);
-      setStatus(`تم رفع الوثيقة بنجاح (عدد المقاطع المخزنة: ${response.stored_chunks})`);
+      setStatus('تم استلام الوثيقة، جارٍ معالجتها...');
+      let job = await fetchIngestJob(response.job_id, token);
+      while (job.status === 'queued' || job.status === 'running') {
+        setStatus(`جارٍ المعالجة (${job.chunks_stored}/${job.chunks_total} مقطع)`);
+        await new Promise((resolve) => setTimeout(resolve, 2000));
+        job = await fetchIngestJob(response.job_id, token);
+      }
+      if (job.status === 'failed') {
+        throw new Error(job.error || 'فشلت معالجة الوثيقة');
+      }
+      setStatus(`تمت معالجة الوثيقة بنجاح (عدد المقاطع الجديدة: ${job.chunks_stored})`);
       setRefreshFlag((value) => value + 1);
     } catch (err) {
       setError(err instanceof Error ? err.message : 'فشل الرفع');
@@ -66,6 +84,22 @@ export default function AdminUploadPage() {
     }
   };
 
+  const handleLoadMore = async () => {
+    if (!nextCursor) {
+      return;
+    }
+    setIsLoadingMore(true);
+    try {
+      const page = await fetchAdminDocuments(token, { cursor: nextCursor });
+      setDocuments((current) => [...current, ...page.items]);
+      setNextCursor(page.next_cursor);
+    } catch (err) {
+      setDocsError(err instanceof Error ? err.message : 'تعذر تحميل المكتبة');
+    } finally {
+      setIsLoadingMore(false);
+    }
+  };
+
   const handleDelete = async (documentId: string) => {
     if (!token) {
       setDocsError('الرجاء إدخال رمز الإدارة أولاً');
@@ -189,7 +223,46 @@ export default function AdminUploadPage() {
             </table>
           </div>
         )}
+        {!isLoadingDocs && nextCursor && (
+          <button
+            type="button"
+            onClick={handleLoadMore}
+            disabled={isLoadingMore}
+            style={{ justifySelf: 'center', border: '1px solid #d1d5db', background: '#f8fafc', padding: '0.5rem 1.25rem', borderRadius: '10px' }}
+          >
+            {isLoadingMore ? '...جاري التحميل' : 'عرض المزيد'}
+          </button>
+        )}
       </section>
+
+      {duplicates.length > 0 && (
+        <section style={{ background: '#ffffff', borderRadius: '16px', padding: '1.5rem', display: 'grid', gap: '1rem' }}>
+          <h2 style={{ margin: 0, fontSize: '1.2rem' }}>مقاطع مكررة تم دمجها</h2>
+          <p style={{ margin: 0, color: '#6b7280' }}>لم تُخزَّن هذه المقاطع لأنها شبه مطابقة لمقطع موجود مسبقاً.</p>
+          <div style={{ overflowX: 'auto' }}>
+            <table style={{ width: '100%', borderCollapse: 'collapse', minWidth: '640px' }}>
+              <thead>
+                <tr style={{ background: '#f8fafc', textAlign: 'left' }}>
+                  <th style={{ padding: '0.75rem' }}>الملف</th>
+                  <th style={{ padding: '0.75rem' }}>المقطع</th>
+                  <th style={{ padding: '0.75rem' }}>مطابق لـ</th>
+                  <th style={{ padding: '0.75rem' }}>التشابه</th>
+                </tr>
+              </thead>
+              <tbody>
+                {duplicates.map((dup) => (
+                  <tr key={dup.chunk_id} style={{ borderBottom: '1px solid #e2e8f0' }}>
+                    <td style={{ padding: '0.75rem' }}>{dup.file_name}</td>
+                    <td style={{ padding: '0.75rem', maxWidth: '420px' }}>{dup.preview}</td>
+                    <td style={{ padding: '0.75rem' }}>{dup.canonical_file_name ?? dup.canonical_document_id}</td>
+                    <td style={{ padding: '0.75rem' }}>{Math.round(dup.similarity * 100)}%</td>
+                  </tr>
+                ))}
+              </tbody>
+            </table>
+          </div>
+        </section>
+      )}
     </div>
   );
 }
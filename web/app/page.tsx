@@ -3,7 +3,7 @@ import TipCard from '@/components/TipCard';
 async function loadTips() {
   const apiBase = process.env.NEXT_PUBLIC_API_BASE_URL ?? 'http://localhost:8000/api';
   try {
-    const res = await fetch(`${apiBase}/tips?age_range=3-5`, { next: { revalidate: 0 } });
+    const res = await fetch(`${apiBase}/tips?age_range=3-5`, { next: { revalidate: 3600 } });
     if (!res.ok) return [];
     const data = (await res.json()) as { tips: string[] };
     return data.tips;
@@ -1,4 +1,14 @@
-import { AdminDocument, ChatRequestBody, ChatResponseBody, ProfilePayload, TipResponse } from './types';
+import {
+  AdminDocumentPage,
+  ChatRequestBody,
+  ChatLogDetail,
+  ChatLogEntry,
+  ChatResponseBody,
+  DuplicateChunk,
+  IngestJob,
+  ProfilePayload,
+  TipResponse,
+} from './types';
 
 const configuredBase = process.env.NEXT_PUBLIC_API_BASE_URL?.replace(/\/$/, '') ?? '';
 
@@ -44,8 +54,8 @@ export async function sendChat(body: ChatRequestBody): Promise<ChatResponseBody>
   return handleResponse<ChatResponseBody>(res);
 }
 
-export async function fetchTips(ageRange: string): Promise<TipResponse> {
-  const search = new URLSearchParams({ age_range: ageRange });
+export async function fetchTips(ageRange: string, language = 'ar'): Promise<TipResponse> {
+  const search = new URLSearchParams({ age_range: ageRange, language });
   const url = buildUrl(`/tips?${search.toString()}`);
   return handleResponse<TipResponse>(await fetch(url));
 }
@@ -67,16 +77,88 @@ export async function uploadDocument(formData: FormData, token: string) {
     },
     body: formData,
   });
-  return handleResponse<{ document_id: string; stored_chunks: number }>(res);
+  return handleResponse<{ job_id: string; status: string }>(res);
 }
 
-export async function fetchAdminDocuments(token: string): Promise<AdminDocument[]> {
-  const res = await fetch(buildUrl('/admin/documents'), {
+export async function fetchIngestJob(jobId: string, token: string): Promise<IngestJob> {
+  const res = await fetch(buildUrl(`/admin/jobs/${jobId}`), {
     headers: {
       Authorization: `Bearer ${token}`,
     },
   });
-  return handleResponse<AdminDocument[]>(res);
+  return handleResponse<IngestJob>(res);
+}
+
+export async function fetchDuplicateChunks(token: string, limit = 200): Promise<DuplicateChunk[]> {
+  const res = await fetch(buildUrl(`/admin/duplicates?limit=${limit}`), {
+    headers: {
+      Authorization: `Bearer ${token}`,
+    },
+  });
+  return handleResponse<DuplicateChunk[]>(res);
+}
+
+export async function fetchChatLogs(token: string, limit = 50, householdId?: string): Promise<ChatLogEntry[]> {
+  const params = new URLSearchParams({ limit: String(limit) });
+  if (householdId) {
+    params.set('household_id', householdId);
+  }
+  const res = await fetch(buildUrl(`/admin/chat-logs?${params.toString()}`), {
+    headers: {
+      Authorization: `Bearer ${token}`,
+    },
+  });
+  return handleResponse<ChatLogEntry[]>(res);
+}
+
+export async function exportChatLogs(token: string, start: string, end: string, householdId?: string): Promise<Blob> {
+  const params = new URLSearchParams({ start, end });
+  if (householdId) {
+    params.set('household_id', householdId);
+  }
+  const res = await fetch(buildUrl(`/admin/chat-logs/export?${params.toString()}`), {
+    headers: {
+      Authorization: `Bearer ${token}`,
+    },
+  });
+  if (!res.ok) {
+    const text = await res.text();
+    throw new Error(text || `Failed to export chat logs (${res.status})`);
+  }
+  return res.blob();
+}
+
+export async function fetchChatLog(logId: string, token: string): Promise<ChatLogDetail> {
+  const res = await fetch(buildUrl(`/admin/chat-logs/${logId}`), {
+    headers: {
+      Authorization: `Bearer ${token}`,
+    },
+  });
+  return handleResponse<ChatLogDetail>(res);
+}
+
+export interface AdminDocumentFilters {
+  cursor?: string | null;
+  limit?: number;
+  topic?: string;
+  age_range?: string;
+  language?: string;
+}
+
+export async function fetchAdminDocuments(token: string, filters: AdminDocumentFilters = {}): Promise<AdminDocumentPage> {
+  const params = new URLSearchParams();
+  for (const [key, value] of Object.entries(filters)) {
+    if (value !== undefined && value !== null && value !== '') {
+      params.set(key, String(value));
+    }
+  }
+  const query = params.toString();
+  const res = await fetch(buildUrl(query ? `/admin/documents?${query}` : '/admin/documents'), {
+    headers: {
+      Authorization: `Bearer ${token}`,
+    },
+  });
+  return handleResponse<AdminDocumentPage>(res);
 }
 
 export async function deleteDocument(documentId: string, token: string) {
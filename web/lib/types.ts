@@ -19,6 +19,8 @@ export interface ChatResponseBody {
 
 export interface TipResponse {
   age_range: string;
+  language: string;
+  day: string;
   tips: string[];
 }
 
@@ -35,6 +37,33 @@ export interface ProfilePayload {
   }>;
 }
 
+export interface ChatLogEntry {
+  id: string;
+  household_id: string | null;
+  persona: string;
+  language: string;
+  user_message: string;
+  assistant_message: string | null;
+  needs_human: boolean;
+  safety_reasons: string[];
+  context_count: number;
+  created_at: string;
+}
+
+export interface ChatLogContext {
+  chunk_ids: string[];
+  score: number | null;
+  document_id: string | null;
+  file_name: string | null;
+  heading_path: string | null;
+  snippet: string | null;
+  available: boolean;
+}
+
+export interface ChatLogDetail extends ChatLogEntry {
+  context: ChatLogContext[];
+}
+
 export interface AdminDocument {
   document_id: string;
   file_name: string;
@@ -47,3 +76,33 @@ export interface AdminDocument {
   s3_uploaded: boolean;
   updated_at: string;
 }
+
+export interface AdminDocumentPage {
+  items: AdminDocument[];
+  next_cursor: string | null;
+}
+
+export interface IngestJob {
+  job_id: string;
+  status: 'queued' | 'running' | 'succeeded' | 'failed';
+  file_name: string;
+  document_id: string | null;
+  chunks_total: number;
+  chunks_embedded: number;
+  chunks_stored: number;
+  error: string | null;
+  created_at: string;
+  updated_at: string;
+}
+
+export interface DuplicateChunk {
+  chunk_id: string;
+  document_id: string;
+  file_name: string;
+  canonical_chunk_id: string;
+  canonical_document_id: string;
+  canonical_file_name: string | null;
+  similarity: number;
+  preview: string;
+  updated_at: string;
+}